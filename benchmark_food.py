@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+食物推荐热路径基准测试
+
+用合成的菜品目录（10^2 ~ 10^6 道菜）和不同长度的饮食记录，计时：
+- get_food_options：加载目录（解析 CSV 或 mmap 打开二进制目录）与生成 FoodOption 列表
+- 筛选/抽样：query_ids、recommend（缓存未命中 / 命中 / 多样化 top-10）
+- add_recent_food：环形缓冲区与 SQLite 两种记录后端
+- 端到端：启动 mcp_server.py，经标准输入输出往返 tools/call get_food_recommendation
+- 传输层：连续发送 ping，比较 BufferedTransport 与逐行 LineTransport 的吞吐（messages_per_second）
+- get_file_content：大文件分段读取（按字节、按行）与整文件读取
+
+结果写为 JSON；--compare 与基线比较，中位数变慢超过阈值时以退出码 1 结束。
+
+    python benchmark_food.py --output bench.json
+    python benchmark_food.py --sizes 100,10000 --compare bench.json
+    python benchmark_food.py --compare old.json --against new.json
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import food_catalog
+import food_catalog_file
+import food_recommendation as fr
+from food_affinity import CooccurrenceModel
+from food_catalog import WEATHER_TAGS
+from food_history import RingBufferHistory, SQLiteHistory
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000, 1000000]
+DEFAULT_HISTORY_SIZES = [7, 100, 10000]
+
+# 合成菜名的组成部分
+_FLAVORS = ["麻辣", "香辣", "酸辣", "红烧", "清蒸", "干煸", "糖醋", "蒜香", "孜然", "番茄", "葱油", "黑椒"]
+_INGREDIENTS = ["牛肉", "鸡丁", "鱼片", "排骨", "豆腐", "虾仁", "羊肉", "茄子", "土豆", "鸡蛋", "猪蹄", "鸭血"]
+_DISHES = ["面", "饭", "粉", "锅", "煲", "汤", "盖饭", "拌面", "炒饭", "米线", "套餐", "砂锅"]
+
+
+def synthetic_catalog_frame(size, seed=0):
+    """生成 size 道菜的合成目录（foods.csv 的列格式）"""
+    rng = np.random.default_rng(seed)
+    flavor = rng.integers(len(_FLAVORS), size=size)
+    ingredient = rng.integers(len(_INGREDIENTS), size=size)
+    dish = rng.integers(len(_DISHES), size=size)
+    # 名称带编号，保证菜名各不相同
+    names = [
+        f"{_FLAVORS[f]}{_INGREDIENTS[i]}{_DISHES[d]}{n}"
+        for n, (f, i, d) in enumerate(zip(flavor.tolist(), ingredient.tolist(), dish.tolist()))
+    ]
+    min_price = np.round(rng.uniform(5, 120, size=size), 1)
+    tag_bits = rng.random((size, len(WEATHER_TAGS))) < 0.3
+    tags = ['，'.join(t for t, hit in zip(WEATHER_TAGS, row) if hit) for row in tag_bits.tolist()]
+    return pd.DataFrame({
+        '菜品名': names,
+        '最低价格': min_price,
+        '最高价格': np.round(min_price * rng.uniform(1.0, 1.6, size=size), 1),
+        '健康度': rng.integers(1, 11, size=size),
+        '备注': '合成数据',
+        '适合天气': tags,
+    })
+
+
+def measure(func, repeat, warmup=1):
+    """运行 func 若干次，返回耗时统计（毫秒）"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    samples = np.asarray(samples)
+    return {
+        'median_ms': float(np.median(samples)),
+        'min_ms': float(samples.min()),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'mean_ms': float(samples.mean()),
+        'runs': int(len(samples)),
+    }
+
+
+def single(ms):
+    """只测一次的指标（如进程启动）"""
+    return {'median_ms': ms, 'min_ms': ms, 'p95_ms': ms, 'mean_ms': ms, 'runs': 1}
+
+
+def _repeat_for(size, base):
+    """目录越大重复次数越少，控制总耗时"""
+    return max(3, min(base, int(base * 1000 / max(size, 1000))))
+
+
+def bench_catalog(size, csv_path, repeat):
+    results = {}
+    fr.CSV_FILE = csv_path
+
+    def load():
+        # 清掉 CSV 解析缓存，测量冷加载
+        food_catalog._csv_cache.clear()
+        fr.reload_food_catalog()
+        fr.get_food_catalog()
+
+    results[f'load_catalog/n={size}'] = measure(load, _repeat_for(size, 10))
+    results[f'get_food_options/n={size}'] = measure(fr.get_food_options, _repeat_for(size, 20))
+
+    catalog = fr.get_food_catalog()
+    bin_path = os.path.splitext(csv_path)[0] + '.bin'
+    food_catalog_file.write_catalog_file(catalog, bin_path)
+
+    def open_mapped():
+        food_catalog_file._open_cache.clear()
+        food_catalog_file.open_catalog_file(bin_path)
+
+    results[f'open_catalog_file/n={size}'] = measure(open_mapped, _repeat_for(size, 50))
+    rng = np.random.default_rng(1)
+    history = [catalog.names[i] for i in range(min(7, len(catalog)))]
+    results[f'query_ids/n={size}'] = measure(
+        lambda: catalog.query_ids(60, 5, '雨天', history), _repeat_for(size, 200))
+
+    def recommend_cold():
+        # 每次清空候选缓存，测量筛选和构建别名表的代价
+        fr.get_scoring_engine().clear_cache()
+        fr.recommend('雨天', 60, 5, history, rng=rng, catalog=catalog)
+
+    results[f'recommend_cold/n={size}'] = measure(recommend_cold, _repeat_for(size, 200))
+    results[f'recommend_cached/n={size}'] = measure(
+        lambda: fr.recommend('雨天', 60, 5, history, rng=rng, catalog=catalog), 500)
+    # 不同用户（近期记录各不相同）、预算在同一价格区间内的请求共用候选缓存
+    user_histories = [[catalog.names[j] for j in range(i, min(i + 7, len(catalog)))] for i in range(50)]
+    users = iter(range(1 << 30))
+    results[f'recommend_users/n={size}'] = measure(
+        lambda: fr.recommend('雨天', 60, 5, user_histories[next(users) % 50], rng=rng, catalog=catalog), 500)
+    catalog.search_index
+    query = catalog.names[len(catalog) // 2]
+    results[f'search_foods/n={size}'] = measure(lambda: catalog.search_ids(query), _repeat_for(size, 200))
+    catalog.family_codes
+    results[f'recommend_top10/n={size}'] = measure(
+        lambda: fr.recommend('雨天', 60, 5, history, rng=rng, catalog=catalog, k=10), _repeat_for(size, 200))
+    return results
+
+
+def bench_history(size, history_sizes, workdir, repeat):
+    results = {}
+    catalog = fr.get_food_catalog()
+    names = [catalog.names[i] for i in range(min(len(catalog), 1000))]
+    for history_size in history_sizes:
+        backends = {
+            'ring': RingBufferHistory(os.path.join(workdir, f'ring_{size}_{history_size}.bin'),
+                                      capacity=history_size),
+            'sqlite': SQLiteHistory(os.path.join(workdir, f'history_{size}_{history_size}.db'),
+                                    limit=history_size),
+        }
+        for kind, backend in backends.items():
+            backend.append_many([(None, names[i % len(names)]) for i in range(history_size)])
+            fr.set_history_backend(backend)
+            counter = iter(range(10 ** 9))
+            results[f'add_recent_food/{kind}/n={size}/h={history_size}'] = measure(
+                lambda: fr.add_recent_food(names[next(counter) % len(names)]), repeat)
+            results[f'read_recent_foods/{kind}/n={size}/h={history_size}'] = measure(
+                fr.read_recent_foods, repeat)
+    fr.set_history_backend(None)
+    return results
+
+
+class _MCPClient:
+    """以子进程方式启动 mcp_server.py，按行收发 JSON-RPC"""
+
+    def __init__(self, workdir, transport=None):
+        env = dict(os.environ, PYTHONPATH=REPO_DIR + os.pathsep + os.environ.get('PYTHONPATH', ''))
+        env.pop('FOOD_HISTORY_DB', None)
+        env.pop('FOOD_GUESS_MODEL_DB', None)
+        if transport is not None:
+            env['MCP_TRANSPORT'] = transport
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(REPO_DIR, 'mcp_server.py')],
+            cwd=workdir, env=env, text=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+        self.next_id = 0
+
+    def call(self, method, params=None):
+        self.next_id += 1
+        request = {"jsonrpc": "2.0", "id": self.next_id, "method": method, "params": params or {}}
+        self.process.stdin.write(json.dumps(request) + "\n")
+        self.process.stdin.flush()
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError("mcp_server.py 提前退出")
+        return json.loads(line)
+
+    def pipeline(self, method, count):
+        """连续发送 count 个请求（不等待响应），再读取全部响应"""
+        lines = []
+        for _ in range(count):
+            self.next_id += 1
+            lines.append(json.dumps({"jsonrpc": "2.0", "id": self.next_id, "method": method}) + "\n")
+        writer = threading.Thread(target=lambda: (self.process.stdin.write(''.join(lines)), self.process.stdin.flush()))
+        writer.start()
+        for _ in range(count):
+            if not self.process.stdout.readline():
+                raise RuntimeError("mcp_server.py 提前退出")
+        writer.join()
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait(timeout=30)
+
+
+def bench_mcp(size, workdir, repeat):
+    """端到端：第一次调用包含目录加载，之后为稳定状态的往返耗时"""
+    results = {}
+    params = {"name": "get_food_recommendation",
+              "arguments": {"weather": "雨天", "budget": 60, "min_health": 5}}
+    start = time.perf_counter()
+    client = _MCPClient(workdir)
+    try:
+        client.call("initialize", {"protocolVersion": "2024-11-05", "capabilities": {},
+                                   "clientInfo": {"name": "benchmark", "version": "1.0.0"}})
+        startup = (time.perf_counter() - start) * 1000.0
+        start = time.perf_counter()
+        response = client.call("tools/call", params)
+        first = (time.perf_counter() - start) * 1000.0
+        if "result" not in response:
+            raise RuntimeError(f"tools/call 失败: {response}")
+        results[f'mcp_startup/n={size}'] = single(startup)
+        results[f'mcp_first_call/n={size}'] = single(first)
+        results[f'mcp_call/n={size}'] = measure(lambda: client.call("tools/call", params), repeat, warmup=0)
+    finally:
+        client.close()
+    return results
+
+
+def bench_transport(workdir, repeat, messages=2000):
+    """传输层吞吐：每轮连续发送 messages 个 ping 再读回全部响应"""
+    results = {}
+    for transport in ('buffered', 'line'):
+        client = _MCPClient(workdir, transport)
+        try:
+            client.call("ping")
+            stats = measure(lambda: client.pipeline("ping", messages), max(3, repeat // 10), warmup=1)
+        finally:
+            client.close()
+        stats['messages_per_second'] = messages / (stats['median_ms'] / 1000.0)
+        results[f'mcp_transport/{transport}'] = stats
+    return results
+
+
+def bench_file_content(workdir, repeat, lines=200000):
+    """get_file_content 的读取路径：整文件读取、首段、文件中部的行范围（行索引已缓存）"""
+    import file_chunks
+    path = os.path.join(workdir, 'large.txt')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(f'{i},黄焖鸡米饭,{i % 50 + 10},{i % 10 + 1}\n' for i in range(lines))
+
+    def read_all():
+        with open(path, 'r', encoding='utf-8') as f:
+            f.read()
+
+    results = {}
+    results[f'file_read_all/lines={lines}'] = measure(read_all, max(3, repeat // 10))
+    results[f'file_read_chunk/lines={lines}'] = measure(lambda: file_chunks.read_chunk(path), repeat)
+    file_chunks.read_chunk(path, start_line=1, end_line=1)
+    results[f'file_read_lines/lines={lines}'] = measure(
+        lambda: file_chunks.read_chunk(path, start_line=lines // 2, end_line=lines // 2 + 100), repeat)
+    return results
+
+
+def run_benchmarks(sizes, history_sizes, repeat, skip_mcp=False):
+    logging.getLogger().setLevel(logging.WARNING)
+    results = {}
+    saved_csv = fr.CSV_FILE
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory(prefix='food_bench_') as workdir:
+                print(f"[n={size}] 生成合成目录...", file=sys.stderr)
+                # 启用了“猜你喜欢”模型时改用临时目录中的模型库，合成菜品不写入真实的模型库
+                if fr.GUESS_MODEL_DB:
+                    fr.set_guess_model(CooccurrenceModel(os.path.join(workdir, 'food_model.db')))
+                csv_path = os.path.join(workdir, 'foods.csv')
+                synthetic_catalog_frame(size).to_csv(csv_path, index=False, encoding='utf-8')
+                results.update(bench_catalog(size, csv_path, repeat))
+                results.update(bench_history(size, history_sizes, workdir, repeat))
+                if not skip_mcp:
+                    results.update(bench_mcp(size, workdir, repeat))
+        with tempfile.TemporaryDirectory(prefix='food_bench_') as workdir:
+            results.update(bench_file_content(workdir, repeat))
+            if not skip_mcp:
+                results.update(bench_transport(workdir, repeat))
+    finally:
+        fr.CSV_FILE = saved_csv
+        fr.set_guess_model(None)
+        fr.reload_food_catalog()
+    return {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'sizes': sizes,
+            'history_sizes': history_sizes,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold, min_delta_ms):
+    """
+    按中位数比较两次结果，返回变慢超过阈值的指标列表。
+    变慢需同时满足：相对变化超过 threshold，且绝对差值超过 min_delta_ms（过滤计时噪声）。
+    """
+    regressions = []
+    print(f"{'指标':<48}{'基线(ms)':>12}{'当前(ms)':>12}{'变化':>10}")
+    for name in sorted(set(baseline['results']) & set(current['results'])):
+        old = baseline['results'][name]['median_ms']
+        new = current['results'][name]['median_ms']
+        change = (new - old) / old if old > 0 else 0.0
+        regressed = change > threshold and new - old > min_delta_ms
+        mark = '  <-- 变慢' if regressed else ''
+        print(f"{name:<48}{old:>12.3f}{new:>12.3f}{change:>+10.1%}{mark}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def _int_list(text):
+    return [int(float(part)) for part in text.split(',') if part]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="食物推荐热路径基准测试")
+    parser.add_argument('--sizes', type=_int_list, default=DEFAULT_SIZES, help="目录规模，逗号分隔")
+    parser.add_argument('--history-sizes', type=_int_list, default=DEFAULT_HISTORY_SIZES,
+                        help="饮食记录长度，逗号分隔")
+    parser.add_argument('--repeat', type=int, default=50, help="每项的重复次数")
+    parser.add_argument('--skip-mcp', action='store_true', help="不运行端到端 MCP 测试")
+    parser.add_argument('--output', help="结果 JSON 文件，默认输出到标准输出")
+    parser.add_argument('--compare', metavar='BASELINE', help="与基线 JSON 比较")
+    parser.add_argument('--against', metavar='CURRENT', help="与 --compare 一起使用：比较已有结果而不重新运行")
+    parser.add_argument('--threshold', type=float, default=0.25, help="允许的相对变慢比例，默认 0.25")
+    parser.add_argument('--min-delta-ms', type=float, default=0.05, help="忽略小于该值的绝对变化（毫秒）")
+    args = parser.parse_args(argv)
+
+    if args.against:
+        if not args.compare:
+            parser.error("--against 需要和 --compare 一起使用")
+        with open(args.against, encoding='utf-8') as f:
+            current = json.load(f)
+    else:
+        current = run_benchmarks(args.sizes, args.history_sizes, args.repeat, args.skip_mcp)
+        text = json.dumps(current, ensure_ascii=False, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(text + "\n")
+        elif not args.compare:
+            print(text)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, current, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} 项指标变慢超过 {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+离线评估：按时间回放饮食记录（及当时的推荐请求参数），比较不同打分策略的推荐分布。
+
+指标（对每条能解析到目录菜品的事件取平均）：
+- hit_rate@k：实际吃的菜在策略权重的前 k 名之内
+- likelihood：按策略抽一道菜恰好是实际吃的菜的概率
+- repeat_rate：抽中回放窗口内近期吃过的菜的概率
+- diversity：连抽两道菜属于不同类别的概率（1 - Σ 类别概率²，类别见 food_names.dish_family）
+
+每条事件的推荐分布 = 请求参数下的基础权重 × 用户近期记录的系数。基础权重按不同的请求参数
+各算一次；近期记录只改变记录中的菜及其相似菜的权重，所以总权重、目标菜的名次和类别分布都由
+这些稀疏修正直接算出。整批事件在 NumPy 上向量化计算，按用户排好序后分块，可多进程并行。
+
+    python evaluate_food.py --log events.csv
+    python evaluate_food.py --history-db history.db --policy fast_decay:recency_half_life=1
+    python evaluate_food.py --synthetic 10000000 --users 100000 --processes 8
+
+日志 CSV 的列：user_id、food_name，可选 eaten_at（决定顺序与季节）、weather、budget、min_health；
+缺少的请求参数用 --weather / --budget / --min-health 的值。
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import food_recommendation as fr
+from food_catalog import load_catalog_csv
+from food_catalog_file import open_catalog_file
+from food_history import SQLiteHistory
+from food_scoring import SEASONS, ScoringEngine
+from food_similarity import DishSimilarity
+
+# 策略可以调整的 ScoringEngine 参数
+POLICY_PARAMS = ('weather_miss', 'season_bonus', 'recency_half_life', 'similar_penalty')
+DEFAULT_POLICIES = {
+    'current': {},
+    'exact_only': {'similar_penalty': 0.0},
+    'slow_decay': {'recency_half_life': 4.0},
+}
+# 每个策略的 (请求参数组合数 × 菜品数) 权重矩阵的单元数上限
+MAX_WEIGHT_CELLS = 25_000_000
+
+# 多进程评估时由 fork 出的子进程继承
+_active_replay = None
+
+
+class EventLog:
+    """
+    按用户分组、组内按时间排序的事件：
+    foods 为菜名编码（菜名见 names），requests 为请求参数编码（参数见 request_params），
+    user_start[i] 为事件 i 所属用户的第一条事件下标。
+    """
+
+    def __init__(self, frame):
+        """frame 按时间排序，列为 user_id、food_name、weather、budget、min_health、season（空字符串表示不限）"""
+        users, user_names = pd.factorize(frame['user_id'])
+        order = np.argsort(users, kind='stable')
+        users = users[order]
+        foods, self.names = pd.factorize(frame['food_name'].to_numpy()[order])
+        self.foods = foods.astype(np.int32)
+        columns = ['weather', 'budget', 'min_health', 'season']
+        requests = frame[columns].iloc[order]
+        self.requests = requests.groupby(columns, sort=False).ngroup().to_numpy(dtype=np.int32)
+        first = np.unique(self.requests, return_index=True)[1]
+        self.request_params = [tuple(row) for row in requests.iloc[first].itertuples(index=False)]
+        boundaries = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+        self.user_start = np.repeat(boundaries, np.diff(np.r_[boundaries, len(users)]))
+        self.users = len(user_names)
+
+    def __len__(self):
+        return len(self.foods)
+
+
+def _request_frame(frame, weather, budget, min_health):
+    """补齐请求参数列，season 由 eaten_at 的月份决定"""
+    frame = frame.copy()
+    if 'eaten_at' in frame.columns:
+        eaten_at = pd.to_datetime(frame['eaten_at'])
+        order = np.argsort(eaten_at.to_numpy(), kind='stable')
+        frame = frame.iloc[order].reset_index(drop=True)
+        frame['season'] = eaten_at.iloc[order].dt.month.map(SEASONS).fillna('').to_numpy()
+    else:
+        frame['season'] = ''
+    frame['weather'] = frame['weather'].fillna(weather or '') if 'weather' in frame.columns else weather or ''
+    frame['budget'] = (
+        pd.to_numeric(frame['budget'], errors='coerce').fillna(budget) if 'budget' in frame.columns else budget
+    )
+    frame['min_health'] = (
+        pd.to_numeric(frame['min_health'], errors='coerce').fillna(min_health).astype(int)
+        if 'min_health' in frame.columns else min_health
+    )
+    frame['user_id'] = frame['user_id'].fillna('').astype(str)
+    return frame
+
+
+def load_log_csv(path, weather=None, budget=None, min_health=1):
+    """读取事件日志 CSV"""
+    frame = pd.read_csv(path, dtype={'user_id': str, 'food_name': str, 'weather': str})
+    for column in ('user_id', 'food_name'):
+        if column not in frame.columns:
+            raise ValueError(f"{path} 缺少列: {column}")
+    frame = frame[frame['food_name'].notna()]
+    return EventLog(_request_frame(frame, weather, budget, min_health))
+
+
+def load_history_db(path, weather=None, budget=None, min_health=1):
+    """读取 SQLite 饮食记录库（没有请求参数，全部使用默认值）"""
+    frame = pd.DataFrame.from_records(SQLiteHistory(path).iter_events(), columns=['user_id', 'food_name'])
+    return EventLog(_request_frame(frame, weather, budget, min_health))
+
+
+def synthetic_log(catalog, events, users, weather=None, budget=None, min_health=1, seed=0):
+    """
+    合成事件：每个用户有 10 道常吃的菜，一半事件从中选，另一半按热度（Zipf）从全目录选；
+    未指定的请求参数在几档预算、天气和健康度中随机。
+    """
+    rng = np.random.default_rng(seed)
+    user_ids = rng.integers(users, size=events)
+    favorites = rng.integers(len(catalog), size=(users, 10))
+    popular = np.minimum(rng.zipf(1.3, size=events) - 1, len(catalog) - 1)
+    popular = rng.permutation(len(catalog))[popular]
+    foods = np.where(rng.random(events) < 0.5, favorites[user_ids, rng.integers(10, size=events)], popular)
+    names = np.asarray(list(catalog.names), dtype=object)
+    frame = pd.DataFrame({'user_id': user_ids.astype(str), 'food_name': names[foods]})
+    frame['weather'] = weather or np.asarray(['晴天', '阴天', '雨天', '炎热'], dtype=object)[
+        rng.integers(4, size=events)]
+    frame['budget'] = budget or np.asarray([25.0, 35.0, 50.0, 80.0])[rng.integers(4, size=events)]
+    frame['min_health'] = rng.integers(1, 8, size=events) if min_health is None else min_health
+    return EventLog(_request_frame(frame, None, None, 1))
+
+
+class _Policy:
+    """一个策略在每组请求参数下的基础权重及其汇总量"""
+
+    def __init__(self, engine, catalog, log, families, family_count):
+        self.engine = engine
+        size = len(catalog)
+        if len(log.request_params) * size > MAX_WEIGHT_CELLS:
+            raise ValueError(
+                f"请求参数组合过多（{len(log.request_params)} 组 × {size} 道菜），请把预算按档位取整后再评估"
+            )
+        self.weights = np.zeros((len(log.request_params), size))
+        for r, (weather, budget, min_health, season) in enumerate(log.request_params):
+            hi = int(np.searchsorted(catalog.min_price, budget, side='right'))
+            ids = np.flatnonzero(catalog.health[:hi] >= min_health)
+            self.weights[r, ids] = engine.score(catalog, ids, weather or None, budget, (), season or None)
+        self.total = self.weights.sum(axis=1)
+        self.family_mass = np.zeros((len(log.request_params), family_count))
+        for r in range(len(log.request_params)):
+            self.family_mass[r] = np.bincount(families, weights=self.weights[r], minlength=family_count)
+        self.square = (self.family_mass ** 2).sum(axis=1)
+        # 各行升序排列后加上行号 × offset 拼成一个数组，一次 searchsorted 即可按行计数
+        self.offset = float(self.weights.max()) + 1.0
+        rows = np.arange(len(log.request_params))[:, None] * self.offset
+        self.sorted = (np.sort(self.weights, axis=1) + rows).ravel()
+
+    def count_greater(self, requests, values):
+        """第 requests[i] 行中基础权重大于 values[i] 的菜品数"""
+        size = self.weights.shape[1]
+        right = np.searchsorted(self.sorted, values + requests * self.offset, side='right')
+        return size - (right - requests.astype(np.int64) * size)
+
+
+def policy_engine(params, similarity):
+    """以当前推荐配置为基础、按 params 覆盖参数的打分引擎"""
+    base = fr.get_scoring_engine()
+    kwargs = {name: getattr(base, name) for name in POLICY_PARAMS}
+    unknown = set(params) - set(POLICY_PARAMS)
+    if unknown:
+        raise ValueError(f"未知的策略参数: {', '.join(sorted(unknown))}")
+    kwargs.update(params)
+    return ScoringEngine(similarity=similarity, **kwargs)
+
+
+class Replay:
+    """在一份目录上按多个策略回放事件日志"""
+
+    def __init__(self, catalog, log, policies, k=10, window=fr.RECENT_LIMIT, chunk_events=100_000):
+        self.catalog = catalog
+        self.log = log
+        self.k = k
+        self.window = window
+        self.chunk_events = chunk_events
+        engine = fr.get_scoring_engine()
+        similarity = engine.similarity or DishSimilarity()
+        self.families = catalog.family_codes
+        family_count = int(self.families.max()) + 1 if len(catalog) else 0
+        self.policies = {
+            name: _Policy(policy_engine(params, similarity), catalog, log, self.families, family_count)
+            for name, params in policies.items()
+        }
+        self.params = policies
+        self.family_count = family_count
+        # 每个菜名：解析到的目录编号，以及近期吃过它时受影响的菜（同名菜品 + 相似菜品）
+        self.actual = np.full(len(log.names), -1, dtype=np.int64)
+        ids, similarities, exact, counts = [], [], [], []
+        for code, name in enumerate(log.names):
+            food_id = catalog.resolve_id(name)
+            if food_id is not None:
+                self.actual[code] = food_id
+            same = catalog.ids_for_names([name])
+            similar, similarity_values = similarity.similar_ids(catalog, name)
+            ids.extend((same, similar))
+            similarities.extend((np.ones(len(same)), similarity_values))
+            exact.extend((np.ones(len(same), dtype=bool), np.zeros(len(similar), dtype=bool)))
+            counts.append(len(same) + len(similar))
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.offsets = np.cumsum(self.counts) - self.counts
+        self.ids = np.concatenate(ids).astype(np.int64) if ids else np.empty(0, dtype=np.int64)
+        self.similarities = np.concatenate(similarities) if ids else np.empty(0)
+        self.exact = np.concatenate(exact) if ids else np.empty(0, dtype=bool)
+
+    def _history_rows(self, start, stop):
+        """
+        区间内每条事件的近期记录展开为 (事件, 菜品, 第几天前, 相似度, 是否同名) 行，
+        按 (事件, 菜品) 排序
+        """
+        log = self.log
+        index = np.arange(start, stop)
+        events, ages, names = [], [], []
+        for age in range(1, self.window + 1):
+            valid = index - age >= log.user_start[start:stop]
+            events.append(np.flatnonzero(valid))
+            ages.append(np.full(len(events[-1]), age, dtype=np.int64))
+            names.append(log.foods[index[valid] - age])
+        events, ages, names = np.concatenate(events), np.concatenate(ages), np.concatenate(names)
+        counts = self.counts[names]
+        rows = np.repeat(events, counts)
+        positions = (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+                     + np.repeat(self.offsets[names], counts))
+        keys = rows * len(self.catalog) + self.ids[positions]
+        order = np.argsort(keys, kind='stable')
+        return (keys[order], np.repeat(ages, counts)[order],
+                self.similarities[positions][order], self.exact[positions][order])
+
+    def evaluate_chunk(self, start, stop):
+        """评估 [start, stop) 区间的事件，返回 {策略: [事件数, 命中数, Σ概率, Σ重复率, Σ多样性]}"""
+        size = len(self.catalog)
+        count = stop - start
+        keys, ages, similarities, exact = self._history_rows(start, stop)
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, dtype=np.int64)
+        pair_keys = keys[starts]
+        pair_events = pair_keys // size
+        pair_ids = pair_keys % size
+        pair_exact = np.logical_or.reduceat(exact, starts) if len(keys) else np.empty(0, dtype=bool)
+        requests = self.log.requests[start:stop].astype(np.int64)
+        pair_requests = requests[pair_events]
+        actual = self.actual[self.log.foods[start:stop]]
+        has_actual = actual >= 0
+        actual_ids = np.where(has_actual, actual, 0)
+        actual_keys = np.arange(count) * size + actual_ids
+        actual_pos = np.minimum(np.searchsorted(pair_keys, actual_keys), max(len(pair_keys) - 1, 0))
+        actual_found = (pair_keys[actual_pos] == actual_keys) if len(pair_keys) else np.zeros(count, dtype=bool)
+        family_keys, family_inverse = np.unique(pair_events * self.family_count + self.families[pair_ids],
+                                                return_inverse=True)
+        family_events = family_keys // self.family_count
+        family_codes = family_keys % self.family_count
+
+        results = {}
+        for name, policy in self.policies.items():
+            engine = policy.engine
+            decay = 0.5 ** ((np.arange(self.window + 1) - 1) / engine.recency_half_life)
+            coefficient = np.where(exact, 1.0, engine.similar_penalty * similarities)
+            factors = 1.0 - coefficient * decay[ages]
+            pair_factors = np.minimum.reduceat(factors, starts) if len(keys) else np.empty(0)
+            weights = policy.weights[pair_requests, pair_ids]
+            delta = weights * (1.0 - pair_factors)
+            total = policy.total[requests] - np.bincount(pair_events, delta, minlength=count)
+            old = policy.family_mass[requests[family_events], family_codes]
+            change = np.bincount(family_inverse, delta, minlength=len(family_keys))
+            square = policy.square[requests] - np.bincount(
+                family_events, old ** 2 - (old - change) ** 2, minlength=count)
+            actual_factor = np.where(actual_found, pair_factors[actual_pos] if len(keys) else 1.0, 1.0)
+            target = np.where(has_actual, policy.weights[requests, actual_ids] * actual_factor, 0.0)
+            # 名次：基础权重更大的菜数，减去被近期记录压到目标之下的菜数
+            dropped = (weights > target[pair_events]) & (weights * pair_factors <= target[pair_events])
+            rank = policy.count_greater(requests, target) - np.bincount(pair_events, dropped, minlength=count)
+            repeat = np.bincount(pair_events, np.where(pair_exact, weights * pair_factors, 0.0), minlength=count)
+            valid = has_actual & (total > 1e-12 * np.maximum(policy.total[requests], 1e-300))
+            total = np.where(valid, total, 1.0)
+            results[name] = np.array([
+                valid.sum(),
+                (valid & (target > 0) & (rank < self.k)).sum(),
+                (target / total)[valid].sum(),
+                (repeat / total)[valid].sum(),
+                (1.0 - square / total ** 2)[valid].sum(),
+            ], dtype=np.float64)
+        return results
+
+    def run(self, processes=1):
+        """评估全部事件，processes 不为 1 时用多进程（需要支持 fork 的平台，否则顺序执行）"""
+        global _active_replay
+        chunks = [(start, min(start + self.chunk_events, len(self.log)))
+                  for start in range(0, len(self.log), self.chunk_events)]
+        if processes != 1 and len(chunks) > 1 and 'fork' in multiprocessing.get_all_start_methods():
+            _active_replay = self
+            try:
+                with multiprocessing.get_context('fork').Pool(processes or None) as pool:
+                    parts = pool.starmap(_evaluate_chunk, chunks)
+            finally:
+                _active_replay = None
+        else:
+            parts = [self.evaluate_chunk(start, stop) for start, stop in chunks]
+        report = {}
+        for name in self.policies:
+            events, hits, likelihood, repeat, diversity = sum(
+                (part[name] for part in parts), np.zeros(5))
+            denominator = max(events, 1.0)
+            report[name] = {
+                'params': self.params[name],
+                'events': int(events),
+                f'hit_rate@{self.k}': hits / denominator,
+                'likelihood': likelihood / denominator,
+                'repeat_rate': repeat / denominator,
+                'diversity': diversity / denominator,
+            }
+        return report
+
+
+def _evaluate_chunk(start, stop):
+    return _active_replay.evaluate_chunk(start, stop)
+
+
+def parse_policy(text):
+    """解析 名称[:参数=值,参数=值]"""
+    name, _, spec = text.partition(':')
+    params = {}
+    for item in filter(None, spec.split(',')):
+        key, sep, value = item.partition('=')
+        if not sep:
+            raise argparse.ArgumentTypeError(f"策略参数应为 参数=值: {item}")
+        params[key.strip()] = float(value)
+    return name, params
+
+
+def load_catalog(path):
+    if path is None:
+        return fr.get_food_catalog()
+    if os.path.splitext(path)[1] == '.bin':
+        return open_catalog_file(path)
+    return load_catalog_csv(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="回放饮食记录，离线比较推荐打分策略")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--log', help="事件日志 CSV")
+    source.add_argument('--history-db', help="SQLite 饮食记录库（FOOD_HISTORY_DB）")
+    source.add_argument('--synthetic', type=int, metavar='EVENTS', help="生成指定数量的合成事件")
+    parser.add_argument('--users', type=int, default=1000, help="合成事件的用户数，默认 1000")
+    parser.add_argument('--seed', type=int, default=0, help="合成事件的随机种子")
+    parser.add_argument('--catalog', help="食物目录（foods.csv 或 foods.bin），默认与推荐服务相同")
+    parser.add_argument('--policy', type=parse_policy, action='append',
+                        help="策略 名称[:参数=值,...]，可重复；参数为 " + "、".join(POLICY_PARAMS))
+    parser.add_argument('--k', type=int, default=10, help="hit_rate@k 的 k，默认 10")
+    parser.add_argument('--window', type=int, default=fr.RECENT_LIMIT, help="回放时的近期记录条数")
+    parser.add_argument('--weather', help="日志中没有天气时使用的天气")
+    parser.add_argument('--budget', type=float, help="日志中没有预算时使用的预算，默认为目录中的最高价")
+    parser.add_argument('--min-health', type=int,
+                        help="日志中没有健康度要求时使用的值（默认 1；合成事件默认随机）")
+    parser.add_argument('--processes', type=int, default=1, help="并行进程数，0 表示 CPU 核数")
+    parser.add_argument('--chunk-events', type=int, default=100_000, help="每块的事件数")
+    parser.add_argument('--output', help="结果 JSON 文件，默认输出到标准输出")
+    args = parser.parse_args(argv)
+    logging.getLogger().setLevel(logging.WARNING)
+
+    started = time.perf_counter()
+    catalog = load_catalog(args.catalog)
+    budget = args.budget or float(catalog.min_price.max())
+    if args.log:
+        log = load_log_csv(args.log, args.weather, budget, args.min_health or 1)
+    elif args.history_db:
+        log = load_history_db(args.history_db, args.weather, budget, args.min_health or 1)
+    else:
+        log = synthetic_log(catalog, args.synthetic, args.users, args.weather, args.budget, args.min_health, args.seed)
+    loaded = time.perf_counter()
+    policies = dict(args.policy) if args.policy else DEFAULT_POLICIES
+    report = Replay(catalog, log, policies, args.k, args.window, args.chunk_events).run(args.processes)
+    finished = time.perf_counter()
+    result = {
+        'events': len(log),
+        'users': log.users,
+        'catalog_size': len(catalog),
+        'request_groups': len(log.request_params),
+        'load_seconds': round(loaded - started, 3),
+        'replay_seconds': round(finished - loaded, 3),
+        'policies': report,
+    }
+    text = json.dumps(result, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
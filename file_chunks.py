@@ -0,0 +1,166 @@
+"""
+按范围读取文本文件：用 mmap 只切出需要的字节，单次最多返回 max_bytes 字节，
+其余部分通过续读游标（cursor）分多次读取。供 mcp_server.py 的 get_file_content 使用。
+
+范围可以按字节（offset / length）或按行（start_line / end_line，从 1 开始，含两端）指定；
+切分位置总是落在 UTF-8 字符边界上，按行读取时尽量落在行尾。
+"""
+
+import base64
+import json
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# 单次返回的最大字节数（工具参数 max_bytes 只能在此基础上调小）
+MAX_READ_BYTES = int(os.environ.get('MCP_FILE_MAX_BYTES', 256 << 10))
+# 缓存行起始位置的文件数
+LINE_INDEX_CACHE_SIZE = 8
+# 建立行索引时每次扫描的字节数
+SCAN_BLOCK = 1 << 20
+
+_line_index = OrderedDict()
+_line_index_lock = threading.Lock()
+
+
+class FileChunk:
+    """一次读取的结果：text 为 [start, stop) 字节解码后的文本；cursor 不为 None 时表示还有剩余部分"""
+
+    def __init__(self, text, start, stop, size, cursor=None, lines=None):
+        self.text = text
+        self.start = start
+        self.stop = stop
+        self.size = size
+        self.cursor = cursor
+        # 按行读取时为 (首行, 末行)，否则为 None
+        self.lines = lines
+
+    @property
+    def complete(self):
+        """是否一次读完了整个文件"""
+        return self.cursor is None and self.start == 0 and self.stop == self.size
+
+
+def encode_cursor(stop, end, stamp, by_line):
+    data = json.dumps([stop, end, stamp[0], stamp[1], int(by_line)]).encode('ascii')
+    return base64.urlsafe_b64encode(data).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """解析续读游标，返回 (起点, 终点, 文件状态, 是否按行)"""
+    try:
+        stop, end, size, mtime_ns, by_line = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if not all(isinstance(v, int) for v in (stop, end, size, mtime_ns)) or not 0 <= stop <= end <= size:
+            raise ValueError
+    except (ValueError, TypeError, AttributeError, UnicodeEncodeError):
+        raise ValueError("无效的续读游标") from None
+    return stop, end, (size, mtime_ns), bool(by_line)
+
+
+def _char_start(mm, pos, limit):
+    """把 pos 向后移到 UTF-8 字符的起始字节（最多移动 3 字节）"""
+    for _ in range(3):
+        if pos >= limit or (mm[pos] & 0xC0) != 0x80:
+            break
+        pos += 1
+    return pos
+
+
+def _char_stop(mm, pos, start):
+    """把切分点 pos 向前移到 UTF-8 字符边界（最多移动 3 字节）"""
+    for _ in range(3):
+        if pos <= start or pos >= len(mm) or (mm[pos] & 0xC0) != 0x80:
+            break
+        pos -= 1
+    return pos
+
+
+def line_starts(path, mm, stamp):
+    """
+    各行的起始字节位置（末尾追加文件大小），第 i 行为 [starts[i-1], starts[i])。
+    按 (路径, 文件状态) 缓存；分块扫描，不把整个文件读入内存。
+    """
+    key = (os.path.realpath(path), stamp)
+    with _line_index_lock:
+        starts = _line_index.get(key)
+        if starts is not None:
+            _line_index.move_to_end(key)
+            return starts
+    size = len(mm)
+    blocks = [np.zeros(1, dtype=np.int64)]
+    for pos in range(0, size, SCAN_BLOCK):
+        block = np.frombuffer(mm[pos:pos + SCAN_BLOCK], dtype=np.uint8)
+        blocks.append(np.flatnonzero(block == 10).astype(np.int64) + (pos + 1))
+    starts = np.concatenate(blocks)
+    if starts[-1] != size:
+        starts = np.append(starts, size)
+    with _line_index_lock:
+        _line_index[key] = starts
+        while len(_line_index) > LINE_INDEX_CACHE_SIZE:
+            _line_index.popitem(last=False)
+    return starts
+
+
+def _check_int(name, value, minimum):
+    if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < minimum):
+        raise ValueError(f"{name} 必须是不小于 {minimum} 的整数")
+
+
+def read_chunk(path, offset=None, length=None, start_line=None, end_line=None, cursor=None,
+               max_bytes=None):
+    """
+    读取文件的一段，返回 FileChunk。
+    给出 cursor 时从上次停下的位置继续（忽略其他范围参数），文件在两次读取之间被修改时抛出 ValueError。
+    """
+    for name, value, minimum in (('offset', offset, 0), ('length', length, 0), ('start_line', start_line, 1),
+                                 ('end_line', end_line, 1), ('max_bytes', max_bytes, 1)):
+        _check_int(name, value, minimum)
+    by_line = start_line is not None or end_line is not None
+    if by_line and (offset is not None or length is not None):
+        raise ValueError("不能同时按字节和按行指定范围")
+    if start_line is not None and end_line is not None and end_line < start_line:
+        raise ValueError("end_line 不能小于 start_line")
+    max_bytes = min(max_bytes or MAX_READ_BYTES, MAX_READ_BYTES)
+
+    with open(path, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        size = stat.st_size
+        stamp = (size, stat.st_mtime_ns)
+        if cursor is not None:
+            start, end, cursor_stamp, by_line = decode_cursor(cursor)
+            if cursor_stamp != stamp:
+                raise ValueError("文件在续读之前已被修改，请重新从头读取")
+        if size == 0:
+            # 空文件不能 mmap
+            return FileChunk('', 0, 0, 0, lines=(1, 0) if by_line else None)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            starts = line_starts(path, mm, stamp) if by_line else None
+            if cursor is None:
+                if by_line:
+                    count = len(starts) - 1
+                    start = int(starts[min((start_line or 1) - 1, count)])
+                    end = int(starts[min(end_line or count, count)])
+                else:
+                    start = min(offset or 0, size)
+                    end = size if length is None else _char_stop(mm, min(start + length, size), start)
+                    start = _char_start(mm, start, end)
+            stop = min(end, start + max_bytes)
+            if stop < end:
+                if by_line:
+                    newline = mm.rfind(b'\n', start, stop)
+                    if newline >= 0:
+                        stop = newline + 1
+                stop = _char_stop(mm, stop, start)
+                if stop == start:
+                    # max_bytes 小于一个字符时至少返回一个字符
+                    stop = _char_start(mm, start + 1, end)
+            text = mm[start:stop].decode('utf-8')
+        lines = None
+        if by_line:
+            first = int(np.searchsorted(starts, start, side='right'))
+            lines = (first, int(np.searchsorted(starts, stop - 1, side='right')) if stop > start else first - 1)
+        next_cursor = encode_cursor(stop, end, stamp, by_line) if stop < end else None
+        return FileChunk(text, start, stop, size, next_cursor, lines)
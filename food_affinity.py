@@ -0,0 +1,147 @@
+"""
+“猜你喜欢”的个性化模型：菜品共现矩阵 + 用户标签偏好，随每条饮食记录增量更新。
+"""
+
+import sqlite3
+import threading
+from collections import deque
+
+from food_history import normalize_user
+
+
+class CooccurrenceModel:
+    """
+    保存在 SQLite（WAL 模式）中的稀疏模型：
+    - item_pairs：菜品共现权重。用户吃了 b 时，与其前 window 条记录中的每道菜 a 互相加 1 / 距离
+    - item_counts：每道菜被记录的次数（条件概率的分母，也用于冷启动时的热门菜）
+    - user_tags：每个用户吃过的菜的标签计数
+    (item, weight) 上的索引就是每道菜按权重排好序的候选表，取前 N 个近邻只需一次索引范围扫描；
+    每次更新和查询只涉及 window 条近期记录和 N 个近邻，与累计记录数无关。
+    """
+
+    def __init__(self, path, window=3, neighbors=20):
+        self.path = path
+        self.window = window
+        self.neighbors = neighbors
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS item_pairs ("
+                "item TEXT NOT NULL, other TEXT NOT NULL, weight REAL NOT NULL, "
+                "PRIMARY KEY (item, other)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_item_pairs_rank ON item_pairs (item, weight DESC)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS item_counts ("
+                "item TEXT PRIMARY KEY, count REAL NOT NULL) WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_item_counts_rank ON item_counts (count DESC)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS user_tags ("
+                "user_id TEXT NOT NULL, tag TEXT NOT NULL, count REAL NOT NULL, "
+                "PRIMARY KEY (user_id, tag)) WITHOUT ROWID"
+            )
+
+    def _connect(self):
+        # sqlite3 连接不能跨线程共享，每个线程各用一个
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def record(self, food_name, previous=(), tags=(), user_id=None):
+        """记录一条饮食记录；previous 为该用户在此之前的近期记录（从旧到新）"""
+        self.record_many([(user_id, food_name, previous, tags)])
+
+    def record_many(self, events):
+        """在一个事务中记录多条 (user_id, food_name, previous, tags)"""
+        # 先在内存中合并同一批里重复的键，减少写入行数
+        pairs = {}
+        counts = {}
+        user_tags = {}
+        for user_id, food_name, previous, tags in events:
+            user_id = normalize_user(user_id)
+            recent = list(previous)[-self.window:]
+            for distance, other in enumerate(reversed(recent), 1):
+                if other != food_name:
+                    pairs[food_name, other] = pairs.get((food_name, other), 0.0) + 1.0 / distance
+                    pairs[other, food_name] = pairs.get((other, food_name), 0.0) + 1.0 / distance
+            counts[food_name] = counts.get(food_name, 0) + 1
+            for tag in tags:
+                user_tags[user_id, tag] = user_tags.get((user_id, tag), 0) + 1
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO item_pairs (item, other, weight) VALUES (?, ?, ?) "
+                "ON CONFLICT (item, other) DO UPDATE SET weight = weight + excluded.weight",
+                [(item, other, weight) for (item, other), weight in pairs.items()],
+            )
+            conn.executemany(
+                "INSERT INTO item_counts (item, count) VALUES (?, ?) "
+                "ON CONFLICT (item) DO UPDATE SET count = count + excluded.count",
+                counts.items(),
+            )
+            conn.executemany(
+                "INSERT INTO user_tags (user_id, tag, count) VALUES (?, ?, ?) "
+                "ON CONFLICT (user_id, tag) DO UPDATE SET count = count + excluded.count",
+                [(user_id, tag, count) for (user_id, tag), count in user_tags.items()],
+            )
+
+    def train(self, events, tags_of=None, batch_size=200000):
+        """
+        从历史日志批量学习：events 为按时间顺序排列的 (user_id, food_name)，
+        tags_of(food_name) 返回菜品标签。每个用户的近期窗口在内存中维护。
+        """
+        windows = {}
+        batch = []
+        for user_id, food_name in events:
+            recent = windows.setdefault(user_id, deque(maxlen=self.window))
+            batch.append((user_id, food_name, tuple(recent), tags_of(food_name) if tags_of else ()))
+            recent.append(food_name)
+            if len(batch) >= batch_size:
+                self.record_many(batch)
+                batch = []
+        if batch:
+            self.record_many(batch)
+
+    def related(self, recent, decay=0.5):
+        """
+        与近期记录（从旧到新）共现的菜品 {菜名: 得分}。
+        得分为 Σ decay ** (第几天前 - 1) × 共现权重 / 该近期菜品的记录次数，每道近期菜品只取前 neighbors 个近邻。
+        """
+        scores = {}
+        conn = self._connect()
+        for age, item in enumerate(reversed(list(recent)[-self.window:]), 1):
+            row = conn.execute("SELECT count FROM item_counts WHERE item = ?", (item,)).fetchone()
+            if row is None:
+                continue
+            factor = decay ** (age - 1) / row[0]
+            for other, weight in conn.execute(
+                "SELECT other, weight FROM item_pairs WHERE item = ? ORDER BY weight DESC LIMIT ?",
+                (item, self.neighbors),
+            ):
+                scores[other] = scores.get(other, 0.0) + factor * weight
+        return scores
+
+    def tag_affinity(self, user_id=None):
+        """用户的标签偏好 {标签: 占比}"""
+        user_id = normalize_user(user_id)
+        rows = self._connect().execute(
+            "SELECT tag, count FROM user_tags WHERE user_id = ?", (user_id,)
+        ).fetchall()
+        total = sum(count for _, count in rows)
+        return {tag: count / total for tag, count in rows} if total else {}
+
+    def popular(self, limit=None):
+        """记录次数最多的菜品 [(菜名, 次数)]"""
+        return self._connect().execute(
+            "SELECT item, count FROM item_counts ORDER BY count DESC LIMIT ?", (limit or self.neighbors,)
+        ).fetchall()
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM item_pairs")
+            conn.execute("DELETE FROM item_counts")
+            conn.execute("DELETE FROM user_tags")
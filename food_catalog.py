@@ -0,0 +1,325 @@
+"""
+食物目录：一次构建、按列存储的菜品集合
+"""
+
+import itertools
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from food_names import NameIndex, dish_family
+from food_search import SearchIndex, index_path, source_stamp
+
+# 预置的天气/季节标签，保证标签位的顺序与展示顺序一致
+WEATHER_TAGS = ["晴天", "阴天", "雨天", "炎热", "寒冷", "春季", "夏季", "秋季", "冬季"]
+
+# 适合天气一栏中多个标签之间的分隔符
+TAG_SEPARATORS = r'[,，、/|;；\s]+'
+
+_catalog_versions = itertools.count(1)
+
+_csv_cache = {}
+_csv_cache_lock = threading.Lock()
+
+
+class FoodOption:
+    """食物选项数据结构"""
+    __slots__ = ("name", "min_price", "max_price", "health_rating", "description", "tags")
+
+    def __init__(self, name, min_price, max_price, health_rating, description, tags=None):
+        self.name = name
+        self.min_price = min_price
+        self.max_price = max_price
+        self.health_rating = health_rating
+        self.description = description
+        self.tags = tags or []
+
+
+class TagVocabulary:
+    """标签字典：把标签字符串映射到 uint32 位掩码中的一位"""
+    MAX_TAGS = 32
+
+    def __init__(self, tags=WEATHER_TAGS):
+        self.tags = []
+        self._bits = {}
+        for tag in tags:
+            self.intern(tag)
+
+    def __len__(self):
+        return len(self.tags)
+
+    def intern(self, tag):
+        """返回标签对应的位，新标签会分配下一位"""
+        bit = self._bits.get(tag)
+        if bit is None:
+            if len(self.tags) >= self.MAX_TAGS:
+                raise ValueError(f"标签种类超过 {self.MAX_TAGS} 个: {tag}")
+            bit = np.uint32(1 << len(self.tags))
+            self._bits[tag] = bit
+            self.tags.append(tag)
+        return bit
+
+    def bit(self, tag):
+        """已知标签对应的位，未知标签返回 0"""
+        return self._bits.get(tag, np.uint32(0))
+
+    def encode(self, tags):
+        mask = 0
+        for tag in tags:
+            mask |= int(self.intern(tag))
+        return mask
+
+    def decode(self, mask):
+        mask = int(mask)
+        return [tag for i, tag in enumerate(self.tags) if mask >> i & 1]
+
+
+class StringTable:
+    """UTF-8 字符串表：所有字符串拼接在一块缓冲区里，按偏移量取出"""
+
+    def __init__(self, strings):
+        encoded = [s.encode('utf-8') for s in strings]
+        self.offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=self.offsets[1:])
+        self.data = b''.join(encoded)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode('utf-8')
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+def _as_number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+class FoodCatalog:
+    """
+    按列存储的食物目录。
+    价格、健康度和标签位掩码保存在 NumPy 数组中，菜品名与描述保存在字符串表中。
+    行按最低价格排序，预算条件先用二分查找截取前缀，其余条件合并为一个布尔掩码。
+    """
+
+    def __init__(self, names, descriptions, min_price, max_price, health, tag_mask, vocabulary, aliases=None):
+        self.names = names
+        self.descriptions = descriptions
+        self.min_price = min_price
+        self.max_price = max_price
+        self.health = health
+        self.tag_mask = tag_mask
+        self.vocabulary = vocabulary
+        # 每个目录实例有唯一版本号，供缓存判断目录是否已更换
+        self.version = next(_catalog_versions)
+        # 别名 {别名: 菜名}，与菜名一起建立名称索引
+        self.aliases = aliases or {}
+        # 目录来自二进制文件时为文件路径，用于查找随目录持久化的检索索引
+        self.source_path = None
+        self._name_index = None
+        self._family_codes = None
+        self._search_index = None
+
+    @classmethod
+    def from_columns(cls, names, descriptions, min_price, max_price, health, tag_mask, vocabulary, aliases=None):
+        """由整列数据构建目录，按最低价格（稳定）排序"""
+        min_price = np.asarray(min_price, dtype=np.float64)
+        order = np.argsort(min_price, kind='stable')
+        return cls(
+            names=StringTable([names[i] for i in order]),
+            descriptions=StringTable([descriptions[i] for i in order]),
+            min_price=min_price[order],
+            max_price=np.asarray(max_price, dtype=np.float64)[order],
+            health=np.asarray(health, dtype=np.int8)[order],
+            tag_mask=np.asarray(tag_mask, dtype=np.uint32)[order],
+            vocabulary=vocabulary,
+            aliases=aliases,
+        )
+
+    @classmethod
+    def from_options(cls, options, vocabulary=None, aliases=None):
+        """由 FoodOption 列表构建目录"""
+        vocabulary = vocabulary or TagVocabulary()
+        options = list(options)
+        return cls.from_columns(
+            names=[food.name for food in options],
+            descriptions=[food.description for food in options],
+            min_price=[food.min_price for food in options],
+            max_price=[food.max_price for food in options],
+            health=[food.health_rating for food in options],
+            tag_mask=[vocabulary.encode(food.tags) for food in options],
+            vocabulary=vocabulary,
+            aliases=aliases,
+        )
+
+    def __len__(self):
+        return len(self.min_price)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        """按编号取出一个 FoodOption"""
+        return FoodOption(
+            name=self.names[index],
+            min_price=_as_number(self.min_price[index]),
+            max_price=_as_number(self.max_price[index]),
+            health_rating=int(self.health[index]),
+            description=self.descriptions[index],
+            tags=self.vocabulary.decode(self.tag_mask[index]),
+        )
+
+    @property
+    def name_index(self):
+        """菜名索引，首次使用时构建"""
+        if self._name_index is None:
+            self._name_index = NameIndex(list(self.names), self.aliases)
+        return self._name_index
+
+    @property
+    def search_index(self):
+        """
+        全文检索索引（见 food_search.SearchIndex），首次使用时构建；
+        目录来自二进制文件且同名的 .search.npz 与之匹配时直接加载。
+        """
+        if self._search_index is None:
+            index = None
+            if self.source_path is not None:
+                index = SearchIndex.load(index_path(self.source_path), source_stamp(self.source_path))
+            if index is None or index.rows != len(self):
+                index = SearchIndex.build(self)
+            self._search_index = index
+        return self._search_index
+
+    def search_ids(self, query, limit=10):
+        """按相关度返回匹配查询的菜品编号（菜名、别名、描述、标签、拼音及首字母）"""
+        return self.search_index.search(query, limit, self.health)[0]
+
+    @property
+    def family_codes(self):
+        """每道菜的类别编号（见 food_names.dish_family），首次使用时构建"""
+        if self._family_codes is None:
+            codes = {}
+            self._family_codes = np.fromiter(
+                (codes.setdefault(dish_family(name), len(codes)) for name in self.names),
+                dtype=np.int32, count=len(self),
+            )
+        return self._family_codes
+
+    def resolve_id(self, text):
+        """把输入的菜名（可含别名、“米饭”后缀或个别错字）解析为标准菜品编号，无法确定时返回 None"""
+        return self.name_index.resolve(text)
+
+    def resolve_name(self, text):
+        """把输入的菜名解析为目录中的标准菜名，无法匹配时返回 None"""
+        food_id = self.resolve_id(text)
+        return None if food_id is None else self.names[food_id]
+
+    def suggest_names(self, text, limit=5):
+        """无法唯一确定时与输入只差一个字的候选菜名（见 NameIndex.suggest）"""
+        return [self.names[i] for i in self.name_index.suggest(text, limit)]
+
+    def ids_for_names(self, names):
+        """菜名对应的全部菜品编号（包括重复条目和同一道菜的变体），无法匹配的名称忽略"""
+        names = list(names)
+        if not names:
+            return np.empty(0, dtype=np.int64)
+        index = self.name_index
+        canonical = {index.resolve(name) for name in names}
+        canonical.discard(None)
+        return index.group(sorted(canonical))
+
+    def query_ids(self, budget, min_health, weather=None, exclude_names=()):
+        """
+        筛选符合预算、健康度且不在排除列表中的菜品编号。
+        指定 weather 时优先返回带该标签的菜品，没有匹配则退回不限天气的结果。
+        """
+        hi = int(np.searchsorted(self.min_price, budget, side='right'))
+        mask = self.health[:hi] >= min_health
+        excluded = self.ids_for_names(exclude_names)
+        mask[excluded[excluded < hi]] = False
+        if weather is not None:
+            weather_mask = mask & ((self.tag_mask[:hi] & self.vocabulary.bit(weather)) != 0)
+            if weather_mask.any():
+                mask = weather_mask
+        return np.flatnonzero(mask)
+
+    def query(self, budget, min_health, weather=None, exclude_names=()):
+        """同 query_ids，返回 FoodOption 列表"""
+        return [self[i] for i in self.query_ids(budget, min_health, weather, exclude_names)]
+
+
+def load_catalog_csv(path, vocabulary=None):
+    """
+    从 CSV 整列构建食物目录。
+    列：菜品名、价格（或 最低价格/最高价格）、健康度、备注、适合天气、别名（多个标签/别名用逗号等分隔）。
+    解析结果按文件路径、大小和修改时间缓存，文件未变化时不会重复解析。
+    """
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    stamp = (stat.st_size, stat.st_mtime_ns)
+    with _csv_cache_lock:
+        cached = _csv_cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    catalog = _parse_catalog_csv(path, vocabulary or TagVocabulary())
+    with _csv_cache_lock:
+        _csv_cache[key] = (stamp, catalog)
+    return catalog
+
+
+def _parse_catalog_csv(path, vocabulary):
+    df = pd.read_csv(path, encoding='utf-8', dtype={'菜品名': str, '备注': str, '适合天气': str, '别名': str})
+    if '菜品名' not in df.columns:
+        raise ValueError(f"{path} 缺少列: 菜品名")
+    if '最低价格' in df.columns:
+        min_price = pd.to_numeric(df['最低价格'], errors='coerce')
+        max_price = pd.to_numeric(df['最高价格'], errors='coerce') if '最高价格' in df.columns else min_price
+    elif '价格' in df.columns:
+        min_price = max_price = pd.to_numeric(df['价格'], errors='coerce')
+    else:
+        raise ValueError(f"{path} 缺少列: 价格 或 最低价格")
+    # 没有菜名或价格的行无法参与推荐
+    valid = (df['菜品名'].notna() & min_price.notna()).to_numpy()
+    df = df[valid].reset_index(drop=True)
+    min_price = min_price[valid].to_numpy(dtype=np.float64)
+    max_price = max_price[valid].to_numpy(dtype=np.float64)
+    max_price = np.where(np.isnan(max_price), min_price, max_price)
+
+    if '健康度' in df.columns:
+        health = pd.to_numeric(df['健康度'], errors='coerce').fillna(5).clip(1, 10).to_numpy(dtype=np.int8)
+    else:
+        health = np.full(len(df), 5, dtype=np.int8)
+    descriptions = df['备注'].fillna('').tolist() if '备注' in df.columns else [''] * len(df)
+    aliases = {}
+    if '别名' in df.columns:
+        alias_lists = df['别名'].fillna('').astype(str).str.split(TAG_SEPARATORS, regex=True)
+        for name, alias_list in zip(df['菜品名'], alias_lists):
+            for alias in alias_list:
+                if alias:
+                    aliases.setdefault(alias, name.strip())
+
+    tag_mask = np.zeros(len(df), dtype=np.uint32)
+    if '适合天气' in df.columns:
+        tags = df['适合天气'].fillna('').str.split(TAG_SEPARATORS, regex=True).explode()
+        tags = tags[tags.notna() & (tags != '')]
+        bits = {tag: vocabulary.intern(tag) for tag in tags.unique()}
+        np.bitwise_or.at(tag_mask, tags.index.to_numpy(), tags.map(bits).to_numpy(dtype=np.uint32))
+
+    return FoodCatalog.from_columns(
+        names=df['菜品名'].str.strip().tolist(),
+        descriptions=descriptions,
+        min_price=min_price,
+        max_price=max_price,
+        health=health,
+        tag_mask=tag_mask,
+        vocabulary=vocabulary,
+        aliases=aliases,
+    )
@@ -0,0 +1,230 @@
+"""
+二进制食物目录文件：定长数值列 + 标签位掩码列 + 按偏移量索引的 UTF-8 字符串堆。
+文件以 mmap 只读方式打开，各列直接映射为 NumPy 数组，打开时不解析、不创建 Python 对象；
+同一主机上的多个进程共享同一份页缓存。
+
+    python food_catalog_file.py foods.csv -o foods.bin
+    python food_catalog_file.py --builtin -o foods.bin
+
+编译时同时写入 foods.search.npz（全文检索索引）。
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+from food_catalog import FoodCatalog, StringTable, TagVocabulary, load_catalog_csv
+from food_names import normalize_name
+from food_search import SearchIndex, index_path, source_stamp
+
+# 文件头：魔数、版本、保留、行数、段数；其后是段表，每段 (偏移量, 字节数)
+HEADER = struct.Struct('<4sHHQI4x')
+SECTION = struct.Struct('<QQ')
+MAGIC = b'FCAT'
+VERSION = 1
+# 每段按 8 字节对齐
+ALIGNMENT = 8
+
+# 段的顺序固定；字符串偏移量是相对文件开头的绝对位置，打开后无需再换算
+SECTIONS = (
+    ('min_price', np.float64),
+    ('max_price', np.float64),
+    ('health', np.int8),
+    ('tag_mask', np.uint32),
+    ('name_offsets', np.int64),
+    ('names', None),
+    ('description_offsets', np.int64),
+    ('descriptions', None),
+    ('meta', None),
+)
+
+_open_cache = {}
+_open_cache_lock = threading.Lock()
+
+
+class MappedStringTable(StringTable):
+    """映射在文件中的字符串表：offsets 为文件内绝对偏移，data 为整个 mmap"""
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+
+def _aligned(position):
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _heap(strings):
+    """内存中的字符串表可直接写入，其余（如已映射的文件）重新打包"""
+    return strings if type(strings) is StringTable else StringTable(list(strings))
+
+
+def dedupe_catalog(catalog):
+    """
+    去掉重名菜品（按规范化后的名称比较），返回新目录。
+    目录按最低价格排序，重名时保留最便宜的一条。
+    """
+    names = list(catalog.names)
+    first = {}
+    for i, name in enumerate(names):
+        first.setdefault(normalize_name(name), i)
+    if len(first) == len(names):
+        return catalog
+    keep = np.fromiter(first.values(), dtype=np.int64, count=len(first))
+    descriptions = list(catalog.descriptions)
+    return FoodCatalog(
+        names=StringTable([names[i] for i in keep.tolist()]),
+        descriptions=StringTable([descriptions[i] for i in keep.tolist()]),
+        min_price=catalog.min_price[keep],
+        max_price=catalog.max_price[keep],
+        health=catalog.health[keep],
+        tag_mask=catalog.tag_mask[keep],
+        vocabulary=catalog.vocabulary,
+        aliases=catalog.aliases,
+    )
+
+
+def write_catalog_file(catalog, path):
+    """
+    把目录写成二进制文件（先写临时文件再原子替换，
+    已经映射旧文件的进程不受影响）。
+    """
+    meta = json.dumps(
+        {'tags': catalog.vocabulary.tags, 'aliases': catalog.aliases}, ensure_ascii=False
+    ).encode('utf-8')
+    names = _heap(catalog.names)
+    descriptions = _heap(catalog.descriptions)
+    payloads = {
+        'min_price': np.ascontiguousarray(catalog.min_price, dtype=np.float64),
+        'max_price': np.ascontiguousarray(catalog.max_price, dtype=np.float64),
+        'health': np.ascontiguousarray(catalog.health, dtype=np.int8),
+        'tag_mask': np.ascontiguousarray(catalog.tag_mask, dtype=np.uint32),
+        'names': names.data,
+        'descriptions': descriptions.data,
+        'meta': meta,
+    }
+    # 先排布各段位置，字符串偏移量需要知道字符串堆的起点
+    sizes = {
+        'name_offsets': names.offsets.nbytes,
+        'description_offsets': descriptions.offsets.nbytes,
+    }
+    layout = {}
+    position = _aligned(HEADER.size + SECTION.size * len(SECTIONS))
+    for name, _ in SECTIONS:
+        size = sizes[name] if name in sizes else len(memoryview(payloads[name]).cast('B'))
+        layout[name] = (position, size)
+        position = _aligned(position + size)
+    payloads['name_offsets'] = names.offsets + layout['names'][0]
+    payloads['description_offsets'] = descriptions.offsets + layout['descriptions'][0]
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.catalog_', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(catalog), len(SECTIONS)))
+            for name, _ in SECTIONS:
+                f.write(SECTION.pack(*layout[name]))
+            for name, _ in SECTIONS:
+                f.seek(layout[name][0])
+                f.write(memoryview(payloads[name]).cast('B'))
+            f.truncate(position)
+        # 目录文件供多个进程共享读取
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def open_catalog_file(path):
+    """
+    以 mmap 打开二进制目录文件，返回 FoodCatalog（各列为只读数组）。
+    按文件路径、大小和修改时间缓存，文件被替换后重新映射。
+    """
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    stamp = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    with _open_cache_lock:
+        cached = _open_cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    catalog = _map_catalog(data, path)
+    catalog.source_path = key
+    with _open_cache_lock:
+        _open_cache[key] = (stamp, catalog)
+    return catalog
+
+
+def _map_catalog(data, path):
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path} 不是食物目录文件")
+    magic, version, _, rows, section_count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError(f"{path} 不是食物目录文件")
+    if version != VERSION or section_count != len(SECTIONS):
+        raise ValueError(f"{path} 的目录文件版本不受支持: {version}")
+    columns = {}
+    for k, (name, dtype) in enumerate(SECTIONS):
+        offset, size = SECTION.unpack_from(data, HEADER.size + SECTION.size * k)
+        if offset + size > len(data):
+            raise ValueError(f"{path} 已损坏: {name} 段越界")
+        if dtype is None:
+            columns[name] = (offset, size)
+        else:
+            columns[name] = np.frombuffer(data, dtype=dtype, count=size // np.dtype(dtype).itemsize, offset=offset)
+    meta_offset, meta_size = columns['meta']
+    meta = json.loads(data[meta_offset:meta_offset + meta_size].decode('utf-8'))
+    return FoodCatalog(
+        names=MappedStringTable(data, columns['name_offsets']),
+        descriptions=MappedStringTable(data, columns['description_offsets']),
+        min_price=columns['min_price'],
+        max_price=columns['max_price'],
+        health=columns['health'],
+        tag_mask=columns['tag_mask'],
+        vocabulary=TagVocabulary(meta['tags']),
+        aliases=meta['aliases'],
+    )
+
+
+def compile_catalog(source, path):
+    """
+    把 foods.csv（source 为路径）或已构建的目录编译为二进制文件，重名菜品去重，返回写入的行数。
+    同时在旁边写入全文检索索引（见 food_search.index_path）。
+    """
+    catalog = load_catalog_csv(source) if isinstance(source, str) else source
+    catalog = dedupe_catalog(catalog)
+    write_catalog_file(catalog, path)
+    SearchIndex.build(catalog).save(index_path(path), source_stamp(path))
+    return len(catalog)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="把食物数据编译为可 mmap 的二进制目录文件")
+    parser.add_argument('csv', nargs='?', help="foods.csv 路径")
+    parser.add_argument('--builtin', action='store_true', help="编译内置的食物数据")
+    parser.add_argument('-o', '--output', default='foods.bin', help="输出文件，默认 foods.bin")
+    args = parser.parse_args(argv)
+    if args.builtin == bool(args.csv):
+        parser.error("需要指定 CSV 文件或 --builtin 之一")
+    if args.builtin:
+        from food_recommendation import DISH_ALIASES, builtin_food_options
+        source = FoodCatalog.from_options(builtin_food_options(), aliases=DISH_ALIASES)
+    else:
+        source = args.csv
+    rows = compile_catalog(source, args.output)
+    print(f"已写入 {args.output}：{rows} 道菜", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
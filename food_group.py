@@ -0,0 +1,146 @@
+"""
+团餐点单：在共享预算内为每人选一道不同的菜，满足每人的最低健康度，使总得分最大
+"""
+
+import math
+import numbers
+
+import numpy as np
+
+from food_planner import WEATHER_BONUS
+
+# 动态规划表（候选数 × 人数 × 预算元数）的规模上限：auto 模式超过时改用贪心近似，dp 模式超过时报错
+DP_MAX_CELLS = 20_000_000
+
+
+def _candidates(catalog, budget, people, weather, exclude_names, use_max_price):
+    """
+    筛选候选菜品：按 (健康度, 是否匹配天气) 分档，每档只需保留最便宜的 people 道，
+    因为同档菜品得分相同，任何方案中的同档菜都能换成更便宜的。
+    返回按健康度降序排列的 (编号, 价格, 得分, 健康度)。
+    """
+    prices = catalog.max_price if use_max_price else catalog.min_price
+    hi = int(np.searchsorted(catalog.min_price, budget, side='right'))
+    ids = np.flatnonzero(prices[:hi] <= budget)
+    excluded = catalog.ids_for_names(exclude_names)
+    ids = ids[~np.isin(ids, excluded)]
+    health = catalog.health[ids].astype(np.int64)
+    matched = np.zeros(len(ids), dtype=bool)
+    if weather is not None:
+        matched = (catalog.tag_mask[ids] & catalog.vocabulary.bit(weather)) != 0
+    level = health * 2 + matched
+    order = np.lexsort((prices[ids], -level))
+    level = level[order]
+    group_start = np.flatnonzero(np.r_[True, level[1:] != level[:-1]])
+    rank = np.arange(len(order)) - np.repeat(group_start, np.diff(np.r_[group_start, len(order)]))
+    kept = order[rank < people]
+    return ids[kept], prices[ids[kept]], (health + WEATHER_BONUS * matched)[kept], health[kept]
+
+
+def _solve_dp(prices, values, health, required, budget):
+    """
+    整数元预算上的 0/1 背包：dp[k][c] 为选 k 道、花费 c 元时的最大得分。
+    菜品按健康度降序处理，第 k 道选中的菜分给第 k 严格的人，满足其最低健康度即可。
+    """
+    people = len(required)
+    costs = np.ceil(prices).astype(np.int64)
+    budget = int(math.floor(budget))
+    dp = np.full((people + 1, budget + 1), -np.inf)
+    dp[0, 0] = 0.0
+    take = np.zeros((len(costs), people + 1, budget + 1), dtype=bool)
+    for i in range(len(costs)):
+        cost = costs[i]
+        if cost > budget:
+            continue
+        for k in range(people, 0, -1):
+            if health[i] < required[k - 1]:
+                continue
+            candidate = dp[k - 1, :budget + 1 - cost] + values[i]
+            better = candidate > dp[k, cost:]
+            dp[k, cost:][better] = candidate[better]
+            take[i, k, cost:] = better
+    if not np.isfinite(dp[people]).any():
+        return None
+    # 回溯
+    c = int(np.argmax(dp[people]))
+    k = people
+    chosen = []
+    for i in range(len(costs) - 1, -1, -1):
+        if k == 0:
+            break
+        if take[i, k, c]:
+            chosen.append(i)
+            c -= costs[i]
+            k -= 1
+    return chosen[::-1]
+
+
+def _solve_greedy(prices, values, health, required, budget):
+    """
+    贪心近似：从要求最严格的人开始，每人选得分最高、且给剩下的人预留最低花费后仍买得起的菜。
+    """
+    people = len(required)
+    chosen = []
+    used = np.zeros(len(prices), dtype=bool)
+    spent = 0.0
+    for k in range(people):
+        # 剩下每个人能选到的最便宜的菜（近似预留，不考虑彼此占用）
+        reserve = 0.0
+        for r in required[k + 1:]:
+            feasible = prices[(health >= r) & ~used]
+            if len(feasible) == 0:
+                return None
+            reserve += feasible.min()
+        ok = (health >= required[k]) & ~used & (spent + prices + reserve <= budget)
+        if not ok.any():
+            return None
+        best = np.flatnonzero(ok)
+        best = best[np.lexsort((prices[best], -values[best]))][0]
+        chosen.append(int(best))
+        used[best] = True
+        spent += prices[best]
+    return chosen
+
+
+def optimize_group_order(catalog, min_healths, budget, weather=None, method='auto',
+                         exclude_names=(), use_max_price=False):
+    """
+    为每人（min_healths 中每项是一个人的最低健康度）选一道不同的菜，总价不超过 budget。
+    method：'dp' 为整数元动态规划（精确），'greedy' 为贪心近似，'auto' 在动态规划表不超过 DP_MAX_CELLS 时用 dp。
+    use_max_price 为真时按最高价计算，保证实际花费不超预算。
+    返回与 min_healths 顺序对应的菜品编号列表，无可行方案时返回 None。
+    参数不合法、或 method='dp' 时动态规划表超过 DP_MAX_CELLS，抛出 ValueError。
+    """
+    required = list(min_healths)
+    if not required:
+        raise ValueError("人数必须大于0")
+    if any(isinstance(h, bool) or not isinstance(h, numbers.Real) for h in required):
+        raise ValueError("每人的最低健康度必须是数字")
+    if isinstance(budget, bool) or not isinstance(budget, numbers.Real) or not 0 < budget < math.inf:
+        raise ValueError("预算必须是大于0的数字")
+    if method not in ('auto', 'dp', 'greedy'):
+        raise ValueError(f"未知的求解方式: {method}")
+    ids, prices, values, health = _candidates(catalog, budget, len(required), weather, exclude_names, use_max_price)
+    if method != 'greedy':
+        cells = len(ids) * (len(required) + 1) * (int(budget) + 1)
+        if cells > DP_MAX_CELLS:
+            if method == 'dp':
+                raise ValueError(
+                    f"动态规划表规模 {cells} 超过上限 {DP_MAX_CELLS}，请降低预算、减少人数，或改用 greedy / auto"
+                )
+            method = 'greedy'
+        else:
+            method = 'dp'
+    # 最严格的人排在前面
+    people_order = sorted(range(len(required)), key=lambda p: -required[p])
+    strict = [required[p] for p in people_order]
+    solve = _solve_dp if method == 'dp' else _solve_greedy
+    chosen = solve(prices, values, health, strict, budget)
+    if chosen is None:
+        return None
+    # 健康度高的菜分给要求高的人
+    chosen.sort(key=lambda i: -health[i])
+    assignment = [None] * len(required)
+    for p, i in zip(people_order, chosen):
+        assignment[p] = int(ids[i])
+    return assignment
@@ -0,0 +1,284 @@
+"""
+近期饮食记录存储：可插拔的后端，按用户区分记录。
+默认后端是定长槽位的磁盘环形缓冲区，多用户场景可使用 SQLite（WAL 模式）后端。
+"""
+
+import abc
+import os
+import sqlite3
+import struct
+import threading
+import time
+from urllib.parse import quote, unquote
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，退化为不加锁
+    fcntl = None
+
+# 文件头：魔数、版本、槽位大小、容量、累计写入条数（写指针 = 累计条数 % 容量）
+HEADER = struct.Struct('<4sHHIQ')
+HEADER_SIZE = 32
+MAGIC = b'FRRB'
+VERSION = 1
+# 槽位：2 字节长度 + UTF-8 内容
+SLOT_LENGTH = struct.Struct('<H')
+
+DEFAULT_USER = 'default'
+
+
+def normalize_user(user_id):
+    """统一用户标识：None 表示默认用户，其余转为字符串，各后端据此存取同一份记录"""
+    return DEFAULT_USER if user_id is None else str(user_id)
+
+
+class HistoryBackend(abc.ABC):
+    """
+    饮食记录后端接口，user_id 为 None 时使用默认用户。
+    公开方法先用 normalize_user 统一用户标识，子类实现的 _read / _append_many / _clear 收到的总是字符串，
+    因此切换后端时同一个用户（包括默认用户）对应同一份记录。
+    """
+
+    def read(self, user_id=None):
+        """按从旧到新的顺序返回用户的近期记录"""
+        return self._read(normalize_user(user_id))
+
+    def append(self, food_name, user_id=None):
+        """追加一条记录"""
+        self.append_many([(user_id, food_name)])
+
+    def append_many(self, entries):
+        """批量追加 (user_id, food_name) 记录"""
+        self._append_many([(normalize_user(user_id), food_name) for user_id, food_name in entries])
+
+    def clear(self, user_id=None):
+        """清空用户的记录"""
+        self._clear(normalize_user(user_id))
+
+    @abc.abstractmethod
+    def _read(self, user_id):
+        """按从旧到新的顺序返回 user_id 的近期记录"""
+
+    @abc.abstractmethod
+    def _append_many(self, entries):
+        """按顺序写入 (user_id, food_name) 记录"""
+
+    @abc.abstractmethod
+    def _clear(self, user_id):
+        """清空 user_id 的记录"""
+
+    @abc.abstractmethod
+    def iter_events(self):
+        """按时间顺序遍历所有用户的全部记录 (user_id, food_name)，用于离线训练和回放"""
+
+
+class RingBufferHistory(HistoryBackend):
+    """
+    近期饮食记录的环形缓冲区文件，每个用户一个文件。
+    追加时只写一个槽位和文件头，不重写整个文件；读写都在文件锁内完成，
+    多个进程（命令行、MCP 服务器）同时写入时不会丢失记录。
+    """
+
+    def __init__(self, path, capacity=7, slot_size=128, legacy_path=None):
+        self.path = path
+        self.capacity = capacity
+        self.slot_size = slot_size
+        self.legacy_path = legacy_path
+
+    def _path(self, user_id):
+        if user_id == DEFAULT_USER:
+            return self.path
+        root, ext = os.path.splitext(self.path)
+        return f"{root}.{quote(str(user_id), safe='')}{ext}"
+
+    def _open(self, path, exclusive):
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return fd
+
+    def _read_header(self, fd):
+        data = os.pread(fd, HEADER.size, 0)
+        if len(data) < HEADER.size:
+            return None
+        magic, version, slot_size, capacity, total = HEADER.unpack(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("不是有效的饮食记录文件")
+        return slot_size, capacity, total
+
+    def _write_header(self, fd, slot_size, capacity, total):
+        os.pwrite(fd, HEADER.pack(MAGIC, VERSION, slot_size, capacity, total), 0)
+
+    def _write_slot(self, fd, slot_size, index, food_name):
+        data = food_name.encode('utf-8')[:slot_size - SLOT_LENGTH.size]
+        # 截断时不能留下半个字符
+        data = data.decode('utf-8', 'ignore').encode('utf-8')
+        slot = SLOT_LENGTH.pack(len(data)) + data
+        os.pwrite(fd, slot.ljust(slot_size, b'\0'), HEADER_SIZE + index * slot_size)
+
+    def _legacy_entries(self, user_id):
+        if user_id != DEFAULT_USER or not self.legacy_path or not os.path.exists(self.legacy_path):
+            return []
+        with open(self.legacy_path, 'r', encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
+
+    def _ensure_header(self, fd, user_id):
+        """新文件写入文件头，默认用户还会导入旧版文本记录"""
+        header = self._read_header(fd)
+        if header is not None:
+            return header
+        slot_size, capacity = self.slot_size, self.capacity
+        entries = self._legacy_entries(user_id)[-capacity:]
+        for i, food_name in enumerate(entries):
+            self._write_slot(fd, slot_size, i, food_name)
+        self._write_header(fd, slot_size, capacity, len(entries))
+        return slot_size, capacity, len(entries)
+
+    def _append_many(self, entries):
+        """追加记录，覆盖最旧的槽位；同一用户的记录在一次加锁内写入"""
+        grouped = {}
+        for user_id, food_name in entries:
+            grouped.setdefault(user_id, []).append(food_name)
+        for user_id, food_names in grouped.items():
+            self._append(user_id, food_names)
+
+    def _append(self, user_id, food_names):
+        fd = self._open(self._path(user_id), exclusive=True)
+        try:
+            slot_size, capacity, total = self._ensure_header(fd, user_id)
+            # 先写槽位再更新文件头，中途崩溃最多丢失这一批
+            for food_name in food_names[-capacity:]:
+                self._write_slot(fd, slot_size, total % capacity, food_name)
+                total += 1
+            self._write_header(fd, slot_size, capacity, total)
+        finally:
+            os.close(fd)
+
+    def _read(self, user_id):
+        path = self._path(user_id)
+        if not os.path.exists(path):
+            return self._legacy_entries(user_id)[-self.capacity:]
+        fd = self._open(path, exclusive=False)
+        try:
+            header = self._read_header(fd)
+            if header is None:
+                return self._legacy_entries(user_id)[-self.capacity:]
+            slot_size, capacity, total = header
+            count = min(total, capacity)
+            data = os.pread(fd, capacity * slot_size, HEADER_SIZE)
+        finally:
+            os.close(fd)
+        foods = []
+        for n in range(total - count, total):
+            offset = (n % capacity) * slot_size
+            (length,) = SLOT_LENGTH.unpack_from(data, offset)
+            start = offset + SLOT_LENGTH.size
+            foods.append(data[start:start + length].decode('utf-8'))
+        return foods
+
+    def _user_ids(self):
+        """已有记录文件的用户"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        root, ext = os.path.splitext(os.path.basename(self.path))
+        user_ids = []
+        if os.path.exists(self.path) or self._legacy_entries(DEFAULT_USER):
+            user_ids.append(DEFAULT_USER)
+        for name in sorted(os.listdir(directory)):
+            if name.startswith(root + '.') and name.endswith(ext) and len(name) > len(root) + 1 + len(ext):
+                user_id = unquote(name[len(root) + 1:len(name) - len(ext)])
+                if user_id != DEFAULT_USER:
+                    user_ids.append(user_id)
+        return user_ids
+
+    def iter_events(self):
+        """
+        逐个用户按从旧到新的顺序产生 (user_id, food_name)。
+        环形缓冲区不保存时间戳，各用户之间没有先后顺序，每个用户也只有最近 capacity 条。
+        """
+        for user_id in self._user_ids():
+            for food_name in self._read(user_id):
+                yield user_id, food_name
+
+    def _clear(self, user_id):
+        """清空记录（保留文件，避免其他进程持有的文件失效）"""
+        fd = self._open(self._path(user_id), exclusive=True)
+        try:
+            slot_size, capacity, _ = self._ensure_header(fd, user_id)
+            self._write_header(fd, slot_size, capacity, 0)
+        finally:
+            os.close(fd)
+
+
+class SQLiteHistory(HistoryBackend):
+    """
+    基于 SQLite（WAL 模式）的多用户饮食记录。
+    (user_id, eaten_at) 上建有索引，按用户查询近期记录不受总行数影响；
+    retention_days 指定时，超出保留期的记录在写入该用户时顺带删除。
+    """
+
+    def __init__(self, path, limit=7, retention_days=None):
+        self.path = path
+        self.limit = limit
+        self.retention_days = retention_days
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS recent_foods ("
+                "id INTEGER PRIMARY KEY, user_id TEXT NOT NULL, "
+                "food_name TEXT NOT NULL, eaten_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_recent_foods_user_time "
+                "ON recent_foods (user_id, eaten_at)"
+            )
+
+    def _connect(self):
+        # sqlite3 连接不能跨线程共享，每个线程各用一个
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _cutoff(self):
+        if self.retention_days is None:
+            return None
+        return time.time() - self.retention_days * 86400
+
+    def _read(self, user_id):
+        cutoff = self._cutoff()
+        rows = self._connect().execute(
+            "SELECT food_name FROM recent_foods WHERE user_id = ? AND eaten_at >= ? "
+            "ORDER BY eaten_at DESC, id DESC LIMIT ?",
+            (user_id, cutoff if cutoff is not None else float('-inf'), self.limit),
+        ).fetchall()
+        return [row[0] for row in reversed(rows)]
+
+    def _append_many(self, entries):
+        """在一个事务中批量写入"""
+        now = time.time()
+        rows = [(user_id, food_name, now) for user_id, food_name in entries]
+        cutoff = self._cutoff()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO recent_foods (user_id, food_name, eaten_at) VALUES (?, ?, ?)", rows
+            )
+            if cutoff is not None:
+                conn.executemany(
+                    "DELETE FROM recent_foods WHERE user_id = ? AND eaten_at < ?",
+                    [(user_id, cutoff) for user_id in {row[0] for row in rows}],
+                )
+
+    def _clear(self, user_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM recent_foods WHERE user_id = ?", (user_id,))
+
+    def iter_events(self):
+        # 用单独的连接流式读取，不占用本线程写入用的连接
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield from conn.execute("SELECT user_id, food_name FROM recent_foods ORDER BY eaten_at, id")
+        finally:
+            conn.close()
@@ -0,0 +1,156 @@
+"""
+菜品名称解析：把用户输入的菜名映射到目录中的标准菜品
+"""
+
+import bisect
+import unicodedata
+
+import numpy as np
+
+# 主食后缀：相似度特征中不计入这些字
+STAPLE_SUFFIXES = ("米饭", "套餐")
+
+# 加不加这些后缀都视为同一道菜（如 黄焖鸡 与 黄焖鸡米饭）；
+# “套餐”不在其中：豆腐 与 豆腐套餐 不是同一道菜
+MERGE_SUFFIXES = ("米饭",)
+
+# 模糊匹配（编辑距离 1）只用于不少于这么多字的输入：短菜名差一个字往往就是另一道菜（牛肉饭 / 牛肉面）
+MIN_FUZZY_LENGTH = 4
+# 模糊匹配时前缀、后缀各最多检查的候选数；超过时不做猜测
+MAX_FUZZY_CANDIDATES = 512
+
+
+def normalize_name(text):
+    """统一全角半角、大小写，去掉空白和标点"""
+    text = unicodedata.normalize('NFKC', str(text)).lower()
+    if text.isalnum():
+        return text
+    return ''.join(ch for ch in text if unicodedata.category(ch)[0] not in 'PZSC')
+
+
+def dish_key(name):
+    """同一道菜的归并键：规范化后去掉可省略的后缀（MERGE_SUFFIXES）"""
+    return _strip_staple(normalize_name(name))
+
+
+def _strip_staple(key):
+    for suffix in MERGE_SUFFIXES:
+        if key.endswith(suffix) and len(key) > len(suffix):
+            return key[:-len(suffix)]
+    return key
+
+
+def dish_family(name):
+    """菜品“类别”键：名称末两个字（如 炒饭、拉面、骨汤），同类菜品视为相似"""
+    return name[-2:]
+
+
+def within_one_edit(a, b):
+    """a 与 b 的编辑距离是否不超过 1"""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > 1:
+        return False
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return a[i + 1:] == b[i + 1:]
+    return a[i:] == b[i + 1:]
+
+
+class NameIndex:
+    """
+    菜名索引：规范化后的精确匹配表，加上保守的模糊匹配。
+    每道菜归并到一个标准编号（同一归并键中编号最小的菜），解析结果与排除判断都基于标准编号。
+    依次接受：完全相同、规范化后相同、别名、省略 MERGE_SUFFIXES；
+    都不命中时，不少于 MIN_FUZZY_LENGTH 字的输入可匹配编辑距离为 1 且类别（末两字）相同的菜名，
+    且只在恰好一道菜符合时采用，多道菜符合时由 suggest 给出候选，不做猜测。
+    aliases 为 {别名: 菜名}。
+    """
+
+    def __init__(self, names, aliases=None):
+        self.keys = [normalize_name(name) for name in names]
+        canonical = np.empty(len(self.keys), dtype=np.int64)
+        first = {}
+        for i, key in enumerate(self.keys):
+            canonical[i] = first.setdefault(_strip_staple(key), i)
+        self.canonical = canonical
+        self._exact = dict(zip(reversed(self.keys), reversed(canonical.tolist())))
+        # 归并键本身也能精确命中（如 目录中只有 黄焖鸡米饭 时输入 黄焖鸡）
+        for key, i in first.items():
+            self._exact.setdefault(key, i)
+        for alias, name in (aliases or {}).items():
+            target = self._exact.get(normalize_name(name))
+            if target is not None:
+                self._exact.setdefault(normalize_name(alias), target)
+        # 按标准编号分组，便于取出同一道菜的全部行
+        self._group_order = np.argsort(canonical, kind='stable')
+        self._group_keys = canonical[self._group_order]
+        self._fuzzy = None
+
+    def fuzzy_tables(self):
+        """模糊匹配用的 (排好序的键, 对应编号, 排好序的反转键, 对应编号)，首次使用时构建"""
+        if self._fuzzy is None:
+            keys = list(self._exact)
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            reversed_keys = [key[::-1] for key in keys]
+            reversed_order = sorted(range(len(keys)), key=reversed_keys.__getitem__)
+            self._fuzzy = (
+                [keys[i] for i in order], [self._exact[keys[i]] for i in order],
+                [reversed_keys[i] for i in reversed_order], [self._exact[keys[i]] for i in reversed_order],
+            )
+        return self._fuzzy
+
+    def _near(self, query):
+        """
+        编辑距离为 1 且类别相同的已知名称对应的标准编号集合；候选过多无法确定时返回 None。
+        一处编辑只落在前半或后半，所以候选必定以查询的前半为前缀，或以后半为后缀。
+        """
+        keys, key_ids, reversed_keys, reversed_ids = self.fuzzy_tables()
+        half = len(query) // 2
+        family = dish_family(query)
+        found = set()
+        for table, ids, probe, flip in ((keys, key_ids, query[:half], False),
+                                        (reversed_keys, reversed_ids, query[half:][::-1], True)):
+            lo = bisect.bisect_left(table, probe)
+            hi = bisect.bisect_left(table, probe + '\U0010ffff', lo)
+            if hi - lo > MAX_FUZZY_CANDIDATES:
+                return None
+            for j in range(lo, hi):
+                key = table[j][::-1] if flip else table[j]
+                if dish_family(key) == family and within_one_edit(query, key):
+                    found.add(ids[j])
+        return found
+
+    def resolve(self, text):
+        """把输入解析为标准菜品编号，无法匹配或模糊匹配不唯一时返回 None"""
+        query = normalize_name(text)
+        if not query:
+            return None
+        exact = self._exact.get(query)
+        if exact is not None:
+            return exact
+        exact = self._exact.get(_strip_staple(query))
+        if exact is not None:
+            return exact
+        if len(query) < MIN_FUZZY_LENGTH:
+            return None
+        near = self._near(query)
+        return near.pop() if near is not None and len(near) == 1 else None
+
+    def suggest(self, text, limit=5):
+        """无法确定时的候选：编辑距离为 1 且类别相同的菜品标准编号（升序），最多 limit 个"""
+        query = normalize_name(text)
+        if len(query) < MIN_FUZZY_LENGTH or self._exact.get(query) is not None:
+            return []
+        return sorted(self._near(query) or ())[:limit]
+
+    def group(self, canonical_ids):
+        """标准编号对应的全部菜品编号"""
+        canonical_ids = np.asarray(canonical_ids, dtype=np.int64)
+        lo = np.searchsorted(self._group_keys, canonical_ids, side='left')
+        hi = np.searchsorted(self._group_keys, canonical_ids, side='right')
+        if len(canonical_ids) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self._group_order[a:b] for a, b in zip(lo, hi)])
@@ -0,0 +1,183 @@
+"""
+多日饮食计划：在总预算、平均健康度和每日天气约束下，用分支定界搜索最优组合
+"""
+
+import numpy as np
+
+from food_names import dish_family
+
+# 与当日天气匹配的菜品额外加分
+WEATHER_BONUS = 3
+
+
+def similar_dishes(a, b):
+    """两道菜是否相同或相似（同名、名称互相包含或属于同一类别）"""
+    return a == b or a in b or b in a or dish_family(a) == dish_family(b)
+
+
+class _DayCandidates:
+    """某一天的候选菜品，按得分从高到低、价格从低到高排列"""
+
+    def __init__(self, ids, values, prices, health, families):
+        order = np.lexsort((prices, -values))
+        self.ids = ids[order].tolist()
+        self.values = values[order].tolist()
+        self.prices = prices[order].tolist()
+        self.health = health[order].tolist()
+        self.families = families[order].tolist()
+        self.best_value = self.values[0]
+        self.min_price = min(self.prices)
+        self.max_health = max(self.health)
+
+
+def _day_candidates(catalog, ids, family_codes, family_count, weather, days):
+    """
+    按 (健康度, 是否匹配天气) 分档，每档每个类别只留最便宜的一道，再留最便宜的 days 个类别。
+    同档菜品得分相同，计划最多占用 days 个类别，因此被剪掉的菜品总能被同档更便宜的菜替换，
+    搜索结果仍是最优的（名称互相包含的相似判断不在此列）。
+    """
+    if len(ids) == 0:
+        return None
+    health = catalog.health[ids].astype(np.int64)
+    matched = np.zeros(len(ids), dtype=bool)
+    if weather is not None:
+        matched = (catalog.tag_mask[ids] & catalog.vocabulary.bit(weather)) != 0
+    level = health * 2 + matched
+    families = family_codes[ids]
+    # 行按价格升序排列，np.unique 返回的首次出现位置就是同档同类别中最便宜的
+    _, first = np.unique(level * family_count + families, return_index=True)
+    prices = catalog.min_price[ids]
+    first = first[np.lexsort((prices[first], level[first]))]
+    group_start = np.flatnonzero(np.r_[True, level[first][1:] != level[first][:-1]])
+    rank = np.arange(len(first)) - np.repeat(group_start, np.diff(np.r_[group_start, len(first)]))
+    kept = first[rank < days]
+    return _DayCandidates(
+        ids[kept], (health + WEATHER_BONUS * matched)[kept], prices[kept], health[kept], families[kept]
+    )
+
+
+class PlanResult:
+    """
+    计划搜索的结果。status 为 OPTIMAL（已证明最优）、TRUNCATED（节点数用尽，plan 为目前找到的最好方案，
+    可能为 None）或 INFEASIBLE（没有可行方案，plan 为 None）。
+    """
+
+    OPTIMAL = 'optimal'
+    TRUNCATED = 'truncated'
+    INFEASIBLE = 'infeasible'
+
+    def __init__(self, plan, status):
+        self.plan = plan
+        self.status = status
+
+    @property
+    def truncated(self):
+        return self.status == self.TRUNCATED
+
+
+def plan_meals(catalog, days, total_budget, min_avg_health, weathers=None, history=(), max_nodes=200000):
+    """
+    生成 days 天的饮食计划，返回 PlanResult，其中 plan 为每天的菜品编号列表。
+    约束：最低价格之和不超过 total_budget，平均健康度不低于 min_avg_health，
+    计划内以及与近期记录 history 之间不出现相同或相似的菜品。
+    目标：健康度与天气匹配加分之和最大。weathers 可以是每天一个天气的列表，或所有天共用的一个天气。
+    搜索节点数超过 max_nodes 时停止，返回 TRUNCATED 和已找到的最好方案。
+    """
+    if days <= 0:
+        return PlanResult([], PlanResult.OPTIMAL)
+    if weathers is None or isinstance(weathers, str):
+        weathers = [weathers] * days
+    weathers = list(weathers)[:days] + [None] * (days - len(weathers))
+
+    hi = int(np.searchsorted(catalog.min_price, total_budget, side='right'))
+    names = [catalog.names[i] for i in range(hi)]
+    family_names, family_codes = np.unique([dish_family(name) for name in names] or [''], return_inverse=True)
+    family_codes = family_codes[:hi]
+    history = list(history)
+    history_families = {dish_family(name) for name in history}
+    allowed = ~np.isin(family_names, list(history_families))[family_codes]
+    if history:
+        allowed &= np.array([not any(h in name or name in h for h in history) for name in names], dtype=bool)
+    ids = np.flatnonzero(allowed)
+
+    candidates = []
+    for weather in weathers:
+        day = _day_candidates(catalog, ids, family_codes, len(family_names), weather, days)
+        if day is None:
+            return PlanResult(None, PlanResult.INFEASIBLE)
+        candidates.append(day)
+
+    # 剩余天数的得分上界、最低花费和最高健康度，用于剪枝
+    rest_value = [0] * (days + 1)
+    rest_price = [0.0] * (days + 1)
+    rest_health = [0] * (days + 1)
+    for d in range(days - 1, -1, -1):
+        rest_value[d] = rest_value[d + 1] + candidates[d].best_value
+        rest_price[d] = rest_price[d + 1] + candidates[d].min_price
+        rest_health[d] = rest_health[d + 1] + candidates[d].max_health
+    required_health = min_avg_health * days
+
+    best_value = -1
+    best_plan = None
+    plan = []
+    plan_families = []
+    used_families = set()
+    # 用显式栈代替递归，计划天数很多时也不会超出解释器的递归深度。
+    # 第 d 层记录 [下一个要尝试的候选位置, 前 d 天的得分, 花费, 健康度]
+    stack = [[0, 0, 0.0, 0]]
+    nodes = 0
+    truncated = False
+    while stack:
+        frame = stack[-1]
+        d = len(stack) - 1
+        if d == days:
+            if frame[3] >= required_health and frame[1] > best_value:
+                best_value = frame[1]
+                best_plan = list(plan)
+        else:
+            k, value, spent, health = frame
+            day = candidates[d]
+            chosen = None
+            while k < len(day.ids):
+                nodes += 1
+                if nodes > max_nodes:
+                    truncated = True
+                    break
+                # 候选按得分降序，后面的只会更差
+                if value + day.values[k] + rest_value[d + 1] <= best_value:
+                    break
+                candidate = k
+                k += 1
+                if spent + day.prices[candidate] + rest_price[d + 1] > total_budget:
+                    continue
+                if health + day.health[candidate] + rest_health[d + 1] < required_health:
+                    continue
+                family = day.families[candidate]
+                if family in used_families:
+                    continue
+                name = names[day.ids[candidate]]
+                if any(similar_dishes(name, names[other]) for other in plan):
+                    continue
+                chosen = candidate
+                break
+            if truncated:
+                break
+            if chosen is not None:
+                frame[0] = k
+                plan.append(day.ids[chosen])
+                plan_families.append(day.families[chosen])
+                used_families.add(day.families[chosen])
+                stack.append([0, value + day.values[chosen], spent + day.prices[chosen],
+                              health + day.health[chosen]])
+                continue
+        # 这一天的候选已试完（或已到最后一天），回溯到前一天
+        stack.pop()
+        if stack:
+            plan.pop()
+            used_families.discard(plan_families.pop())
+
+    if truncated:
+        return PlanResult(best_plan, PlanResult.TRUNCATED)
+    if best_plan is None:
+        return PlanResult(None, PlanResult.INFEASIBLE)
+    return PlanResult(best_plan, PlanResult.OPTIMAL)
@@ -1,235 +1,411 @@
-import random
-import time
 import os
+import numbers
 import logging
-import pandas as pd
+import threading
+import numpy as np
+from food_catalog import FoodOption, FoodCatalog, WEATHER_TAGS, load_catalog_csv
+from food_catalog_file import open_catalog_file
+from food_history import RingBufferHistory, SQLiteHistory
+from food_scoring import ScoringEngine, current_season
+from food_similarity import DishSimilarity
+from food_affinity import CooccurrenceModel
+from food_planner import plan_meals
+from food_group import optimize_group_order
+from food_watch import FileWatcher
 
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
-RECENT_FILE = 'recent_foods.txt'
+RECENT_FILE = 'recent_foods.bin'
+# 旧版文本格式的记录，首次使用环形缓冲区时自动导入
+LEGACY_RECENT_FILE = 'recent_foods.txt'
+RECENT_LIMIT = 7
+# 多日饮食计划最多的天数（搜索量随天数增长）
+MAX_PLAN_DAYS = 31
+# 设置 FOOD_HISTORY_DB 后使用 SQLite 多用户记录库，否则使用本地环形缓冲区文件
+HISTORY_DB = os.environ.get('FOOD_HISTORY_DB')
+HISTORY_RETENTION_DAYS = os.environ.get('FOOD_HISTORY_RETENTION_DAYS')
+# 与近期吃过的菜相似的菜品的降权幅度（0-1）；默认 0，只排除同名菜品，设置 FOOD_SIMILAR_PENALTY 后启用
+SIMILAR_PENALTY = float(os.environ.get('FOOD_SIMILAR_PENALTY', '0'))
+# “猜你喜欢”模型（菜品共现与标签偏好）所在的 SQLite 文件；未设置时不启用，记录饮食时也不额外读写
+GUESS_MODEL_DB = os.environ.get('FOOD_GUESS_MODEL_DB')
+# 猜你喜欢中标签偏好相对共现得分的权重
+GUESS_AFFINITY_WEIGHT = 0.5
+CSV_FILE = 'foods.csv'
+# 由 food_catalog_file.py 编译的二进制目录，比 foods.csv 新时优先使用（mmap 打开）
+CATALOG_FILE = 'foods.bin'
+# 长期运行的服务检查 foods.csv / foods.bin 变化的间隔（秒），设为 0 时不热加载
+CATALOG_POLL_INTERVAL = float(os.environ.get('FOOD_CATALOG_POLL_INTERVAL', '2'))
+# 命令行、mcp_server.py 与 mcp-server.js 共用的天气/季节选项
+WEATHER_TYPES = list(WEATHER_TAGS)
+# 内置菜品的常见别名 {别名: 菜名}
+DISH_ALIASES = {
+    "KFC": "肯德基",
+    "开封菜": "肯德基",
+    "金拱门": "麦当劳",
+    "麦记": "麦当劳",
+    "宫爆鸡丁": "宫保鸡丁",
+    "回锅肉片": "回锅肉",
+    "酸菜鱼片": "酸菜鱼",
+}
 
-class FoodOption:
-    """食物选项数据结构"""
-    def __init__(self, name, min_price, max_price, health_rating, description, tags=None):
-        self.name = name
-        self.min_price = min_price
-        self.max_price = max_price
-        self.health_rating = health_rating
-        self.description = description
-        self.tags = tags or []
+_catalog = None
+_catalog_lock = threading.Lock()
+_history = None
+_guess_model = None
+_scoring = ScoringEngine(
+    similarity=DishSimilarity() if SIMILAR_PENALTY > 0 else None, similar_penalty=SIMILAR_PENALTY
+)
+_rng = np.random.default_rng()
+
+def get_food_catalog():
+    """
+    获取进程级缓存的食物目录，首次调用时构建。
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                catalog = load_food_catalog()
+                # 相似度表随目录一起建好，不在推荐请求中构建
+                if _scoring.similarity is not None:
+                    _scoring.similarity.sync(catalog)
+                _catalog = catalog
+    return _catalog
+
+def reload_food_catalog():
+    """丢弃缓存的食物目录和基于它的候选缓存，下次访问时重新构建"""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+        _scoring.clear_cache()
+
+def refresh_food_catalog():
+    """
+    在当前线程加载新的食物目录并预先构建索引，完成后原子替换缓存的目录。
+    正在处理的请求继续使用各自取到的旧目录；加载失败时抛出异常，保留旧目录。
+    """
+    global _catalog
+    catalog = load_food_catalog()
+    if catalog is _catalog:
+        return catalog
+    catalog.name_index.fuzzy_tables()
+    catalog.family_codes
+    catalog.search_index
+    if _scoring.similarity is not None:
+        _scoring.similarity.sync(catalog)
+    with _catalog_lock:
+        _catalog = catalog
+        _scoring.clear_cache()
+    logging.info(f'食物目录已重新加载: {len(catalog)} 道菜')
+    return catalog
+
+def watch_food_catalog(interval=CATALOG_POLL_INTERVAL):
+    """在后台监视 foods.csv 和 foods.bin，变化后自动 refresh_food_catalog，返回 FileWatcher"""
+    return FileWatcher([CSV_FILE, CATALOG_FILE], refresh_food_catalog, interval=interval).start()
 
 def get_food_options():
     """
-    获取食物选项列表。
-    优先从 foods.csv 加载，否则使用内置数据。
+    获取食物选项列表（来自缓存的食物目录）。
+    """
+    return list(get_food_catalog())
+
+def load_food_catalog():
+    """
+    加载食物目录。
+    优先使用不比 foods.csv 旧的 foods.bin，其次从 foods.csv 加载，否则使用内置数据。
     """
-    csv_path = 'foods.csv'
-    if os.path.exists(csv_path):
+    if os.path.exists(CATALOG_FILE) and (
+        not os.path.exists(CSV_FILE) or os.path.getmtime(CATALOG_FILE) >= os.path.getmtime(CSV_FILE)
+    ):
+        logging.info('从 foods.bin 映射食物数据...')
+        return open_catalog_file(CATALOG_FILE)
+    if os.path.exists(CSV_FILE):
         logging.info('从 foods.csv 加载食物数据...')
-        df = pd.read_csv(csv_path, encoding='utf-8')
-        options = []
-        for _, row in df.iterrows():
-            options.append(FoodOption(
-                name=row['菜品名'],
-                min_price=row['价格'],
-                max_price=row['价格'],
-                health_rating=row.get('健康度', 5),
-                description=row.get('备注', ''),
-                tags=[str(row.get('适合天气', ''))]
-            ))
-        return options
-    else:
-        logging.info('使用内置食物数据...')
-        return [
-            # 中式炒菜/快餐类
-            FoodOption("青椒肉丝", 22, 32, 7, "清淡可口，营养均衡", ["晴天", "炎热", "春季", "夏季"]),
-            FoodOption("宫保鸡丁", 25, 35, 6, "经典川菜，荤素搭配", ["晴天", "秋季", "冬季"]),
-            FoodOption("鱼香肉丝", 25, 35, 6, "经典川菜，适中搭配", ["晴天", "春季", "秋季"]),
-            FoodOption("糖醋里脊", 28, 38, 5, "口感酸甜，适量食用", ["晴天", "春季", "夏季"]),
-            FoodOption("麻婆豆腐", 20, 30, 7, "高蛋白低脂，开胃下饭", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("回锅肉", 30, 40, 4, "重口味，高脂肪", ["阴天", "雨天", "冬季"]),
-            FoodOption("黄焖鸡米饭", 20, 30, 6, "蛋白质搭配碳水，稍油腻", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("酸菜鱼", 35, 40, 8, "酸爽可口，蛋白质丰富", ["阴天", "雨天", "冬季"]),
-            FoodOption("水煮鱼", 35, 40, 8, "富含蛋白质，适量辣味开胃", ["阴天", "雨天", "冬季"]),
-            FoodOption("麻辣香锅", 30, 40, 4, "口感丰富，但油量较大", ["阴天", "雨天", "冬季"]),
-            
-            # 快餐/西式
-            FoodOption("三明治", 20, 30, 6, "便携快捷，营养尚可", ["晴天", "炎热", "春季", "夏季"]),
-            FoodOption("墨西哥卷饼", 25, 35, 6, "蔬菜肉类均衡搭配", ["晴天", "春季", "夏季"]),
-            FoodOption("意大利面", 30, 40, 5, "碳水为主，酱料决定健康度", ["晴天", "春季", "秋季"]),
-            FoodOption("炸鸡汉堡", 25, 35, 3, "高热量，碳水蛋白质为主", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("披萨", 30, 40, 4, "奶酪提供钙质，但热量较高", ["阴天", "雨天", "冬季"]),
-            FoodOption("肯德基", 25, 35, 2, "高热量，高脂肪", ["阴天", "雨天", "冬季"]),
-            FoodOption("麦当劳", 25, 35, 2, "高热量，高脂肪", ["阴天", "雨天", "冬季"]),
-            FoodOption("烤肉拼盘", 35, 40, 4, "高蛋白，但要注意脂肪", ["阴天", "雨天", "冬季"]),
-            
-            # 日韩料理
-            FoodOption("寿司", 30, 40, 7, "生鱼片富含蛋白质和omega-3", ["晴天", "炎热", "春季", "夏季"]),
-            FoodOption("拉面", 25, 35, 5, "汤底营养，面食为主", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("韩式炸鸡", 30, 40, 3, "口感极佳，但高热量", ["阴天", "雨天", "冬季"]),
-            FoodOption("石锅拌饭", 30, 40, 8, "营养均衡，种类丰富", ["晴天", "春季", "秋季"]),
-            FoodOption("寿喜烧", 35, 40, 7, "肉类蔬菜搭配均衡", ["阴天", "雨天", "冬季"]),
-            FoodOption("天妇罗", 30, 40, 4, "油炸食品，偶尔食用", ["晴天", "春季", "夏季"]),
-            FoodOption("韩式部队锅", 35, 40, 5, "口感浓郁，注意钠含量", ["阴天", "雨天", "冬季"]),
-            FoodOption("冷面", 25, 35, 7, "低热量，清爽开胃", ["晴天", "炎热", "夏季"]),
-            
-            # 火锅/烧烤
-            FoodOption("火锅外卖", 35, 40, 5, "食材多样，可荤可素", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("烤肉", 35, 40, 4, "高蛋白，注意脂肪", ["阴天", "雨天", "冬季"]),
-            FoodOption("串串香", 25, 35, 4, "品种丰富，油盐偏高", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("麻辣烫", 20, 30, 5, "食材多样，但油盐偏高", ["阴天", "雨天", "秋季", "冬季"]),
-            
-            # 面食/米饭类
-            FoodOption("兰州拉面", 20, 30, 6, "面食为主，汤料营养", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("炸酱面", 20, 30, 5, "传统面食，口感浓郁", ["晴天", "春季", "秋季"]),
-            FoodOption("扬州炒饭", 20, 30, 6, "蛋白质碳水均衡", ["晴天", "春季", "秋季"]),
-            FoodOption("螺蛳粉", 25, 35, 4, "重口味，营养适中", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("酸辣粉", 20, 30, 4, "开胃爽口，注意辣度", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("重庆小面", 20, 30, 5, "面食为主，调味适中", ["晴天", "春季", "秋季"]),
-            FoodOption("牛肉面", 25, 35, 7, "优质蛋白，汤料滋补", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("粤式炒饭", 25, 35, 6, "粮油适中，配料丰富", ["晴天", "春季", "秋季"]),
-            
-            # 健康轻食
-            FoodOption("凉皮", 20, 30, 7, "低脂肪，碳水适中", ["晴天", "炎热", "夏季"]),
-            FoodOption("沙拉", 25, 35, 9, "富含膳食纤维和维生素", ["晴天", "炎热", "春季", "夏季"]),
-            FoodOption("水果捞", 20, 30, 9, "维生素充足，新鲜健康", ["晴天", "炎热", "夏季"]),
-            FoodOption("鸡胸肉饭", 25, 35, 9, "高蛋白低脂，健身首选", ["晴天", "春季", "秋季"]),
-            FoodOption("藜麦鸡肉碗", 30, 40, 9, "超级食物，营养全面", ["晴天", "春季", "秋季"]),
-            FoodOption("蔬菜汤面", 20, 30, 8, "低热量，营养均衡", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("杂粮饭", 20, 30, 8, "膳食纤维丰富，营养均衡", ["晴天", "春季", "秋季"]),
-            FoodOption("豆腐套餐", 20, 30, 8, "植物蛋白，低脂健康", ["晴天", "春季", "秋季"]),
-            
-            # 特色小吃
-            FoodOption("肠粉", 20, 30, 6, "口感滑嫩，早餐优选", ["晴天", "春季", "夏季"]),
-            FoodOption("煎饼果子", 20, 30, 5, "传统小吃，早餐首选", ["晴天", "春季", "夏季"]),
-            FoodOption("生煎包", 20, 30, 5, "口感独特，适量食用", ["晴天", "春季", "秋季"]),
-            FoodOption("锅贴", 20, 30, 5, "外酥内软，经典小吃", ["晴天", "春季", "秋季"]),
-            FoodOption("饺子", 25, 35, 6, "传统美食，营养可控", ["晴天", "春季", "秋季"]),
-            FoodOption("馄饨", 20, 30, 6, "清淡营养，开胃可口", ["晴天", "春季", "秋季"]),
-            
-            # 新增食物 - 中式炒菜
-            FoodOption("蒜蓉西兰花", 20, 30, 8, "高纤维，维生素丰富", ["晴天", "炎热", "春季", "夏季"]),
-            FoodOption("红烧茄子", 20, 30, 6, "软糯可口，下饭神器", ["晴天", "春季", "秋季"]),
-            FoodOption("干煸豆角", 20, 30, 7, "香辣开胃，营养均衡", ["晴天", "春季", "秋季"]),
-            FoodOption("醋溜白菜", 20, 30, 8, "清爽解腻，维生素C丰富", ["晴天", "炎热", "春季", "夏季"]),
-            FoodOption("蒜苗炒肉", 25, 35, 7, "荤素搭配，营养丰富", ["晴天", "春季", "秋季"]),
-            FoodOption("韭菜炒蛋", 20, 30, 7, "蛋白质丰富，开胃下饭", ["晴天", "春季", "秋季"]),
-            FoodOption("蒜苔炒肉", 25, 35, 7, "清脆爽口，营养均衡", ["晴天", "春季", "夏季"]),
-            FoodOption("清炒小白菜", 20, 30, 8, "清淡爽口，维生素丰富", ["晴天", "炎热", "春季", "夏季"]),
-            FoodOption("红烧豆腐", 20, 30, 8, "植物蛋白，低脂健康", ["晴天", "春季", "秋季"]),
-            FoodOption("蒜蓉空心菜", 20, 30, 8, "清热解暑，纤维丰富", ["晴天", "炎热", "夏季"]),
-            
-            # 新增食物 - 西式简餐
-            FoodOption("凯撒沙拉", 25, 35, 8, "经典西式沙拉，营养均衡", ["晴天", "炎热", "春季", "夏季"]),
-            FoodOption("意式通心粉", 25, 35, 6, "口感丰富，酱料浓郁", ["晴天", "春季", "秋季"]),
-            FoodOption("法式吐司", 20, 30, 5, "香甜可口，早餐优选", ["晴天", "春季", "夏季"]),
-            FoodOption("美式汉堡", 25, 35, 4, "经典美式快餐", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("希腊沙拉", 25, 35, 9, "地中海风味，健康美味", ["晴天", "炎热", "夏季"]),
-            FoodOption("意式千层面", 30, 40, 5, "层次丰富，口感浓郁", ["阴天", "雨天", "冬季"]),
-            FoodOption("法式可颂", 20, 30, 4, "酥脆可口，早餐首选", ["晴天", "春季", "夏季"]),
-            FoodOption("美式热狗", 20, 30, 3, "经典美式小吃", ["阴天", "雨天", "秋季", "冬季"]),
-            
-            # 新增食物 - 日韩料理
-            FoodOption("日式咖喱饭", 25, 35, 6, "浓郁咖喱，营养丰富", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("韩式泡菜汤", 25, 35, 7, "酸辣开胃，益生菌丰富", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("日式乌冬面", 25, 35, 6, "滑嫩爽口，汤底鲜美", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("韩式辣炒年糕", 25, 35, 5, "甜辣可口，口感独特", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("日式茶泡饭", 20, 30, 7, "清淡养生，日式传统", ["晴天", "春季", "夏季"]),
-            FoodOption("韩式海带汤", 20, 30, 8, "营养丰富，韩式传统", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("日式亲子丼", 25, 35, 7, "鸡肉鸡蛋，营养均衡", ["晴天", "春季", "秋季"]),
-            FoodOption("韩式拌饭", 25, 35, 8, "蔬菜丰富，营养全面", ["晴天", "春季", "秋季"]),
-            
-            # 新增食物 - 东南亚料理
-            FoodOption("泰式炒河粉", 25, 35, 6, "酸甜辣香，口感丰富", ["晴天", "春季", "夏季"]),
-            FoodOption("越南春卷", 20, 30, 8, "清爽可口，低脂健康", ["晴天", "炎热", "夏季"]),
-            FoodOption("新加坡炒米粉", 25, 35, 6, "海鲜味浓，口感丰富", ["晴天", "春季", "夏季"]),
-            FoodOption("马来西亚咖喱", 25, 35, 6, "椰香浓郁，口感丰富", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("泰式青咖喱", 25, 35, 7, "清香微辣，营养丰富", ["晴天", "春季", "夏季"]),
-            FoodOption("越南河粉", 25, 35, 7, "清淡鲜美，营养均衡", ["晴天", "春季", "夏季"]),
-            
-            # 新增食物 - 面食类
-            FoodOption("阳春面", 20, 30, 6, "清淡爽口，传统面食", ["晴天", "春季", "夏季"]),
-            FoodOption("担担面", 25, 35, 5, "麻辣鲜香，川式经典", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("热干面", 20, 30, 5, "芝麻香浓，武汉特色", ["晴天", "春季", "秋季"]),
-            FoodOption("刀削面", 25, 35, 6, "口感独特，山西特色", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("炸酱面", 20, 30, 5, "传统面食，口感浓郁", ["晴天", "春季", "秋季"]),
-            FoodOption("臊子面", 25, 35, 6, "配料丰富，陕西特色", ["晴天", "春季", "秋季"]),
-            
-            # 新增食物 - 米饭类
-            FoodOption("蛋炒饭", 20, 30, 6, "经典炒饭，简单美味", ["晴天", "春季", "秋季"]),
-            FoodOption("扬州炒饭", 20, 30, 6, "蛋白质碳水均衡", ["晴天", "春季", "秋季"]),
-            FoodOption("咖喱炒饭", 25, 35, 5, "咖喱香浓，口感丰富", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("菠萝炒饭", 25, 35, 6, "酸甜可口，营养丰富", ["晴天", "春季", "夏季"]),
-            FoodOption("海鲜炒饭", 30, 40, 7, "海鲜鲜美，营养丰富", ["晴天", "春季", "夏季"]),
-            FoodOption("鸡肉炒饭", 25, 35, 7, "蛋白质丰富，营养均衡", ["晴天", "春季", "秋季"]),
-            
-            # 新增食物 - 汤类
-            FoodOption("紫菜蛋花汤", 20, 30, 7, "清淡鲜美，营养丰富", ["晴天", "春季", "夏季"]),
-            FoodOption("番茄蛋汤", 20, 30, 8, "维生素丰富，开胃爽口", ["晴天", "炎热", "夏季"]),
-            FoodOption("冬瓜排骨汤", 25, 35, 8, "清热解暑，营养丰富", ["晴天", "炎热", "夏季"]),
-            FoodOption("玉米排骨汤", 25, 35, 8, "香甜可口，营养丰富", ["晴天", "春季", "秋季"]),
-            FoodOption("萝卜排骨汤", 25, 35, 8, "滋补养生，冬季首选", ["阴天", "雨天", "冬季"]),
-            FoodOption("莲藕排骨汤", 25, 35, 8, "滋补养生，秋季佳品", ["阴天", "雨天", "秋季"]),
-            
-            # 新增食物 - 健康轻食
-            FoodOption("藜麦沙拉", 25, 35, 9, "超级食物，营养全面", ["晴天", "炎热", "春季", "夏季"]),
-            FoodOption("鸡胸肉沙拉", 25, 35, 9, "高蛋白低脂，健身首选", ["晴天", "春季", "秋季"]),
-            FoodOption("三文鱼沙拉", 30, 40, 9, "omega-3丰富，营养全面", ["晴天", "炎热", "春季", "夏季"]),
-            FoodOption("牛油果沙拉", 25, 35, 9, "健康脂肪，营养丰富", ["晴天", "炎热", "春季", "夏季"]),
-            FoodOption("希腊酸奶", 20, 30, 9, "蛋白质丰富，益生菌", ["晴天", "炎热", "春季", "夏季"]),
-            FoodOption("燕麦粥", 20, 30, 9, "膳食纤维丰富，早餐首选", ["阴天", "雨天", "秋季", "冬季"]),
-            
-            # 新增食物 - 特色小吃
-            FoodOption("小笼包", 25, 35, 6, "汤汁丰富，上海特色", ["晴天", "春季", "秋季"]),
-            FoodOption("灌汤包", 25, 35, 6, "汤汁浓郁，口感独特", ["晴天", "春季", "秋季"]),
-            FoodOption("烧卖", 20, 30, 6, "糯米香浓，广式特色", ["晴天", "春季", "秋季"]),
-            FoodOption("叉烧包", 20, 30, 5, "甜咸适中，广式经典", ["晴天", "春季", "秋季"]),
-            FoodOption("奶黄包", 20, 30, 4, "香甜可口，早餐优选", ["晴天", "春季", "夏季"]),
-            FoodOption("豆沙包", 20, 30, 5, "传统甜点，营养丰富", ["晴天", "春季", "秋季"]),
-            
-            # 新增食物 - 甜品饮品
-            FoodOption("双皮奶", 20, 30, 6, "滑嫩香甜，广式甜品", ["晴天", "炎热", "夏季"]),
-            FoodOption("杨枝甘露", 25, 35, 7, "清爽解暑，港式甜品", ["晴天", "炎热", "夏季"]),
-            FoodOption("红豆沙", 20, 30, 7, "传统甜品，营养丰富", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("绿豆汤", 20, 30, 8, "清热解暑，夏季必备", ["晴天", "炎热", "夏季"]),
-            FoodOption("银耳莲子汤", 20, 30, 8, "滋补养生，美容养颜", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("冰糖雪梨", 20, 30, 8, "润肺止咳，秋季佳品", ["阴天", "雨天", "秋季"]),
-            
-            # 新增食物 - 素食类
-            FoodOption("素炒三丝", 20, 30, 8, "蔬菜丰富，营养均衡", ["晴天", "炎热", "春季", "夏季"]),
-            FoodOption("素炒豆芽", 20, 30, 8, "清脆爽口，维生素丰富", ["晴天", "炎热", "春季", "夏季"]),
-            FoodOption("素炒青菜", 20, 30, 9, "清淡爽口，纤维丰富", ["晴天", "炎热", "春季", "夏季"]),
-            FoodOption("素炒茄子", 20, 30, 7, "软糯可口，营养丰富", ["晴天", "春季", "秋季"]),
-            FoodOption("素炒豆腐", 20, 30, 8, "植物蛋白，低脂健康", ["晴天", "春季", "秋季"]),
-            FoodOption("素炒蘑菇", 25, 35, 8, "菌类营养，口感丰富", ["晴天", "春季", "秋季"]),
-            
-            # 新增食物 - 特色菜系
-            FoodOption("白切鸡", 30, 40, 8, "清淡鲜美，粤式经典", ["晴天", "春季", "夏季"]),
-            FoodOption("口水鸡", 25, 35, 6, "麻辣鲜香，川式经典", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("叫花鸡", 30, 40, 7, "香气四溢，江南特色", ["晴天", "春季", "秋季"]),
-            FoodOption("盐焗鸡", 30, 40, 7, "咸香可口，客家特色", ["晴天", "春季", "秋季"]),
-            FoodOption("辣子鸡", 25, 35, 5, "麻辣鲜香，川式经典", ["阴天", "雨天", "秋季", "冬季"]),
-            FoodOption("黄焖鸡", 25, 35, 6, "软烂入味，营养丰富", ["阴天", "雨天", "秋季", "冬季"])
-        ]
+        return load_catalog_csv(CSV_FILE)
+    logging.info('使用内置食物数据...')
+    return FoodCatalog.from_options(builtin_food_options(), aliases=DISH_ALIASES)
 
-def read_recent_foods():
-    if not os.path.exists(RECENT_FILE):
-        return []
-    with open(RECENT_FILE, 'r', encoding='utf-8') as f:
-        return [line.strip() for line in f if line.strip()]
+def builtin_food_options():
+    """内置的食物选项列表"""
+    return [
+        # 中式炒菜/快餐类
+        FoodOption("青椒肉丝", 22, 32, 7, "清淡可口，营养均衡", ["晴天", "炎热", "春季", "夏季"]),
+        FoodOption("宫保鸡丁", 25, 35, 6, "经典川菜，荤素搭配", ["晴天", "秋季", "冬季"]),
+        FoodOption("鱼香肉丝", 25, 35, 6, "经典川菜，适中搭配", ["晴天", "春季", "秋季"]),
+        FoodOption("糖醋里脊", 28, 38, 5, "口感酸甜，适量食用", ["晴天", "春季", "夏季"]),
+        FoodOption("麻婆豆腐", 20, 30, 7, "高蛋白低脂，开胃下饭", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("回锅肉", 30, 40, 4, "重口味，高脂肪", ["阴天", "雨天", "冬季"]),
+        FoodOption("黄焖鸡米饭", 20, 30, 6, "蛋白质搭配碳水，稍油腻", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("酸菜鱼", 35, 40, 8, "酸爽可口，蛋白质丰富", ["阴天", "雨天", "冬季"]),
+        FoodOption("水煮鱼", 35, 40, 8, "富含蛋白质，适量辣味开胃", ["阴天", "雨天", "冬季"]),
+        FoodOption("麻辣香锅", 30, 40, 4, "口感丰富，但油量较大", ["阴天", "雨天", "冬季"]),
+        
+        # 快餐/西式
+        FoodOption("三明治", 20, 30, 6, "便携快捷，营养尚可", ["晴天", "炎热", "春季", "夏季"]),
+        FoodOption("墨西哥卷饼", 25, 35, 6, "蔬菜肉类均衡搭配", ["晴天", "春季", "夏季"]),
+        FoodOption("意大利面", 30, 40, 5, "碳水为主，酱料决定健康度", ["晴天", "春季", "秋季"]),
+        FoodOption("炸鸡汉堡", 25, 35, 3, "高热量，碳水蛋白质为主", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("披萨", 30, 40, 4, "奶酪提供钙质，但热量较高", ["阴天", "雨天", "冬季"]),
+        FoodOption("肯德基", 25, 35, 2, "高热量，高脂肪", ["阴天", "雨天", "冬季"]),
+        FoodOption("麦当劳", 25, 35, 2, "高热量，高脂肪", ["阴天", "雨天", "冬季"]),
+        FoodOption("烤肉拼盘", 35, 40, 4, "高蛋白，但要注意脂肪", ["阴天", "雨天", "冬季"]),
+        
+        # 日韩料理
+        FoodOption("寿司", 30, 40, 7, "生鱼片富含蛋白质和omega-3", ["晴天", "炎热", "春季", "夏季"]),
+        FoodOption("拉面", 25, 35, 5, "汤底营养，面食为主", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("韩式炸鸡", 30, 40, 3, "口感极佳，但高热量", ["阴天", "雨天", "冬季"]),
+        FoodOption("石锅拌饭", 30, 40, 8, "营养均衡，种类丰富", ["晴天", "春季", "秋季"]),
+        FoodOption("寿喜烧", 35, 40, 7, "肉类蔬菜搭配均衡", ["阴天", "雨天", "冬季"]),
+        FoodOption("天妇罗", 30, 40, 4, "油炸食品，偶尔食用", ["晴天", "春季", "夏季"]),
+        FoodOption("韩式部队锅", 35, 40, 5, "口感浓郁，注意钠含量", ["阴天", "雨天", "冬季"]),
+        FoodOption("冷面", 25, 35, 7, "低热量，清爽开胃", ["晴天", "炎热", "夏季"]),
+        
+        # 火锅/烧烤
+        FoodOption("火锅外卖", 35, 40, 5, "食材多样，可荤可素", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("烤肉", 35, 40, 4, "高蛋白，注意脂肪", ["阴天", "雨天", "冬季"]),
+        FoodOption("串串香", 25, 35, 4, "品种丰富，油盐偏高", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("麻辣烫", 20, 30, 5, "食材多样，但油盐偏高", ["阴天", "雨天", "秋季", "冬季"]),
+        
+        # 面食/米饭类
+        FoodOption("兰州拉面", 20, 30, 6, "面食为主，汤料营养", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("炸酱面", 20, 30, 5, "传统面食，口感浓郁", ["晴天", "春季", "秋季"]),
+        FoodOption("扬州炒饭", 20, 30, 6, "蛋白质碳水均衡", ["晴天", "春季", "秋季"]),
+        FoodOption("螺蛳粉", 25, 35, 4, "重口味，营养适中", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("酸辣粉", 20, 30, 4, "开胃爽口，注意辣度", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("重庆小面", 20, 30, 5, "面食为主，调味适中", ["晴天", "春季", "秋季"]),
+        FoodOption("牛肉面", 25, 35, 7, "优质蛋白，汤料滋补", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("粤式炒饭", 25, 35, 6, "粮油适中，配料丰富", ["晴天", "春季", "秋季"]),
+        
+        # 健康轻食
+        FoodOption("凉皮", 20, 30, 7, "低脂肪，碳水适中", ["晴天", "炎热", "夏季"]),
+        FoodOption("沙拉", 25, 35, 9, "富含膳食纤维和维生素", ["晴天", "炎热", "春季", "夏季"]),
+        FoodOption("水果捞", 20, 30, 9, "维生素充足，新鲜健康", ["晴天", "炎热", "夏季"]),
+        FoodOption("鸡胸肉饭", 25, 35, 9, "高蛋白低脂，健身首选", ["晴天", "春季", "秋季"]),
+        FoodOption("藜麦鸡肉碗", 30, 40, 9, "超级食物，营养全面", ["晴天", "春季", "秋季"]),
+        FoodOption("蔬菜汤面", 20, 30, 8, "低热量，营养均衡", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("杂粮饭", 20, 30, 8, "膳食纤维丰富，营养均衡", ["晴天", "春季", "秋季"]),
+        FoodOption("豆腐套餐", 20, 30, 8, "植物蛋白，低脂健康", ["晴天", "春季", "秋季"]),
+        
+        # 特色小吃
+        FoodOption("肠粉", 20, 30, 6, "口感滑嫩，早餐优选", ["晴天", "春季", "夏季"]),
+        FoodOption("煎饼果子", 20, 30, 5, "传统小吃，早餐首选", ["晴天", "春季", "夏季"]),
+        FoodOption("生煎包", 20, 30, 5, "口感独特，适量食用", ["晴天", "春季", "秋季"]),
+        FoodOption("锅贴", 20, 30, 5, "外酥内软，经典小吃", ["晴天", "春季", "秋季"]),
+        FoodOption("饺子", 25, 35, 6, "传统美食，营养可控", ["晴天", "春季", "秋季"]),
+        FoodOption("馄饨", 20, 30, 6, "清淡营养，开胃可口", ["晴天", "春季", "秋季"]),
+        
+        # 新增食物 - 中式炒菜
+        FoodOption("蒜蓉西兰花", 20, 30, 8, "高纤维，维生素丰富", ["晴天", "炎热", "春季", "夏季"]),
+        FoodOption("红烧茄子", 20, 30, 6, "软糯可口，下饭神器", ["晴天", "春季", "秋季"]),
+        FoodOption("干煸豆角", 20, 30, 7, "香辣开胃，营养均衡", ["晴天", "春季", "秋季"]),
+        FoodOption("醋溜白菜", 20, 30, 8, "清爽解腻，维生素C丰富", ["晴天", "炎热", "春季", "夏季"]),
+        FoodOption("蒜苗炒肉", 25, 35, 7, "荤素搭配，营养丰富", ["晴天", "春季", "秋季"]),
+        FoodOption("韭菜炒蛋", 20, 30, 7, "蛋白质丰富，开胃下饭", ["晴天", "春季", "秋季"]),
+        FoodOption("蒜苔炒肉", 25, 35, 7, "清脆爽口，营养均衡", ["晴天", "春季", "夏季"]),
+        FoodOption("清炒小白菜", 20, 30, 8, "清淡爽口，维生素丰富", ["晴天", "炎热", "春季", "夏季"]),
+        FoodOption("红烧豆腐", 20, 30, 8, "植物蛋白，低脂健康", ["晴天", "春季", "秋季"]),
+        FoodOption("蒜蓉空心菜", 20, 30, 8, "清热解暑，纤维丰富", ["晴天", "炎热", "夏季"]),
+        
+        # 新增食物 - 西式简餐
+        FoodOption("凯撒沙拉", 25, 35, 8, "经典西式沙拉，营养均衡", ["晴天", "炎热", "春季", "夏季"]),
+        FoodOption("意式通心粉", 25, 35, 6, "口感丰富，酱料浓郁", ["晴天", "春季", "秋季"]),
+        FoodOption("法式吐司", 20, 30, 5, "香甜可口，早餐优选", ["晴天", "春季", "夏季"]),
+        FoodOption("美式汉堡", 25, 35, 4, "经典美式快餐", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("希腊沙拉", 25, 35, 9, "地中海风味，健康美味", ["晴天", "炎热", "夏季"]),
+        FoodOption("意式千层面", 30, 40, 5, "层次丰富，口感浓郁", ["阴天", "雨天", "冬季"]),
+        FoodOption("法式可颂", 20, 30, 4, "酥脆可口，早餐首选", ["晴天", "春季", "夏季"]),
+        FoodOption("美式热狗", 20, 30, 3, "经典美式小吃", ["阴天", "雨天", "秋季", "冬季"]),
+        
+        # 新增食物 - 日韩料理
+        FoodOption("日式咖喱饭", 25, 35, 6, "浓郁咖喱，营养丰富", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("韩式泡菜汤", 25, 35, 7, "酸辣开胃，益生菌丰富", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("日式乌冬面", 25, 35, 6, "滑嫩爽口，汤底鲜美", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("韩式辣炒年糕", 25, 35, 5, "甜辣可口，口感独特", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("日式茶泡饭", 20, 30, 7, "清淡养生，日式传统", ["晴天", "春季", "夏季"]),
+        FoodOption("韩式海带汤", 20, 30, 8, "营养丰富，韩式传统", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("日式亲子丼", 25, 35, 7, "鸡肉鸡蛋，营养均衡", ["晴天", "春季", "秋季"]),
+        FoodOption("韩式拌饭", 25, 35, 8, "蔬菜丰富，营养全面", ["晴天", "春季", "秋季"]),
+        
+        # 新增食物 - 东南亚料理
+        FoodOption("泰式炒河粉", 25, 35, 6, "酸甜辣香，口感丰富", ["晴天", "春季", "夏季"]),
+        FoodOption("越南春卷", 20, 30, 8, "清爽可口，低脂健康", ["晴天", "炎热", "夏季"]),
+        FoodOption("新加坡炒米粉", 25, 35, 6, "海鲜味浓，口感丰富", ["晴天", "春季", "夏季"]),
+        FoodOption("马来西亚咖喱", 25, 35, 6, "椰香浓郁，口感丰富", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("泰式青咖喱", 25, 35, 7, "清香微辣，营养丰富", ["晴天", "春季", "夏季"]),
+        FoodOption("越南河粉", 25, 35, 7, "清淡鲜美，营养均衡", ["晴天", "春季", "夏季"]),
+        
+        # 新增食物 - 面食类
+        FoodOption("阳春面", 20, 30, 6, "清淡爽口，传统面食", ["晴天", "春季", "夏季"]),
+        FoodOption("担担面", 25, 35, 5, "麻辣鲜香，川式经典", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("热干面", 20, 30, 5, "芝麻香浓，武汉特色", ["晴天", "春季", "秋季"]),
+        FoodOption("刀削面", 25, 35, 6, "口感独特，山西特色", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("臊子面", 25, 35, 6, "配料丰富，陕西特色", ["晴天", "春季", "秋季"]),
+        
+        # 新增食物 - 米饭类
+        FoodOption("蛋炒饭", 20, 30, 6, "经典炒饭，简单美味", ["晴天", "春季", "秋季"]),
+        FoodOption("咖喱炒饭", 25, 35, 5, "咖喱香浓，口感丰富", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("菠萝炒饭", 25, 35, 6, "酸甜可口，营养丰富", ["晴天", "春季", "夏季"]),
+        FoodOption("海鲜炒饭", 30, 40, 7, "海鲜鲜美，营养丰富", ["晴天", "春季", "夏季"]),
+        FoodOption("鸡肉炒饭", 25, 35, 7, "蛋白质丰富，营养均衡", ["晴天", "春季", "秋季"]),
+        
+        # 新增食物 - 汤类
+        FoodOption("紫菜蛋花汤", 20, 30, 7, "清淡鲜美，营养丰富", ["晴天", "春季", "夏季"]),
+        FoodOption("番茄蛋汤", 20, 30, 8, "维生素丰富，开胃爽口", ["晴天", "炎热", "夏季"]),
+        FoodOption("冬瓜排骨汤", 25, 35, 8, "清热解暑，营养丰富", ["晴天", "炎热", "夏季"]),
+        FoodOption("玉米排骨汤", 25, 35, 8, "香甜可口，营养丰富", ["晴天", "春季", "秋季"]),
+        FoodOption("萝卜排骨汤", 25, 35, 8, "滋补养生，冬季首选", ["阴天", "雨天", "冬季"]),
+        FoodOption("莲藕排骨汤", 25, 35, 8, "滋补养生，秋季佳品", ["阴天", "雨天", "秋季"]),
+        
+        # 新增食物 - 健康轻食
+        FoodOption("藜麦沙拉", 25, 35, 9, "超级食物，营养全面", ["晴天", "炎热", "春季", "夏季"]),
+        FoodOption("鸡胸肉沙拉", 25, 35, 9, "高蛋白低脂，健身首选", ["晴天", "春季", "秋季"]),
+        FoodOption("三文鱼沙拉", 30, 40, 9, "omega-3丰富，营养全面", ["晴天", "炎热", "春季", "夏季"]),
+        FoodOption("牛油果沙拉", 25, 35, 9, "健康脂肪，营养丰富", ["晴天", "炎热", "春季", "夏季"]),
+        FoodOption("希腊酸奶", 20, 30, 9, "蛋白质丰富，益生菌", ["晴天", "炎热", "春季", "夏季"]),
+        FoodOption("燕麦粥", 20, 30, 9, "膳食纤维丰富，早餐首选", ["阴天", "雨天", "秋季", "冬季"]),
+        
+        # 新增食物 - 特色小吃
+        FoodOption("小笼包", 25, 35, 6, "汤汁丰富，上海特色", ["晴天", "春季", "秋季"]),
+        FoodOption("灌汤包", 25, 35, 6, "汤汁浓郁，口感独特", ["晴天", "春季", "秋季"]),
+        FoodOption("烧卖", 20, 30, 6, "糯米香浓，广式特色", ["晴天", "春季", "秋季"]),
+        FoodOption("叉烧包", 20, 30, 5, "甜咸适中，广式经典", ["晴天", "春季", "秋季"]),
+        FoodOption("奶黄包", 20, 30, 4, "香甜可口，早餐优选", ["晴天", "春季", "夏季"]),
+        FoodOption("豆沙包", 20, 30, 5, "传统甜点，营养丰富", ["晴天", "春季", "秋季"]),
+        
+        # 新增食物 - 甜品饮品
+        FoodOption("双皮奶", 20, 30, 6, "滑嫩香甜，广式甜品", ["晴天", "炎热", "夏季"]),
+        FoodOption("杨枝甘露", 25, 35, 7, "清爽解暑，港式甜品", ["晴天", "炎热", "夏季"]),
+        FoodOption("红豆沙", 20, 30, 7, "传统甜品，营养丰富", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("绿豆汤", 20, 30, 8, "清热解暑，夏季必备", ["晴天", "炎热", "夏季"]),
+        FoodOption("银耳莲子汤", 20, 30, 8, "滋补养生，美容养颜", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("冰糖雪梨", 20, 30, 8, "润肺止咳，秋季佳品", ["阴天", "雨天", "秋季"]),
+        
+        # 新增食物 - 素食类
+        FoodOption("素炒三丝", 20, 30, 8, "蔬菜丰富，营养均衡", ["晴天", "炎热", "春季", "夏季"]),
+        FoodOption("素炒豆芽", 20, 30, 8, "清脆爽口，维生素丰富", ["晴天", "炎热", "春季", "夏季"]),
+        FoodOption("素炒青菜", 20, 30, 9, "清淡爽口，纤维丰富", ["晴天", "炎热", "春季", "夏季"]),
+        FoodOption("素炒茄子", 20, 30, 7, "软糯可口，营养丰富", ["晴天", "春季", "秋季"]),
+        FoodOption("素炒豆腐", 20, 30, 8, "植物蛋白，低脂健康", ["晴天", "春季", "秋季"]),
+        FoodOption("素炒蘑菇", 25, 35, 8, "菌类营养，口感丰富", ["晴天", "春季", "秋季"]),
+        
+        # 新增食物 - 特色菜系
+        FoodOption("白切鸡", 30, 40, 8, "清淡鲜美，粤式经典", ["晴天", "春季", "夏季"]),
+        FoodOption("口水鸡", 25, 35, 6, "麻辣鲜香，川式经典", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("叫花鸡", 30, 40, 7, "香气四溢，江南特色", ["晴天", "春季", "秋季"]),
+        FoodOption("盐焗鸡", 30, 40, 7, "咸香可口，客家特色", ["晴天", "春季", "秋季"]),
+        FoodOption("辣子鸡", 25, 35, 5, "麻辣鲜香，川式经典", ["阴天", "雨天", "秋季", "冬季"]),
+        FoodOption("黄焖鸡", 25, 35, 6, "软烂入味，营养丰富", ["阴天", "雨天", "秋季", "冬季"])
+    ]
 
-def add_recent_food(food_name):
-    foods = read_recent_foods()
-    foods.append(food_name)
-    # 只保留最近7天的记录
-    foods = foods[-7:]
-    with open(RECENT_FILE, 'w', encoding='utf-8') as f:
-        for food in foods:
-            f.write(food + '\n')
+def get_history_backend():
+    """获取饮食记录后端，首次调用时按配置创建"""
+    global _history
+    if _history is None:
+        if HISTORY_DB:
+            retention = float(HISTORY_RETENTION_DAYS) if HISTORY_RETENTION_DAYS else None
+            _history = SQLiteHistory(HISTORY_DB, limit=RECENT_LIMIT, retention_days=retention)
+        else:
+            _history = RingBufferHistory(RECENT_FILE, capacity=RECENT_LIMIT, legacy_path=LEGACY_RECENT_FILE)
+    return _history
+
+def set_history_backend(backend):
+    """替换饮食记录后端（需实现 food_history.HistoryBackend 接口）"""
+    global _history
+    _history = backend
+
+def get_guess_model():
+    """获取“猜你喜欢”模型，首次调用时创建；未启用时返回 None"""
+    global _guess_model
+    if _guess_model is None and GUESS_MODEL_DB:
+        _guess_model = CooccurrenceModel(GUESS_MODEL_DB)
+    return _guess_model
+
+def set_guess_model(model):
+    """替换“猜你喜欢”模型（None 表示恢复默认配置）"""
+    global _guess_model
+    _guess_model = model
+
+def food_tags(food_name):
+    """目录中菜品的标签，找不到时为空列表"""
+    catalog = get_food_catalog()
+    food_id = catalog.resolve_id(food_name)
+    return [] if food_id is None else catalog.vocabulary.decode(catalog.tag_mask[food_id])
+
+def canonical_food_name(food_name):
+    """把输入的菜名解析为目录中的标准菜名，无法匹配时保留原输入"""
+    food_name = food_name.strip()
+    return get_food_catalog().resolve_name(food_name) or food_name
 
-def clear_recent_foods():
-    if os.path.exists(RECENT_FILE):
-        os.remove(RECENT_FILE)
+def suggest_food_names(food_name, limit=5):
+    """输入的菜名无法确定时，目录中与它只差一个字的候选菜名"""
+    return get_food_catalog().suggest_names(food_name.strip(), limit)
+
+def search_foods(query, limit=10):
+    """
+    按菜名、别名、描述、标签和拼音（全拼或首字母，如 hmj）检索菜品，按相关度返回 FoodOption 列表。
+    拼音检索需要安装 pypinyin（见 requirements.txt）。
+    """
+    if not isinstance(query, str) or not query.strip():
+        raise ValueError("搜索内容不能为空")
+    if isinstance(limit, bool) or not isinstance(limit, numbers.Integral) or limit < 1:
+        raise ValueError("返回数量必须是大于0的整数")
+    catalog = get_food_catalog()
+    return [catalog[i] for i in catalog.search_ids(query, limit).tolist()]
+
+def format_search_results(query, foods):
+    """把检索结果格式化为 Markdown 文本（MCP 工具的返回内容）"""
+    if not foods:
+        return f"没有找到与“{query}”相关的菜品，换个说法试试？"
+    lines = [f"🔍 与“{query}”相关的菜品：", ""]
+    for rank, food in enumerate(foods, 1):
+        lines.append(
+            f"{rank}. **{food.name}** - ¥{food.min_price}-{food.max_price}，"
+            f"健康度{food.health_rating}分，{food.description}（{', '.join(food.tags)}）"
+        )
+    return "\n".join(lines)
+
+def read_recent_foods(user_id=None):
+    return get_history_backend().read(user_id)
+
+def add_recent_food(food_name, user_id=None):
+    """记录吃过的菜，返回实际写入的菜名"""
+    # 只保留最近7天的记录；写入前统一为标准菜名，排除时按菜品而非字符串比较
+    food_name = canonical_food_name(food_name)
+    record_foods([(user_id, food_name)])
+    return food_name
+
+def add_recent_foods(food_names, user_id=None):
+    record_foods([(user_id, canonical_food_name(food_name)) for food_name in food_names])
+
+def record_foods(entries):
+    """按时间顺序写入 (user_id, 标准菜名) 饮食记录，并增量更新“猜你喜欢”模型"""
+    backend = get_history_backend()
+    model = get_guess_model()
+    events = []
+    if model is not None:
+        recent = {}
+        for user_id, food_name in entries:
+            if user_id not in recent:
+                recent[user_id] = backend.read(user_id)
+            events.append((user_id, food_name, tuple(recent[user_id]), food_tags(food_name)))
+            recent[user_id].append(food_name)
+    backend.append_many(entries)
+    if events:
+        model.record_many(events)
+
+def train_guess_model():
+    """
+    用饮食记录后端中的全部历史重新训练“猜你喜欢”模型。
+    环形缓冲区后端只保存每个用户最近的记录，训练数据也只有这些。
+    """
+    model = get_guess_model()
+    if model is None:
+        raise ValueError("未启用猜你喜欢模型（请设置 FOOD_GUESS_MODEL_DB）")
+    model.clear()
+    model.train(get_history_backend().iter_events(), food_tags)
+
+def clear_recent_foods(user_id=None):
+    get_history_backend().clear(user_id)
 
 def show_recent_foods():
     foods = read_recent_foods()
@@ -238,18 +414,123 @@ def show_recent_foods():
     else:
         logging.info("\n你最近吃过的食品有：")
         for food in foods:
-            logging.info("-", food)
-        logging.info()
+            logging.info("- %s", food)
+        logging.info("")
+
+class Recommendation:
+    """
+    推荐结果：foods 为按推荐顺序排列的 FoodOption 列表，food 为其中第一道，没有合适的食物时为 None。
+    """
+    def __init__(self, food, weather, budget, min_health, season, candidates, foods=None):
+        self.food = food
+        self.weather = weather
+        self.budget = budget
+        self.min_health = min_health
+        self.season = season
+        self.candidates = candidates
+        self.foods = foods if foods is not None else ([food] if food is not None else [])
+
+def validate_request(weather, budget, min_health):
+    """校验推荐参数，不合法时抛出 ValueError"""
+    if weather not in WEATHER_TYPES:
+        raise ValueError(f"无效的天气类型: {weather}，可选：{', '.join(WEATHER_TYPES)}")
+    if isinstance(budget, bool) or not isinstance(budget, numbers.Real) or budget <= 0:
+        raise ValueError("预算必须是大于0的数字")
+    if isinstance(min_health, bool) or not isinstance(min_health, numbers.Integral) or not 1 <= min_health <= 10:
+        raise ValueError("健康度必须是1-10之间的整数")
+
+def validate_plan(days, total_budget, min_avg_health):
+    """校验饮食计划参数，不合法时抛出 ValueError"""
+    if isinstance(days, bool) or not isinstance(days, numbers.Integral) or not 1 <= days <= MAX_PLAN_DAYS:
+        raise ValueError(f"计划天数必须是1-{MAX_PLAN_DAYS}之间的整数")
+    if isinstance(total_budget, bool) or not isinstance(total_budget, numbers.Real) or total_budget <= 0:
+        raise ValueError("总预算必须是大于0的数字")
+    if (isinstance(min_avg_health, bool) or not isinstance(min_avg_health, numbers.Real)
+            or not 1 <= min_avg_health <= 10):
+        raise ValueError("平均健康度必须是1-10之间的数字")
+
+def validate_k(k):
+    """校验推荐数量，不合法时抛出 ValueError"""
+    if isinstance(k, bool) or not isinstance(k, numbers.Integral) or k < 1:
+        raise ValueError("推荐数量必须是大于0的整数")
+
+def recommend(weather, budget, min_health, history=(), rng=None, catalog=None, season=None, k=1):
+    """
+    推荐核心：按健康度、天气季节、价格余量和近期记录 history 加权抽样一道菜。
+    k 大于 1 时返回最多 k 道兼顾相关度与多样性的候选（见 ScoringEngine.top_k）。
+    不读写饮食记录、不提示输入、不输出日志，返回 Recommendation。
+    rng 为 numpy.random.Generator，catalog 默认使用缓存的食物目录，season 默认为当前季节。
+    """
+    validate_request(weather, budget, min_health)
+    validate_k(k)
+    if catalog is None:
+        catalog = get_food_catalog()
+    season = season or current_season()
+    if k > 1:
+        ids, candidates = _scoring.top_k(catalog, weather, budget, min_health, k, history, rng or _rng, season)
+        foods = [catalog[i] for i in ids.tolist()]
+        return Recommendation(foods[0] if foods else None, weather, budget, min_health, season, candidates, foods)
+    food_id, candidates = _scoring.sample(catalog, weather, budget, min_health, history, rng or _rng, season)
+    if food_id is None:
+        return Recommendation(None, weather, budget, min_health, season, 0)
+    return Recommendation(catalog[food_id], weather, budget, min_health, season, candidates)
+
+def recommend_for_user(weather, budget, min_health, user_id=None, rng=None, k=1):
+    """
+    读取用户近期记录后推荐，并把推荐结果记入该用户的饮食记录。
+    k 大于 1 时返回候选清单，用户尚未选定，不写入饮食记录。
+    """
+    result = recommend(weather, budget, min_health, read_recent_foods(user_id), rng, k=k)
+    if k == 1 and result.food is not None:
+        add_recent_food(result.food.name, user_id)
+    return result
+
+def format_recommendation(result):
+    """把推荐结果格式化为 Markdown 文本（MCP 工具的返回内容）"""
+    food = result.food
+    if food is None:
+        return "抱歉，没有找到符合您要求的食物。请调整预算或健康度要求，或清空近期饮食记录。"
+    # 天气只是加权条件，选中的菜不一定带有该天气标签
+    weather = result.weather
+    if len(result.foods) > 1:
+        preference = f"，优先适合{weather}的菜" if weather else ""
+        lines = [f"🌞 今天的{len(result.foods)}个推荐（¥{result.budget}以内，健康度≥{result.min_health}{preference}）：", ""]
+        for rank, option in enumerate(result.foods, 1):
+            miss = f"，未标注适合{weather}" if weather and weather not in option.tags else ""
+            lines.append(
+                f"{rank}. **{option.name}** - ¥{option.min_price}-{option.max_price}，"
+                f"健康度{option.health_rating}分，{option.description}（{', '.join(option.tags)}）{miss}"
+            )
+        lines.append("\n选好后可以用 add_recent_food 记录下来 😋")
+        return "\n".join(lines)
+    if weather is None:
+        weather_reason = ""
+    elif weather in food.tags:
+        weather_reason = f"\n- 适合{weather}天气"
+    else:
+        weather_reason = f"\n- 这道菜没有{weather}天气标签，是不限天气挑选的（天气只作为加权参考）"
+    return f"""🌞 今天推荐：**{food.name}** 😋
+
+📊 推荐详情：
+- **价格范围**: ¥{food.min_price}-{food.max_price}
+- **健康度评分**: {'🍎' * food.health_rating}{'⭐' * (10-food.health_rating)} ({food.health_rating}分)
+- **推荐理由**: {food.description}
+- **适合天气**: {', '.join(food.tags)}
+
+🎯 为什么推荐这个？
+- 符合你的预算要求（¥{result.budget}以内）
+- 健康度{food.health_rating}分，超过你的{result.min_health}分要求{weather_reason}
+- 营养均衡，口感佳
+
+今天是个好天气，来一份{food.name}吧！既满足了你的健康要求，又不会超出预算。😋"""
 
 def get_food_recommendation():
-    food_options = get_food_options()
     logging.info("\n=== 今天吃什么？让我帮你决定！===\n")
     # 获取天气类型
-    weather_types = ["晴天", "雨天", "炎热", "寒冷"]
-    logging.info("天气类型可选：", ", ".join(weather_types))
+    logging.info("天气类型可选：" + ", ".join(WEATHER_TYPES))
     while True:
         weather = input("请输入当前天气类型: ")
-        if weather in weather_types:
+        if weather in WEATHER_TYPES:
             break
         logging.warning("请输入有效的天气类型！")
     # 获取用户预算
@@ -276,36 +557,181 @@ def get_food_recommendation():
             logging.warning("健康度必须在1-10之间")
         except ValueError:
             logging.warning("请输入有效的数字")
-    # 读取近期饮食
-    recent_foods = set(read_recent_foods())
-    # 筛选符合条件的食物
-    suitable_options = [
-        food for food in food_options
-        if food.min_price <= budget and food.health_rating >= min_health and food.name not in recent_foods
-    ]
-    # 根据天气优先筛选
-    weather_options = [food for food in suitable_options if weather in food.tags]
-    if weather_options:
-        suitable_options = weather_options
-    if not suitable_options:
+    recommendation = recommend_for_user(weather, budget, min_health).food
+    if recommendation is None:
         logging.warning("\n抱歉，没有找到符合您要求的食物。请调整预算或健康度要求，或清空近期饮食记录。")
         return None
-    logging.info("\n思考中", end="")
-    for _ in range(3):
-        time.sleep(0.5)
-        logging.info(".", end="", flush=True)
-    recommendation = random.choice(suitable_options)
     logging.info(f"\n\n今天推荐您吃: {recommendation.name}! 😋")
     logging.info(f"预计价格范围: ¥{recommendation.min_price}-{recommendation.max_price}")
     logging.info(f"健康度评分: {'🍎' * recommendation.health_rating}{'⭐' * (10-recommendation.health_rating)}")
     logging.info(f"推荐理由: {recommendation.description}")
     logging.info(f"适合天气: {', '.join(recommendation.tags)}\n")
-    add_recent_food(recommendation.name)
     return recommendation
 
-def guess_you_like():
-    food_options = get_food_options()
-    food = random.choice(food_options)
+def get_scoring_engine():
+    """获取推荐打分引擎"""
+    return _scoring
+
+def recommend_batch(requests, seed=None, record_history=True, k=1):
+    """
+    批量推荐：requests 为 (weather, budget, min_health[, user_id]) 元组列表，
+    按顺序返回每个请求的推荐结果（FoodOption，没有合适的食物时为 None）。
+    所有请求在目录上一次性筛选、打分并加权抽样；指定 seed 时结果可复现。
+    同一用户的多个请求按顺序处理：前面推荐的菜计入后面请求的近期记录并同样降权，
+    与逐个调用 recommend_for_user 一致。
+    k 大于 1 时每个请求返回最多 k 道多样化候选的列表，候选不写入饮食记录，各请求之间相互独立。
+    """
+    catalog = get_food_catalog()
+    requests = [tuple(request) + (None,) * (4 - len(request)) for request in requests]
+    for weather, budget, min_health, _ in requests:
+        validate_request(weather, budget, min_health)
+    validate_k(k)
+    recent = {}
+    for _, _, _, user_id in requests:
+        if user_id not in recent:
+            recent[user_id] = read_recent_foods(user_id)
+    rng = np.random.default_rng(seed)
+    season = current_season()
+    if k > 1:
+        return [
+            [catalog[i] for i in _scoring.top_k(
+                catalog, weather, budget, min_health, k, recent[user_id], rng, season)[0].tolist()]
+            for weather, budget, min_health, user_id in requests
+        ]
+    # 第 r 轮包含每个用户的第 r 个请求；通常每个用户只有一个请求，只需抽样一轮
+    rounds = []
+    seen = {}
+    for index, (_, _, _, user_id) in enumerate(requests):
+        turn = seen[user_id] = seen.get(user_id, -1) + 1
+        if turn == len(rounds):
+            rounds.append([])
+        rounds[turn].append(index)
+    ids = np.full(len(requests), -1, dtype=np.int64)
+    for indices in rounds:
+        batch = [requests[i] for i in indices]
+        drawn = _scoring.draw_batch(
+            catalog,
+            budgets=[budget for _, budget, _, _ in batch],
+            min_healths=[min_health for _, _, min_health, _ in batch],
+            weathers=[weather for weather, _, _, _ in batch],
+            histories=[recent[user_id] for _, _, _, user_id in batch],
+            rng=rng,
+            season=season,
+        )
+        for i, food_id in zip(indices, drawn):
+            ids[i] = food_id
+            if food_id >= 0:
+                user_id = requests[i][3]
+                recent[user_id] = (list(recent[user_id]) + [catalog.names[food_id]])[-RECENT_LIMIT:]
+    recommendations = [catalog[i] if i >= 0 else None for i in ids]
+    if record_history:
+        record_foods([
+            (user_id, food.name)
+            for (_, _, _, user_id), food in zip(requests, recommendations) if food is not None
+        ])
+    return recommendations
+
+def make_meal_plan(days, total_budget, min_avg_health, weathers=None, user_id=None):
+    """
+    生成多日饮食计划，返回 PlanResult，其中 plan 为每天的 FoodOption 列表（无方案时为 None）；
+    搜索被截断时 status 为 TRUNCATED，plan 是目前找到的最好方案而不一定最优。
+    计划中不会出现与近期饮食记录相同或相似的菜品。参数不合法时抛出 ValueError。
+    """
+    validate_plan(days, total_budget, min_avg_health)
+    catalog = get_food_catalog()
+    result = plan_meals(catalog, days, total_budget, min_avg_health, weathers, read_recent_foods(user_id))
+    if result.plan is not None:
+        result.plan = [catalog[i] for i in result.plan]
+    return result
+
+def make_group_order(min_healths, budget, weather=None, method='auto', use_max_price=False):
+    """
+    团餐点单：为每人选一道不同的菜，min_healths 是每人的最低健康度。
+    返回与 min_healths 对应的 FoodOption 列表，无可行方案时返回 None，参数不合法时抛出 ValueError。
+    """
+    catalog = get_food_catalog()
+    order = optimize_group_order(catalog, min_healths, budget, weather, method, use_max_price=use_max_price)
+    if order is None:
+        return None
+    return [catalog[i] for i in order]
+
+def get_meal_plan():
+    logging.info("\n=== 一周饮食计划 ===\n")
+    while True:
+        try:
+            days = int(input("请输入计划天数（默认7）：") or 7)
+            if 1 <= days <= MAX_PLAN_DAYS:
+                break
+            logging.warning(f"天数必须在1-{MAX_PLAN_DAYS}之间")
+        except ValueError:
+            logging.warning("请输入有效的数字")
+    while True:
+        try:
+            total_budget = float(input("请输入总预算（元）: "))
+            if total_budget > 0:
+                break
+            logging.warning("预算必须大于0元")
+        except ValueError:
+            logging.warning("请输入有效的数字")
+    while True:
+        try:
+            min_avg_health = float(input("请输入最低平均健康度（1-10）："))
+            if 1 <= min_avg_health <= 10:
+                break
+            logging.warning("健康度必须在1-10之间")
+        except ValueError:
+            logging.warning("请输入有效的数字")
+    weathers = input("请输入每天的天气（用逗号分隔，可留空）：").replace('，', ',')
+    weathers = [w.strip() or None for w in weathers.split(',')] if weathers.strip() else None
+    result = make_meal_plan(days, total_budget, min_avg_health, weathers)
+    plan = result.plan
+    if plan is None:
+        if result.truncated:
+            logging.warning("\n抱歉，搜索量超过上限仍未找到可行的饮食计划。请减少天数或放宽条件后重试。")
+        else:
+            logging.warning("\n抱歉，没有找到满足条件的饮食计划。请提高预算、降低健康度要求，或清空近期饮食记录。")
+        return None
+    if result.truncated:
+        logging.info("（搜索量超过上限，以下是目前找到的最好方案，不一定最优）")
+    for day, food in enumerate(plan, 1):
+        logging.info(f"第{day}天: {food.name}  (¥{food.min_price}-{food.max_price}，健康度{food.health_rating}分)")
+    total = sum(food.min_price for food in plan)
+    avg_health = sum(food.health_rating for food in plan) / len(plan)
+    logging.info(f"\n预计最低花费: ¥{total}，平均健康度: {avg_health:.1f}\n")
+    return plan
+
+def guess_for_user(user_id=None, rng=None, limit=10):
+    """
+    猜用户可能喜欢的菜：与近期记录共现的菜品（以热门菜品补充）按共现得分加标签偏好排序，
+    从前 limit 道中按得分加权抽取，近期吃过的菜除外。模型未启用或没有数据时随机返回一道菜。
+    """
+    catalog = get_food_catalog()
+    rng = rng or _rng
+    model = get_guess_model()
+    ranked = {}
+    if model is not None:
+        recent = read_recent_foods(user_id)
+        scores = model.related(recent)
+        # 热门菜品作为补充，保证近期菜品的近邻都吃过时仍有候选
+        for name, _ in model.popular():
+            scores.setdefault(name, 0.0)
+        affinity = model.tag_affinity(user_id)
+        eaten = set(recent)
+        for name, score in scores.items():
+            food_id = catalog.resolve_id(name) if name not in eaten else None
+            if food_id is None:
+                continue
+            tags = catalog.vocabulary.decode(catalog.tag_mask[food_id])
+            score += GUESS_AFFINITY_WEIGHT * sum(affinity.get(tag, 0.0) for tag in tags)
+            ranked[food_id] = max(score, ranked.get(food_id, 0.0))
+    if not ranked:
+        return catalog[int(rng.integers(len(catalog)))]
+    ranked = sorted(((score, food_id) for food_id, score in ranked.items()), key=lambda item: -item[0])[:limit]
+    weights = np.array([score for score, _ in ranked]) + 0.01
+    return catalog[ranked[int(rng.choice(len(ranked), p=weights / weights.sum()))][1]]
+
+def guess_you_like(user_id=None):
+    food = guess_for_user(user_id)
     logging.info("\n=== 猜你今天会喜欢 ===\n")
     logging.info(f"{food.name}  (预计价格: ¥{food.min_price}-{food.max_price})")
     logging.info(f"健康度评分: {'🍎' * food.health_rating}{'⭐' * (10-food.health_rating)}")
@@ -314,8 +740,8 @@ def guess_you_like():
 
 def main():
     while True:
-        logging.info("\n主菜单：\n1. 推荐今天吃什么\n2. 录入今天已吃食品\n3. 查看近期饮食记录\n4. 清空近期饮食记录\n5. 猜你喜欢\n6. 退出\n")
-        choice = input("请选择功能（1-6）：")
+        logging.info("\n主菜单：\n1. 推荐今天吃什么\n2. 录入今天已吃食品\n3. 查看近期饮食记录\n4. 清空近期饮食记录\n5. 猜你喜欢\n6. 一周饮食计划\n7. 退出\n")
+        choice = input("请选择功能（1-7）：")
         if choice == '1':
             get_food_recommendation()
         elif choice == '2':
@@ -331,6 +757,8 @@ def main():
         elif choice == '5':
             guess_you_like()
         elif choice == '6':
+            get_meal_plan()
+        elif choice == '7':
             logging.info("\n祝您用餐愉快！👋\n")
             break
         else:
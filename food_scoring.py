@@ -0,0 +1,314 @@
+"""
+推荐打分与加权抽样
+"""
+
+import datetime
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from food_catalog import TagVocabulary
+
+SEASONS = {
+    12: "冬季", 1: "冬季", 2: "冬季",
+    3: "春季", 4: "春季", 5: "春季",
+    6: "夏季", 7: "夏季", 8: "夏季",
+    9: "秋季", 10: "秋季", 11: "秋季",
+}
+
+
+def popcount(values):
+    """uint32 数组每个元素中 1 的个数"""
+    values = np.asarray(values, dtype=np.uint32)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values)
+    return _POPCOUNT_TABLE[values.view(np.uint8)].reshape(values.shape + (4,)).sum(axis=-1, dtype=np.uint8)
+
+
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def current_season(today=None):
+    """当前日期所在的季节标签"""
+    return SEASONS[(today or datetime.date.today()).month]
+
+
+class AliasTable:
+    """
+    Walker/Vose 别名表：按权重 O(n) 构建，之后每次抽样 O(1)。
+    权重必须为正数。
+    """
+
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        n = len(weights)
+        scaled = (weights * n / weights.sum()).tolist()
+        prob = [1.0] * n
+        alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] += scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        # 剩余项只会因浮点误差出现，概率视为 1
+        self.prob = np.asarray(prob)
+        self.alias = np.asarray(alias, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.prob)
+
+    def draw(self, rng):
+        """抽取一个下标"""
+        i = int(rng.integers(len(self.prob)))
+        return i if rng.random() < self.prob[i] else int(self.alias[i])
+
+    def draw_many(self, rng, size):
+        """一次抽取 size 个下标（有放回）"""
+        i = rng.integers(len(self.prob), size=size)
+        return np.where(rng.random(size) < self.prob[i], i, self.alias[i])
+
+
+class ScoringEngine:
+    """
+    推荐打分引擎。
+    预算和最低健康度是硬性条件；满足条件的菜品按以下因子的乘积作为抽样权重：
+    - 健康度：health / 10
+    - 天气/季节：匹配当前天气为 1，否则为 weather_miss；匹配当前季节再乘 season_bonus
+    - 价格余量：0.5 + 0.5 * (预算 - 最低价) / 预算
+    - 近期记录：第 k 天前吃过的菜乘以 1 - 0.5 ** ((k - 1) / recency_half_life)，昨天吃过的权重为 0
+    - 相似菜品：设置 similarity（food_similarity.DishSimilarity）时，与第 k 天前吃过的菜相似度为 s 的菜
+      乘以 1 - similar_penalty * s * 0.5 ** ((k - 1) / recency_half_life)
+    单道推荐先按 (目录版本, 天气, 预算对应的价格前缀, 最低健康度, 季节) 从 LRU 缓存取候选编号和
+    只含健康度、天气、季节因子的别名表，再按 价格余量 × 近期记录系数 做拒绝抽样：近期排除的菜（系数为 0）
+    相当于从候选集中做差集，结果与按完整权重抽样同分布，常见请求只需一次字典查找和几次抽样。
+    多道推荐（top_k）用最大边际相关（MMR）选取：每次选 (1 - diversity) * 相关度 - diversity * 与已选菜品的最大相似度
+    最高的菜；相似度为 (1 - category_weight) * 标签 Jaccard 系数 + category_weight * 是否同一类别。
+    """
+
+    def __init__(self, weather_miss=0.2, season_bonus=1.5, recency_half_life=2.0, cache_size=128,
+                 diversity=0.3, category_weight=0.5, similarity=None, similar_penalty=0.5,
+                 max_rejections=64):
+        self.weather_miss = weather_miss
+        self.season_bonus = season_bonus
+        self.recency_half_life = recency_half_life
+        self.cache_size = cache_size
+        self.diversity = diversity
+        self.category_weight = category_weight
+        self.similarity = similarity
+        self.similar_penalty = similar_penalty
+        self.max_rejections = max_rejections
+        self._tables = OrderedDict()
+        self._candidates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def recency_factors(self, catalog, history):
+        """近期记录（从旧到新）对应的 {菜品编号: 权重系数}"""
+        factors = {}
+        penalize_similar = self.similarity is not None and self.similar_penalty > 0
+        for age, name in enumerate(reversed(list(history)), 1):
+            decay = 0.5 ** ((age - 1) / self.recency_half_life)
+            for i in catalog.ids_for_names([name]).tolist():
+                factors[i] = min(factors.get(i, 1.0), 1.0 - decay)
+            if penalize_similar:
+                ids, similarity = self.similarity.similar_ids(catalog, name)
+                for i, factor in zip(ids.tolist(), (1.0 - self.similar_penalty * decay * similarity).tolist()):
+                    factors[i] = min(factors.get(i, 1.0), factor)
+        return factors
+
+    def base_weights(self, catalog, ids, weather, season=None):
+        """与预算和近期记录无关的权重部分：健康度 × 天气 × 季节"""
+        tags = catalog.tag_mask[ids]
+        weights = catalog.health[ids] / 10.0
+        if weather is not None:
+            weights = weights * np.where((tags & catalog.vocabulary.bit(weather)) != 0, 1.0, self.weather_miss)
+        if season is not None:
+            weights = weights * np.where((tags & catalog.vocabulary.bit(season)) != 0, self.season_bonus, 1.0)
+        return weights
+
+    def score(self, catalog, ids, weather, budget, history=(), season=None):
+        """给定菜品编号（升序）的抽样权重"""
+        weights = self.base_weights(catalog, ids, weather, season)
+        headroom = np.clip((budget - catalog.min_price[ids]) / budget, 0.0, 1.0)
+        weights = weights * (0.5 + 0.5 * headroom)
+        for i, factor in self.recency_factors(catalog, history).items():
+            pos = np.searchsorted(ids, i)
+            if pos < len(ids) and ids[pos] == i:
+                weights[pos] *= factor
+        return weights
+
+    def sampler(self, catalog, weather, budget, min_health, history=(), season=None):
+        """
+        返回 (候选编号, 别名表)，没有可选菜品时返回 None。
+        结果按目录版本和全部输入缓存。
+        """
+        key = (catalog.version, weather, float(budget), int(min_health), tuple(history), season)
+        with self._lock:
+            if key in self._tables:
+                self._tables.move_to_end(key)
+                return self._tables[key]
+        hi = int(np.searchsorted(catalog.min_price, budget, side='right'))
+        ids = np.flatnonzero(catalog.health[:hi] >= min_health)
+        weights = self.score(catalog, ids, weather, budget, history, season)
+        positive = weights > 0
+        entry = (ids[positive], AliasTable(weights[positive])) if positive.any() else None
+        with self._lock:
+            self._tables[key] = entry
+            while len(self._tables) > self.cache_size:
+                self._tables.popitem(last=False)
+        return entry
+
+    def candidates(self, catalog, weather, budget, min_health, season=None):
+        """
+        返回 (候选编号, 基础权重的别名表)，没有可选菜品时返回 None。
+        预算只决定候选的价格前缀（目录按最低价排序），同一前缀内的预算共用一个缓存项。
+        """
+        hi = int(np.searchsorted(catalog.min_price, budget, side='right'))
+        key = (catalog.version, weather, hi, int(min_health), season)
+        with self._lock:
+            if key in self._candidates:
+                self._candidates.move_to_end(key)
+                return self._candidates[key]
+        ids = np.flatnonzero(catalog.health[:hi] >= min_health)
+        weights = self.base_weights(catalog, ids, weather, season)
+        positive = weights > 0
+        entry = (ids[positive], AliasTable(weights[positive])) if positive.any() else None
+        with self._lock:
+            self._candidates[key] = entry
+            while len(self._candidates) > self.cache_size:
+                self._candidates.popitem(last=False)
+        return entry
+
+    def sample(self, catalog, weather, budget, min_health, history=(), rng=None, season=None):
+        """
+        按权重抽取一个菜品编号，返回 (编号, 候选数)；没有可选菜品时编号为 None。
+        从缓存的候选别名表抽样后以 价格余量 × 近期记录系数 的概率接受；
+        连续 max_rejections 次被拒绝时（近期记录压低了大部分候选）改为按完整权重精确抽样。
+        """
+        entry = self.candidates(catalog, weather, budget, min_health, season)
+        if entry is None:
+            return None, 0
+        ids, table = entry
+        factors = self.recency_factors(catalog, history)
+        # 近期排除的菜（系数为 0）从候选集中去掉
+        excluded = np.fromiter((i for i, factor in factors.items() if factor <= 0), dtype=np.int64)
+        pos = np.searchsorted(ids, excluded)
+        count = len(ids) - int(np.count_nonzero(ids[np.minimum(pos, len(ids) - 1)] == excluded))
+        if count == 0:
+            return None, 0
+        rng = rng or np.random.default_rng()
+        min_price = catalog.min_price
+        for _ in range(self.max_rejections):
+            i = int(ids[table.draw(rng)])
+            accept = (0.5 + 0.5 * min(max((budget - min_price[i]) / budget, 0.0), 1.0)) * factors.get(i, 1.0)
+            if rng.random() < accept:
+                return i, count
+        exact = self.sampler(catalog, weather, budget, min_health, history, season)
+        if exact is None:
+            return None, 0
+        exact_ids, exact_table = exact
+        return int(exact_ids[exact_table.draw(rng)]), count
+
+    def draw(self, catalog, weather, budget, min_health, history=(), rng=None, season=None):
+        """按权重抽取一个菜品编号，没有可选菜品时返回 None"""
+        return self.sample(catalog, weather, budget, min_health, history, rng, season)[0]
+
+    def clear_cache(self):
+        """丢弃所有缓存的候选集和别名表（目录重新加载时调用）"""
+        with self._lock:
+            self._tables.clear()
+            self._candidates.clear()
+
+    def top_k(self, catalog, weather, budget, min_health, k, history=(), rng=None, season=None):
+        """
+        按相关度与多样性选出最多 k 道菜，返回 (排好序的菜品编号数组, 候选数)；候选数与 sample 相同，
+        为满足条件且未被近期记录排除的菜品数。
+        相关度为 u ** (1 / 归一化权重)（u 为均匀随机数），即按权重无放回抽样的排序键，
+        k 为 1 时与 draw 同分布；之后用 MMR 逐个选取，与已选菜品的最大相似度增量更新。
+        """
+        hi = int(np.searchsorted(catalog.min_price, budget, side='right'))
+        ids = np.flatnonzero(catalog.health[:hi] >= min_health)
+        weights = self.score(catalog, ids, weather, budget, history, season)
+        positive = weights > 0
+        ids, weights = ids[positive], weights[positive]
+        count = len(ids)
+        if count == 0:
+            return ids, 0
+        rng = rng or np.random.default_rng()
+        relevance = rng.random(len(ids)) ** (weights.max() / weights)
+        k = min(k, len(ids))
+        if self.diversity < 1.0:
+            # 相关度低于第 k 高相关度减 diversity / (1 - diversity) 的菜在前 k 步中不可能胜出
+            floor = np.partition(relevance, len(ids) - k)[len(ids) - k] - self.diversity / (1.0 - self.diversity)
+            pool = relevance >= floor
+            ids, relevance = ids[pool], relevance[pool]
+        tags = catalog.tag_mask[ids]
+        tag_counts = popcount(tags).astype(np.intp)
+        families = catalog.family_codes[ids]
+        # 标签 Jaccard 系数只取决于 (交集位数, 并集位数)，查表代替逐元素除法
+        shared_bits = np.arange(TagVocabulary.MAX_TAGS + 1)[:, None]
+        union_bits = np.arange(2 * TagVocabulary.MAX_TAGS + 1)[None, :]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            jaccard = np.where(union_bits > 0, shared_bits / union_bits, 0.0)
+        jaccard = ((1.0 - self.category_weight) * jaccard).ravel()
+        row = 2 * TagVocabulary.MAX_TAGS + 1
+        max_similarity = np.zeros(len(ids))
+        gain = (1.0 - self.diversity) * relevance
+        chosen = []
+        for _ in range(k):
+            j = int(np.argmax(gain - self.diversity * max_similarity))
+            chosen.append(j)
+            gain[j] = -np.inf
+            shared = popcount(tags & tags[j]).astype(np.intp)
+            similarity = jaccard[shared * row + (tag_counts + tag_counts[j] - shared)]
+            similarity[families == families[j]] += self.category_weight
+            np.maximum(max_similarity, similarity, out=max_similarity)
+        return ids[chosen], count
+
+    def draw_batch(self, catalog, budgets, min_healths, weathers, histories, rng, season=None,
+                   chunk_cells=1 << 22):
+        """
+        为一批请求各按权重抽取一个菜品编号，没有可选菜品时为 -1。
+        所有请求的条件与权重在同一个 (请求数 × 菜品数) 矩阵上计算，按 chunk_cells 分块控制内存；
+        抽样使用指数竞争法：每个候选取 log(u) / 权重，最大者胜出。
+        """
+        budgets = np.asarray(budgets, dtype=np.float64)
+        min_healths = np.asarray(min_healths, dtype=np.int8)
+        weather_bits = np.array([0 if w is None else catalog.vocabulary.bit(w) for w in weathers], dtype=np.uint32)
+        has_weather = np.array([w is not None for w in weathers])
+        result = np.full(len(budgets), -1, dtype=np.int64)
+        if len(budgets) == 0:
+            return result
+        hi = int(np.searchsorted(catalog.min_price, budgets.max(), side='right'))
+        if hi == 0:
+            return result
+        min_price = catalog.min_price[:hi]
+        tag_mask = catalog.tag_mask[:hi]
+        base = catalog.health[:hi] / 10.0
+        if season is not None:
+            base = base * np.where((tag_mask & catalog.vocabulary.bit(season)) != 0, self.season_bonus, 1.0)
+        step = max(1, chunk_cells // hi)
+        for start in range(0, len(budgets), step):
+            rows = slice(start, start + step)
+            row_budgets = budgets[rows, None]
+            weights = np.where(
+                (min_price <= row_budgets) & (catalog.health[:hi] >= min_healths[rows, None]),
+                base, 0.0,
+            )
+            weather_hit = ((tag_mask & weather_bits[rows, None]) != 0) | ~has_weather[rows, None]
+            weights *= np.where(weather_hit, 1.0, self.weather_miss)
+            weights *= 0.5 + 0.5 * np.clip((row_budgets - min_price) / row_budgets, 0.0, 1.0)
+            for r, history in enumerate(histories[rows]):
+                for i, factor in self.recency_factors(catalog, history).items():
+                    if i < hi:
+                        weights[r, i] *= factor
+            with np.errstate(divide='ignore', invalid='ignore'):
+                keys = np.log(rng.random(weights.shape)) / weights
+            keys[weights <= 0] = -np.inf
+            picked = keys.argmax(axis=1)
+            result[rows] = np.where((weights > 0).any(axis=1), picked, -1)
+        return result
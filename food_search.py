@@ -0,0 +1,280 @@
+"""
+菜品全文检索：菜名、别名、描述和标签上的倒排索引，支持拼音全拼和首字母（如 hmj → 黄焖鸡）。
+索引随目录构建一次，编译二进制目录时一并写入同名的 .search.npz 文件。
+"""
+
+import bisect
+import json
+import math
+import os
+import re
+import tempfile
+
+import numpy as np
+
+from food_names import normalize_name
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # 没有 pypinyin 时不生成拼音键；已持久化的索引中的拼音键仍可查询
+    lazy_pinyin = None
+
+# 新建的索引是否包含拼音全拼和首字母键
+PINYIN_AVAILABLE = lazy_pinyin is not None
+
+INDEX_VERSION = 1
+
+# 各字段命中的权重（再乘以逆文档频率）
+FIELD_WEIGHTS = {'name': 3.0, 'alias': 2.5, 'pinyin': 2.5, 'tag': 2.0, 'description': 1.0}
+# 整个查询与菜名（规范化后）完全相同时额外加的权重
+EXACT_NAME_WEIGHT = 5.0
+# 拼音键最多包含的音节数
+MAX_PINYIN_SYLLABLES = 6
+# 字母查询按前缀展开的词项数上限（如 huangm → huangmen、huangmenji）
+MAX_PREFIX_TERMS = 64
+# 前缀命中相对完整命中的权重
+PREFIX_WEIGHT = 0.8
+
+_RUNS = re.compile(r'[a-z0-9]+|[^a-z0-9]+')
+_WORDS = re.compile(r'[a-z0-9]+')
+_SEPARATOR = '\n'
+
+
+def _cjk_terms(text, unigrams):
+    """非字母数字部分的相邻两字（unigrams 为真时含单字）"""
+    terms = set()
+    for run in _RUNS.findall(text):
+        if run[0].isascii() and run[0].isalnum():
+            continue
+        if unigrams:
+            terms.update('c:' + ch for ch in run)
+        terms.update('c:' + run[i:i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def _word_terms(text):
+    return {'w:' + word for word in _WORDS.findall(text)}
+
+
+def pinyin_terms(key):
+    """
+    规范化菜名的拼音键：从每个音节开始、至多 MAX_PINYIN_SYLLABLES 个音节的全拼（p:）和首字母（i:）。
+    没有 pypinyin 时返回空集合。
+    """
+    if lazy_pinyin is None:
+        return set()
+    syllables = [s for s in lazy_pinyin(key, errors='ignore') if s.isascii() and s.isalpha()]
+    terms = set()
+    for start in range(len(syllables)):
+        for end in range(start + 1, min(len(syllables), start + MAX_PINYIN_SYLLABLES) + 1):
+            terms.add('p:' + ''.join(syllables[start:end]))
+            if end - start > 1:
+                terms.add('i:' + ''.join(s[0] for s in syllables[start:end]))
+    return terms
+
+
+def dish_terms(name, description, tags, aliases=()):
+    """一道菜的 {词项: 字段权重}，同一词项出现在多个字段时取最大权重"""
+    fields = []
+    key = normalize_name(name)
+    fields.append(('name', _cjk_terms(key, True) | _word_terms(key) | {'n:' + key}))
+    fields.append(('pinyin', pinyin_terms(key)))
+    for alias in aliases:
+        alias_key = normalize_name(alias)
+        fields.append(('alias', _cjk_terms(alias_key, True) | _word_terms(alias_key) | {'n:' + alias_key}))
+        fields.append(('pinyin', pinyin_terms(alias_key)))
+    for tag in tags:
+        tag_key = normalize_name(tag)
+        fields.append(('tag', _cjk_terms(tag_key, True) | _word_terms(tag_key)))
+    description_key = normalize_name(description)
+    fields.append(('description', _cjk_terms(description_key, False) | _word_terms(description_key)))
+    weights = {}
+    for field, terms in fields:
+        weight = FIELD_WEIGHTS[field]
+        for term in terms:
+            if weights.get(term, 0.0) < weight:
+                weights[term] = weight
+    for term in weights:
+        if term[0] == 'n':
+            weights[term] = EXACT_NAME_WEIGHT
+    return weights
+
+
+def query_units(query):
+    """
+    把查询拆成若干检索单元，每个单元是一组候选词项 [(词项, 是否前缀匹配)]。
+    中文部分每两字一个单元（单字查询为一个单元）；字母数字部分一个单元，
+    同时匹配英文单词、拼音全拼和拼音首字母。
+    """
+    key = normalize_name(query)
+    units = []
+    for run in _RUNS.findall(key):
+        if run[0].isascii() and run[0].isalnum():
+            units.append([('w:' + run, True), ('p:' + run, True), ('i:' + run, False)])
+        elif len(run) == 1:
+            units.append([('c:' + run, False)])
+        else:
+            units.extend([('c:' + run[i:i + 2], False)] for i in range(len(run) - 1))
+    return key, units
+
+
+class SearchIndex:
+    """
+    倒排索引：词项按字典序排列，每个词项对应一段升序菜品编号及字段权重。
+    得分为各检索单元的最佳命中（逆文档频率 × 字段权重）之和；
+    排序时先比较命中的单元数，再比较得分、健康度，最后按编号（即价格从低到高）。
+    """
+
+    def __init__(self, terms, offsets, ids, weights, rows, pinyin=PINYIN_AVAILABLE):
+        self.terms = terms
+        self.offsets = offsets
+        self.ids = ids
+        self.weights = weights
+        self.rows = rows
+        # 索引中是否有拼音键
+        self.pinyin = pinyin
+        self._slots = {term: slot for slot, term in enumerate(terms)}
+
+    @classmethod
+    def build(cls, catalog):
+        """为目录构建索引"""
+        aliases_of = {}
+        for alias, name in catalog.aliases.items():
+            aliases_of.setdefault(name, []).append(alias)
+        postings = {}
+        for i, (name, description, mask) in enumerate(zip(catalog.names, catalog.descriptions,
+                                                        catalog.tag_mask.tolist())):
+            terms = dish_terms(name, description, catalog.vocabulary.decode(mask), aliases_of.get(name, ()))
+            for term, weight in terms.items():
+                posting = postings.get(term)
+                if posting is None:
+                    posting = postings[term] = ([], [])
+                posting[0].append(i)
+                posting[1].append(weight)
+        terms = sorted(postings)
+        counts = np.fromiter((len(postings[term][0]) for term in terms), dtype=np.int64, count=len(terms))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        ids = np.fromiter((i for term in terms for i in postings[term][0]), dtype=np.int32, count=offsets[-1])
+        weights = np.fromiter((w for term in terms for w in postings[term][1]), dtype=np.float32,
+                              count=offsets[-1])
+        return cls(terms, offsets, ids, weights, len(catalog))
+
+    def __len__(self):
+        return len(self.terms)
+
+    def _posting(self, slot):
+        lo, hi = self.offsets[slot], self.offsets[slot + 1]
+        idf = math.log(1.0 + self.rows / (hi - lo))
+        return self.ids[lo:hi], self.weights[lo:hi] * idf
+
+    def _expand(self, term, prefix):
+        """词项对应的 [(槽位, 系数)]；prefix 为真时还包括以它为前缀的词项"""
+        slot = self._slots.get(term)
+        slots = [(slot, 1.0)] if slot is not None else []
+        if prefix:
+            lo = bisect.bisect_right(self.terms, term)
+            for slot in range(lo, min(lo + MAX_PREFIX_TERMS, len(self.terms))):
+                if not self.terms[slot].startswith(term):
+                    break
+                slots.append((slot, PREFIX_WEIGHT))
+        return slots
+
+    def match(self, query):
+        """命中查询的 (菜品编号数组（升序）, 得分数组, 命中的单元数数组)"""
+        key, units = query_units(query)
+        unit_ids = []
+        unit_scores = []
+        for unit in units:
+            hits = [
+                (self._posting(slot), factor)
+                for term, prefix in unit for slot, factor in self._expand(term, prefix)
+            ]
+            if not hits:
+                continue
+            ids = np.concatenate([posting_ids for (posting_ids, _), _ in hits])
+            scores = np.concatenate([posting_scores * factor for (_, posting_scores), factor in hits])
+            # 同一单元内一道菜取最佳命中
+            order = np.lexsort((-scores, ids))
+            ids, scores = ids[order], scores[order]
+            first = np.ones(len(ids), dtype=bool)
+            first[1:] = ids[1:] != ids[:-1]
+            unit_ids.append(ids[first])
+            unit_scores.append(scores[first])
+        if not unit_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0, dtype=np.int64)
+        ids, inverse = np.unique(np.concatenate(unit_ids), return_inverse=True)
+        matched = np.bincount(inverse, minlength=len(ids))
+        scores = np.bincount(inverse, weights=np.concatenate(unit_scores), minlength=len(ids))
+        exact = self._slots.get('n:' + key)
+        if exact is not None:
+            exact_ids, exact_scores = self._posting(exact)
+            pos = np.searchsorted(ids, exact_ids)
+            found = (pos < len(ids)) & (ids[np.minimum(pos, len(ids) - 1)] == exact_ids)
+            scores[pos[found]] += exact_scores[found]
+        return ids.astype(np.int64), scores, matched
+
+    def search(self, query, limit=10, health=None):
+        """
+        返回 (菜品编号数组, 得分数组)，按相关度降序，最多 limit 个。
+        health 为各菜品的健康度数组，得分相同时健康度高的在前。
+        """
+        ids, scores, matched = self.match(query)
+        tiebreak = -health[ids] if health is not None else np.zeros(len(ids))
+        # lexsort 以最后一个键为主键
+        order = np.lexsort((ids, tiebreak, -np.round(scores, 6), -matched))[:limit]
+        return ids[order], scores[order]
+
+    def save(self, path, source_stamp=None):
+        """原子写入 .npz 文件；source_stamp 为对应目录文件的 (大小, 修改时间)，加载时据此判断是否过期"""
+        meta = json.dumps({'version': INDEX_VERSION, 'rows': self.rows, 'source': source_stamp,
+                           'pinyin': self.pinyin})
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.search_', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    meta=np.frombuffer(meta.encode('utf-8'), dtype=np.uint8),
+                    terms=np.frombuffer(_SEPARATOR.join(self.terms).encode('utf-8'), dtype=np.uint8),
+                    offsets=self.offsets,
+                    ids=self.ids,
+                    weights=self.weights,
+                )
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, source_stamp=None):
+        """
+        读取 save 写入的索引；版本、来源不符或文件不存在时返回 None。
+        索引建于没有 pypinyin 的环境而当前已安装时也返回 None，以便重建出拼音键。
+        """
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(data['meta'].tobytes().decode('utf-8'))
+                if meta['version'] != INDEX_VERSION or (
+                        source_stamp is not None and meta['source'] != list(source_stamp)):
+                    return None
+                pinyin = meta.get('pinyin', True)
+                if PINYIN_AVAILABLE and not pinyin:
+                    return None
+                text = data['terms'].tobytes().decode('utf-8')
+                terms = text.split(_SEPARATOR) if text else []
+                return cls(terms, data['offsets'], data['ids'], data['weights'], meta['rows'], pinyin)
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def index_path(catalog_path):
+    """二进制目录文件对应的检索索引文件路径"""
+    return os.path.splitext(catalog_path)[0] + '.search.npz'
+
+
+def source_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
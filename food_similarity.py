@@ -0,0 +1,180 @@
+"""
+菜品相似度：由共同标签、类别、菜名用字和描述词组成的稀疏近邻表。
+每道菜只保存最相似的少数几道，推荐时按近期记录逐条查近邻，代价为 O(记录数 × 近邻数)。
+"""
+
+import math
+import re
+import threading
+
+import numpy as np
+
+from food_names import STAPLE_SUFFIXES, dish_family, dish_key
+
+# 各类特征的权重（再乘以逆文档频率）
+TOKEN_WEIGHTS = {'t': 0.5, 'f': 2.0, 'c': 1.0, 'd': 1.0, 'k': 1.5}
+
+# 菜名或描述中出现这些词时视为同一菜系（如 经典川菜 与 川式经典）
+CUISINE_MARKERS = (
+    "川", "粤", "湘", "鲁", "苏", "浙", "闽", "徽", "京", "沪", "港式", "台式", "东北", "江南", "客家",
+    "新疆", "兰州", "重庆", "云南", "日式", "韩式", "泰式", "越南", "意式", "意大利", "法式", "墨西哥", "西式",
+)
+
+# 主食后缀中的字不作为菜名用字特征（米饭、套餐几乎不反映菜品口味）
+_STAPLE_CHARS = set(''.join(STAPLE_SUFFIXES))
+
+_PHRASE_SEPARATORS = re.compile(r'[\s,，、。；;：:!！?？/|()（）]+')
+
+
+def dish_tokens(name, description, tags):
+    """
+    菜品的特征集合：
+    t:标签、f:类别（菜名末两字）、c:菜名中的字、d:描述中每个短语的相邻两字、k:菜系
+    """
+    tokens = {'t:' + tag for tag in tags}
+    tokens.add('f:' + dish_family(name))
+    tokens.update('c:' + ch for ch in dish_key(name) if ch not in _STAPLE_CHARS)
+    for phrase in _PHRASE_SEPARATORS.split(description):
+        tokens.update('d:' + phrase[i:i + 2] for i in range(len(phrase) - 1))
+    tokens.update('k:' + marker for marker in CUISINE_MARKERS if marker in name or marker in description)
+    return frozenset(tokens)
+
+
+class _SimilarityState:
+    """某一目录版本的相似度数据；建好后只读，近邻表缓存除外"""
+
+    def __init__(self, version, slot_of=None, tokens=(), rows=(), enabled=True):
+        self.version = version
+        self.enabled = enabled
+        self.slot_of = slot_of or {}
+        self.tokens = list(tokens)
+        self.rows = list(rows)
+        self.postings = {}
+        for slot, slot_tokens in enumerate(self.tokens):
+            for token in slot_tokens:
+                self.postings.setdefault(token, []).append(slot)
+        # 逆文档频率按本版本的全部菜品计算
+        size = len(self.tokens)
+        self.weights = {
+            token: TOKEN_WEIGHTS[token[0]] * math.log(1.0 + size / len(posting))
+            for token, posting in self.postings.items()
+        }
+        self.norms = [math.sqrt(sum(self.weights[t] ** 2 for t in slot_tokens)) for slot_tokens in self.tokens]
+        # {编号: [(编号, 相似度)]}，首次查询时计算；并发计算同一道菜时结果相同，后写入的覆盖先写入的
+        self.neighbors = {}
+
+
+class DishSimilarity:
+    """
+    稀疏菜品相似度表。
+    相似度为特征向量（TOKEN_WEIGHTS × 逆文档频率）的余弦相似度，每道菜保留至多 max_neighbors 个
+    相似度不低于 min_similarity 的近邻。候选只从共享特征的倒排表中产生，出现在太多菜品中的特征
+    （超过 max_df_ratio 比例且多于 min_max_df 道）不参与候选生成。
+    sync 为每个目录版本重新建表（编号、倒排表和逆文档频率都只反映当前目录），建好后原子替换；
+    应在加载目录时调用（见 food_recommendation.get_food_catalog），而不是在请求中。
+    近邻表在首次查询时计算并缓存，计算时不持有锁，并发请求互不阻塞。
+    目录超过 max_rows 道菜时不建表（逐道提取特征的耗时与目录大小成正比），similar_ids 返回空结果。
+    """
+
+    def __init__(self, max_neighbors=20, min_similarity=0.12, max_df_ratio=0.05, min_max_df=50,
+                 max_rows=200_000):
+        self.max_neighbors = max_neighbors
+        self.min_similarity = min_similarity
+        self.max_df_ratio = max_df_ratio
+        self.min_max_df = min_max_df
+        self.max_rows = max_rows
+        self._state = _SimilarityState(None)
+        # 只用于避免多个线程同时为同一版本建表
+        self._sync_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._state.tokens)
+
+    @property
+    def version(self):
+        return self._state.version
+
+    @property
+    def enabled(self):
+        return self._state.enabled
+
+    def sync(self, catalog):
+        """为目录建表（已是该版本时直接返回），返回建好的状态"""
+        state = self._state
+        if state.version == catalog.version:
+            return state
+        with self._sync_lock:
+            state = self._state
+            if state.version == catalog.version:
+                return state
+            if len(catalog) > self.max_rows:
+                state = _SimilarityState(catalog.version, enabled=False)
+            else:
+                rows = {}
+                for i, name in enumerate(catalog.names):
+                    rows.setdefault(name, []).append(i)
+                slot_of = {}
+                tokens = []
+                for name, ids in rows.items():
+                    i = ids[0]
+                    slot_of[name] = len(tokens)
+                    tokens.append(dish_tokens(
+                        name, catalog.descriptions[i], catalog.vocabulary.decode(catalog.tag_mask[i])))
+                state = _SimilarityState(
+                    catalog.version, slot_of, tokens, [np.asarray(ids, dtype=np.int64) for ids in rows.values()])
+            self._state = state
+            return state
+
+    def neighbors(self, slot, state=None):
+        """菜品（内部编号）的近邻 [(编号, 相似度)]，按相似度降序"""
+        state = state or self._state
+        cached = state.neighbors.get(slot)
+        if cached is not None:
+            return cached
+        tokens = state.tokens[slot]
+        postings = state.postings
+        weights = state.weights
+        max_df = max(self.min_max_df, self.max_df_ratio * len(state.tokens))
+        scores = {}
+        for token in tokens:
+            posting = postings[token]
+            if len(posting) > max_df:
+                continue
+            weight = weights[token] ** 2
+            for other in posting:
+                if other != slot:
+                    scores[other] = scores.get(other, 0.0) + weight
+        # 候选可能还共享被跳过的高频特征，补上这部分得分
+        common = [token for token in tokens if len(postings[token]) > max_df]
+        norm = state.norms[slot]
+        result = []
+        for other, score in scores.items():
+            other_tokens = state.tokens[other]
+            for token in common:
+                if token in other_tokens:
+                    score += weights[token] ** 2
+            similarity = score / (norm * state.norms[other])
+            if similarity >= self.min_similarity:
+                result.append((other, similarity))
+        result.sort(key=lambda item: -item[1])
+        result = result[:self.max_neighbors]
+        state.neighbors[slot] = result
+        return result
+
+    def similar_ids(self, catalog, name):
+        """与菜名 name 相似的菜品 (编号数组, 相似度数组)，不含同名菜品本身"""
+        state = self.sync(catalog)
+        if not state.enabled:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        slot = state.slot_of.get(name)
+        if slot is None:
+            resolved = catalog.resolve_name(name)
+            slot = state.slot_of.get(resolved) if resolved is not None else None
+        if slot is None:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        neighbors = self.neighbors(slot, state)
+        if not neighbors:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        rows = [state.rows[other] for other, _ in neighbors]
+        similarity = np.repeat([s for _, s in neighbors], [len(r) for r in rows])
+        return np.concatenate(rows), similarity
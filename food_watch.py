@@ -0,0 +1,153 @@
+"""
+文件变化监视：Linux 上用 inotify 等待内核事件，其他平台按固定间隔比较文件状态。
+供长期运行的 mcp_server.py 在 foods.csv / foods.bin 更新后热加载食物目录。
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+
+# inotify 事件：写入后关闭、移入（原子替换）、创建、删除、移出
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+# struct inotify_event 的定长部分：wd, mask, cookie, len；其后是 len 字节的文件名
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def file_stamp(path):
+    """文件的 (大小, 修改时间, inode)，文件不存在时为 None"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+class _Inotify:
+    """通过 libc 调用 inotify，监视若干目录中指定文件名的变化"""
+
+    def __init__(self, paths):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify 不可用")
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.names = {}
+        try:
+            # 监视所在目录而不是文件本身：原子替换会换掉文件的 inode
+            for path in paths:
+                directory, name = os.path.split(os.path.abspath(path))
+                wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"无法监视 {directory}")
+                self.names.setdefault(wd, set()).add(os.fsencode(name))
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def wait(self, timeout):
+        """等待最多 timeout 秒，返回期间是否有被监视的文件发生变化"""
+        changed = False
+        while select.select([self.fd], [], [], timeout)[0]:
+            data = os.read(self.fd, 65536)
+            offset = 0
+            while offset < len(data):
+                wd, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0')
+                offset += length
+                changed = changed or name in self.names.get(wd, ())
+            # 已读到事件后只取走立即可读的剩余事件
+            timeout = 0
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FileWatcher:
+    """
+    在后台线程中监视 paths，文件新建、修改、替换或删除时调用 callback()。
+    有 inotify 时等待内核事件，否则每 interval 秒比较一次 (大小, 修改时间, inode)。
+    检测到变化后等到连续 debounce 秒内文件不再变化才回调，避免读到写了一半的文件；
+    回调在监视线程中执行，抛出的异常只记日志，不影响后续监视。
+    """
+
+    def __init__(self, paths, callback, interval=2.0, debounce=0.5, use_inotify=True):
+        self.paths = list(paths)
+        self.callback = callback
+        self.interval = interval
+        self.debounce = debounce
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify(self.paths)
+            except (OSError, AttributeError) as e:
+                logging.info(f"inotify 不可用，改为轮询文件状态: {e}")
+        self.backend = 'inotify' if self._inotify is not None else 'polling'
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stamps(self):
+        return [file_stamp(path) for path in self.paths]
+
+    def _wait_for_change(self, stamps):
+        """阻塞到文件状态与 stamps 不同或被停止，返回新的状态"""
+        while not self._stop.is_set():
+            if self._inotify is not None:
+                # 事件不保证一定到达（如网络文件系统），所以仍按 interval 复查一次状态
+                self._inotify.wait(self.interval)
+            else:
+                self._stop.wait(self.interval)
+            current = self._stamps()
+            if current != stamps:
+                return current
+        return stamps
+
+    def _settle(self, stamps):
+        """等到 debounce 秒内状态不再变化"""
+        while not self._stop.wait(self.debounce):
+            if self._inotify is not None:
+                self._inotify.wait(0)
+            current = self._stamps()
+            if current == stamps:
+                break
+            stamps = current
+        return stamps
+
+    def _run(self):
+        stamps = self._stamps()
+        while not self._stop.is_set():
+            stamps = self._settle(self._wait_for_change(stamps))
+            if self._stop.is_set():
+                break
+            try:
+                self.callback()
+            except Exception:
+                logging.exception("文件变化回调失败")
+
+    def start(self):
+        """启动后台监视线程（守护线程），返回自身"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='file-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """停止监视并等待线程退出（最多 interval 秒）"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(self.interval + self.debounce + 1)
+            self._thread = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
@@ -11,19 +11,67 @@ import random
 import logging
 import os
 import pickle
+import threading
+from concurrent.futures import Future
 
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
-def fetch_premier_league_goals_improved():
+# 英超官网的赛季编号（719 为 2024/25 赛季）
+DEFAULT_SEASON_ID = 719
+# 已知赛季编号对应的赛季名称，未列出的赛季按编号显示
+SEASON_LABELS = {DEFAULT_SEASON_ID: '2024/25赛季'}
+# 进程内缓存的统计结果的有效期（秒）
+CACHE_TTL = float(os.environ.get('FOOTBALL_CACHE_TTL', '600'))
+# 本地 pickle 缓存的有效期（秒），过期后重新抓取网页
+DISK_CACHE_TTL = float(os.environ.get('FOOTBALL_DISK_CACHE_TTL', '86400'))
+
+# {season_id: (过期时间, 结果文本)}
+_report_cache = {}
+# {season_id: Future}，正在获取的赛季，并发请求共用同一次获取
+_inflight = {}
+_cache_lock = threading.Lock()
+
+def fetch_premier_league_goals_improved(season_id=None):
     """
     获取英超进球数据，优先用本地缓存，其次抓取网页，失败用模拟数据。
+    season_id 为英超官网的赛季编号，默认为当前赛季。
     """
-    cache_file = 'pl_goals_cache.pkl'
-    if os.path.exists(cache_file):
-        logging.info('从本地缓存加载英超数据...')
+    df, live = fetch_goals_table(season_id)
+    return format_data(df, season_id, mock=not live)
+
+def _load_cached_table(cache_file):
+    """读取未过期的本地缓存，返回 DataFrame；缓存不存在、已过期或无法读取时返回 None"""
+    if not os.path.exists(cache_file):
+        return None
+    try:
         with open(cache_file, 'rb') as f:
-            return format_data(pickle.load(f))
-    url = "https://www.premierleague.com/stats/top/players/goals"
+            cached = pickle.load(f)
+        saved_at, df = cached['saved_at'], cached['table']
+    except Exception as e:
+        # 包括没有时间戳的旧版缓存
+        logging.warning(f"忽略无效的本地缓存 {cache_file}: {e}")
+        return None
+    if not 0 <= time.time() - saved_at <= DISK_CACHE_TTL:
+        return None
+    return df
+
+def fetch_goals_table(season_id=None):
+    """
+    获取英超进球榜，返回 (DataFrame, 是否真实数据)。
+    只有抓取成功的数据才写入本地缓存（带保存时间，超过 DISK_CACHE_TTL 后失效），模拟数据不缓存。
+    """
+    if season_id is None:
+        season_id = DEFAULT_SEASON_ID
+    if season_id == DEFAULT_SEASON_ID:
+        cache_file = 'pl_goals_cache.pkl'
+        url = "https://www.premierleague.com/stats/top/players/goals"
+    else:
+        cache_file = f'pl_goals_cache_{season_id}.pkl'
+        url = f"https://www.premierleague.com/stats/top/players/goals?se={season_id}"
+    df = _load_cached_table(cache_file)
+    if df is not None:
+        logging.info('从本地缓存加载英超数据...')
+        return df, True
     headers = {
         "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
@@ -52,22 +100,32 @@ def fetch_premier_league_goals_improved():
                 break
         if not players_table:
             logging.warning("未找到标准表格，直接返回模拟数据")
-            return create_mock_data()
+            return mock_goals_table(), False
         try:
             players_df = pd.read_html(str(players_table))[0]
             with open(cache_file, 'wb') as f:
-                pickle.dump(players_df, f)
+                pickle.dump({'saved_at': time.time(), 'table': players_df}, f)
             logging.info("成功解析表格数据并已缓存")
-            return format_data(players_df)
+            return players_df, True
         except Exception as e:
             logging.warning(f"表格解析失败: {e}")
-            return create_mock_data()
+            return mock_goals_table(), False
     except Exception as e:
         logging.warning(f"网络或处理失败: {e}")
-        return create_mock_data()
+        return mock_goals_table(), False
+
+def season_label(season_id=None):
+    """赛季编号对应的显示名称"""
+    if season_id is None:
+        season_id = DEFAULT_SEASON_ID
+    return SEASON_LABELS.get(season_id, f'赛季编号 {season_id}')
 
-def create_mock_data():
+def create_mock_data(season_id=None):
     """创建模拟的英超进球数据"""
+    return format_data(mock_goals_table(), season_id, mock=True)
+
+def mock_goals_table():
+    """模拟的英超进球榜"""
     mock_data = [
         {"排名": 1, "球员": "Erling Haaland", "球队": "Manchester City", "进球": 18, "助攻": 5},
         {"排名": 2, "球员": "Mohamed Salah", "球队": "Liverpool", "进球": 15, "助攻": 8},
@@ -80,13 +138,11 @@ def create_mock_data():
         {"排名": 9, "球员": "Cole Palmer", "球队": "Chelsea", "进球": 9, "助攻": 4},
         {"排名": 10, "球员": "Phil Foden", "球队": "Manchester City", "进球": 8, "助攻": 7}
     ]
-    
-    df = pd.DataFrame(mock_data)
-    return format_data(df)
+    return pd.DataFrame(mock_data)
 
-def format_data(df):
-    """格式化数据输出"""
-    result = "⚽ 英超球员进球榜 (2024/25赛季)\n"
+def format_data(df, season_id=None, mock=False):
+    """格式化数据输出，标题中的赛季由 season_id 决定（默认当前赛季），mock 为真时注明是模拟数据"""
+    result = f"⚽ 英超球员进球榜 ({season_label(season_id)})\n"
     result += "=" * 60 + "\n"
     result += f"{'排名':<4} {'球员':<20} {'球队':<20} {'进球':<6} {'助攻':<6}\n"
     result += "-" * 60 + "\n"
@@ -101,8 +157,11 @@ def format_data(df):
         result += f"{rank:<4} {player:<20} {team:<20} {goals:<6} {assists:<6}\n"
     
     result += "\n📊 数据说明：\n"
-    result += "- 数据来源：英超官网 (模拟数据)\n"
-    result += "- 更新时间：2024年12月\n"
+    if mock:
+        result += "- 数据来源：模拟数据（获取英超官网数据失败）\n"
+        result += "- 更新时间：2024年12月\n"
+    else:
+        result += "- 数据来源：英超官网\n"
     result += "- 显示前15名球员\n"
     
     return result
@@ -125,12 +184,51 @@ def get_latest_fixtures():
     
     return result
 
+def football_report(season_id=None):
+    """进球榜与最新比赛结果的完整报告"""
+    return _football_report(season_id)[0]
+
+def _football_report(season_id=None):
+    """返回 (报告文本, 进球榜是否真实数据)"""
+    df, live = fetch_goals_table(season_id)
+    report = (
+        format_data(df, season_id, mock=not live) + "\n"
+        + "\n" + "="*60 + "\n\n"
+        + get_latest_fixtures()
+    )
+    return report, live
+
+def get_football_report(season_id=DEFAULT_SEASON_ID, ttl=None):
+    """
+    带缓存的 football_report：结果按赛季缓存 ttl 秒（默认 CACHE_TTL）；
+    同一赛季同时只获取一次，其他调用等待并共用这次的结果。
+    获取失败时返回的模拟数据不缓存，下一次调用会重新获取。
+    """
+    ttl = CACHE_TTL if ttl is None else ttl
+    with _cache_lock:
+        cached = _report_cache.get(season_id)
+        if cached is not None and cached[0] > time.monotonic():
+            return cached[1]
+        future = _inflight.get(season_id)
+        owner = future is None
+        if owner:
+            future = _inflight[season_id] = Future()
+    if not owner:
+        return future.result()
+    try:
+        report, live = _football_report(season_id)
+    except BaseException as e:
+        with _cache_lock:
+            del _inflight[season_id]
+        future.set_exception(e)
+        raise
+    with _cache_lock:
+        if live:
+            _report_cache[season_id] = (time.monotonic() + ttl, report)
+        del _inflight[season_id]
+    future.set_result(report)
+    return report
+
 if __name__ == "__main__":
     print("正在获取英超数据...")
-    goals_data = fetch_premier_league_goals_improved()
-    print(goals_data)
-    
-    print("\n" + "="*60 + "\n")
-    
-    fixtures_data = get_latest_fixtures()
-    print(fixtures_data) 
\ No newline at end of file
+    print(football_report())
\ No newline at end of file
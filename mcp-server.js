@@ -35,8 +35,8 @@ class FoodRecommendationServer {
               properties: {
                 weather: {
                   type: 'string',
-                  enum: ['晴天', '雨天', '炎热', '寒冷'],
-                  description: '当前天气类型'
+                  enum: ['晴天', '阴天', '雨天', '炎热', '寒冷', '春季', '夏季', '秋季', '冬季'],
+                  description: '当前天气类型或季节'
                 },
                 budget: {
                   type: 'number',
@@ -47,6 +47,13 @@ class FoodRecommendationServer {
                   minimum: 1,
                   maximum: 10,
                   description: '最低健康度要求（1-10）'
+                },
+                k: {
+                  type: 'integer',
+                  minimum: 1,
+                  maximum: 20,
+                  description: '推荐数量（默认1；大于1时返回兼顾多样性的候选清单，不写入饮食记录）',
+                  default: 1
                 }
               },
               required: ['weather', 'budget', 'min_health']
@@ -149,53 +156,30 @@ class FoodRecommendationServer {
   }
 
   async getFoodRecommendation(args) {
-    return new Promise((resolve, reject) => {
-      const pythonProcess = spawn('python', ['food_recommendation.py'], {
-        stdio: ['pipe', 'pipe', 'pipe']
-      });
-
-      let output = '';
-      let errorOutput = '';
-
-      pythonProcess.stdout.on('data', (data) => {
-        output += data.toString();
-      });
-
-      pythonProcess.stderr.on('data', (data) => {
-        errorOutput += data.toString();
-      });
-
-      pythonProcess.on('close', (code) => {
-        if (code === 0) {
-          resolve({
-            content: [
-              {
-                type: 'text',
-                text: output
-              }
-            ]
-          });
-        } else {
-          reject(new Error(`Python process failed: ${errorOutput}`));
+    // 直接调用 Python 推荐核心，参数经命令行传入
+    const output = await this.runPythonCommand(`
+result = recommend_for_user(sys.argv[1], float(sys.argv[2]), int(sys.argv[3]), k=int(sys.argv[4]))
+print(format_recommendation(result))`, [String(args.weather), String(args.budget), String(args.min_health), String(args.k || 1)]);
+    return {
+      content: [
+        {
+          type: 'text',
+          text: output
         }
-      });
-
-      // 发送参数到Python脚本
-      const input = `${args.weather}\n${args.budget}\n${args.min_health}\n`;
-      pythonProcess.stdin.write(input);
-      pythonProcess.stdin.end();
-    });
+      ]
+    };
   }
 
-  async addRecentFood(args) {
+  // 推荐与近期饮食记录统一经由 food_recommendation 处理；记录保存在 Python 端的环形缓冲区文件中，
+  // 由其文件锁保证与命令行、mcp_server.py 并发写入时不丢记录
+  runPythonCommand(code, args = []) {
     return new Promise((resolve, reject) => {
       const pythonProcess = spawn('python', ['-c', `
 import sys
 sys.path.append('.')
-from food_recommendation import add_recent_food
-add_recent_food('${args.food_name}')
-print('已成功添加食物记录')
-      `]);
+from food_recommendation import add_recent_food, read_recent_foods, clear_recent_foods, recommend_for_user, format_recommendation
+${code}
+      `, ...args]);
 
       let output = '';
       let errorOutput = '';
@@ -210,14 +194,7 @@ print('已成功添加食物记录')
 
       pythonProcess.on('close', (code) => {
         if (code === 0) {
-          resolve({
-            content: [
-              {
-                type: 'text',
-                text: output
-              }
-            ]
-          });
+          resolve(output);
         } else {
           reject(new Error(`Python process failed: ${errorOutput}`));
         }
@@ -225,10 +202,26 @@ print('已成功添加食物记录')
     });
   }
 
+  async addRecentFood(args) {
+    // 食物名称通过命令行参数传入，避免拼接进代码
+    const output = await this.runPythonCommand(`
+add_recent_food(sys.argv[1])
+print('已成功添加食物记录')`, [String(args.food_name)]);
+    return {
+      content: [
+        {
+          type: 'text',
+          text: output
+        }
+      ]
+    };
+  }
+
   async getRecentFoods() {
     try {
-      const content = fs.readFileSync('recent_foods.txt', 'utf8');
-      const foods = content.split('\n').filter(line => line.trim());
+      const output = await this.runPythonCommand(`
+print('\\n'.join(read_recent_foods()))`);
+      const foods = output.split('\n').filter(line => line.trim());
       
       return {
         content: [
@@ -254,9 +247,8 @@ print('已成功添加食物记录')
 
   async clearRecentFoods() {
     try {
-      if (fs.existsSync('recent_foods.txt')) {
-        fs.unlinkSync('recent_foods.txt');
-      }
+      await this.runPythonCommand(`
+clear_recent_foods()`);
       return {
         content: [
           {
@@ -3,30 +3,63 @@
 MCP Server for Food Recommendation and Football Stats
 """
 
-import json
+import asyncio
 import sys
-import subprocess
 import os
-from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Union
 import importlib.util
 import logging
 logging.basicConfig(level=logging.INFO, format='[%(levelname)s] %(message)s')
 
 # 导入食物推荐模块
 sys.path.append('.')
-from food_recommendation import get_food_options, add_recent_food, read_recent_foods, clear_recent_foods
+from food_recommendation import (
+    WEATHER_TYPES, add_recent_food, read_recent_foods, clear_recent_foods, recommend_for_user,
+    format_recommendation, recommend_batch, make_meal_plan, make_group_order,
+    CATALOG_POLL_INTERVAL, MAX_PLAN_DAYS, watch_food_catalog, search_foods, format_search_results, suggest_food_names
+)
+from mcp_transport import PARSE_ERROR, default_transport
+from file_chunks import MAX_READ_BYTES, read_chunk
+from food_search import PINYIN_AVAILABLE
+
+# 同时执行的工具调用数上限（工作线程数），不含 IO_TOOLS
+MAX_CONCURRENT_CALLS = 8
+# 访问网络的慢速工具在单独的线程池中执行（最多 MAX_IO_CALLS 个线程），
+# 网络请求再慢也不会占用推荐、计划等计算型工具的线程
+IO_TOOLS = ("get_football_stats",)
+MAX_IO_CALLS = 2
+# 单个工具的并发上限，未列出的工具只受所在线程池的线程数限制
+TOOL_CONCURRENCY = {
+    "get_football_stats": 2,
+    "get_file_content": 4,
+}
+# 单次调用的超时（秒），超时后返回错误响应，不再等待结果
+TOOL_TIMEOUTS = {
+    "get_football_stats": float(os.environ.get('MCP_FOOTBALL_TIMEOUT', '15')),
+}
 
 class MCPServer:
-    def __init__(self):
+    def __init__(self, max_concurrent_calls=MAX_CONCURRENT_CALLS, tool_concurrency=None, transport=None,
+                 max_io_calls=MAX_IO_CALLS, tool_timeouts=None):
         self.server_name = "food-recommendation-server"
         self.version = "1.0.0"
         self.tools = {}
+        self.transport = transport or default_transport()
+        self.max_concurrent_calls = max_concurrent_calls
+        self.tool_concurrency = dict(TOOL_CONCURRENCY if tool_concurrency is None else tool_concurrency)
+        self.max_io_calls = max_io_calls
+        self.tool_timeouts = dict(TOOL_TIMEOUTS if tool_timeouts is None else tool_timeouts)
         self.register_tools()
         
     def register_tools(self):
         """注册所有工具，便于后续扩展"""
         self.tools = {
             "get_food_recommendation": self.get_food_recommendation,
+            "recommend_batch": self.recommend_batch,
+            "plan_meals": self.plan_meals,
+            "optimize_group_order": self.optimize_group_order,
+            "search_foods": self.search_foods,
             "add_recent_food": self.add_recent_food,
             "get_recent_foods": self.get_recent_foods,
             "clear_recent_foods": self.clear_recent_foods,
@@ -34,19 +67,20 @@ class MCPServer:
             "get_file_content": self.get_file_content
         }
         
-    def send_response(self, response: Dict[str, Any]):
-        """发送响应到标准输出"""
-        print(json.dumps(response), flush=True)
+    def send_response(self, response: Union[Dict[str, Any], List[Dict[str, Any]]]):
+        """发送响应（或批量响应数组）到标准输出"""
+        self.transport.send(response)
         
-    def read_request(self) -> Optional[Dict[str, Any]]:
-        """从标准输入读取请求"""
-        try:
-            line = input()
-            return json.loads(line)
-        except EOFError:
-            return None
-        except json.JSONDecodeError:
-            return None
+    def read_request(self) -> Any:
+        """
+        从标准输入读取一条消息（请求对象或批量请求数组），跳过空行；
+        输入结束时返回 None，JSON 无法解析时返回 PARSE_ERROR。
+        """
+        return self.transport.read_message()
+    
+    def error_response(self, request_id: Any, code: int, message: str) -> Dict[str, Any]:
+        """构造 JSON-RPC 错误响应"""
+        return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
             
     def handle_initialize(self, request: Dict[str, Any]) -> Dict[str, Any]:
         """处理初始化请求"""
@@ -71,7 +105,7 @@ class MCPServer:
                     "properties": {
                         "weather": {
                             "type": "string",
-                            "enum": ["晴天", "阴天", "雨天", "炎热", "寒冷", "春季", "夏季", "秋季", "冬季"],
+                            "enum": WEATHER_TYPES,
                             "description": "当前天气类型或季节"
                         },
                         "budget": {
@@ -83,11 +117,165 @@ class MCPServer:
                             "minimum": 1,
                             "maximum": 10,
                             "description": "最低健康度要求（1-10）"
+                        },
+                        "k": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 20,
+                            "description": "推荐数量（默认1；大于1时返回兼顾多样性的候选清单，不写入饮食记录）",
+                            "default": 1
+                        },
+                        "user_id": {
+                            "type": "string",
+                            "description": "用户ID（可选，不同用户的饮食记录相互独立）"
                         }
                     },
                     "required": ["weather", "budget", "min_health"]
                 }
             },
+            {
+                "name": "recommend_batch",
+                "description": "批量推荐食物，一次调用为多个请求各推荐一道菜（或 k 道候选）",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "requests": {
+                            "type": "array",
+                            "description": "推荐请求列表",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "weather": {"type": "string", "enum": WEATHER_TYPES, "description": "当前天气类型或季节"},
+                                    "budget": {"type": "number", "description": "预算金额（元）"},
+                                    "min_health": {"type": "integer", "minimum": 1, "maximum": 10, "description": "最低健康度要求（1-10）"},
+                                    "user_id": {"type": "string", "description": "用户ID（可选）"}
+                                },
+                                "required": ["weather", "budget", "min_health"]
+                            }
+                        },
+                        "seed": {
+                            "type": "integer",
+                            "description": "随机种子（可选，指定后结果可复现）"
+                        },
+                        "k": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 20,
+                            "description": "推荐数量（默认1；大于1时返回兼顾多样性的候选清单，不写入饮食记录）",
+                            "default": 1
+                        }
+                    },
+                    "required": ["requests"]
+                }
+            },
+            {
+                "name": "plan_meals",
+                "description": "生成多日饮食计划，满足总预算和平均健康度要求，且不与近期饮食重复",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "days": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": MAX_PLAN_DAYS,
+                            "description": "计划天数（默认7）",
+                            "default": 7
+                        },
+                        "total_budget": {
+                            "type": "number",
+                            "exclusiveMinimum": 0,
+                            "description": "总预算金额（元）"
+                        },
+                        "min_avg_health": {
+                            "type": "number",
+                            "minimum": 1,
+                            "maximum": 10,
+                            "description": "最低平均健康度（1-10）"
+                        },
+                        "weathers": {
+                            "type": "array",
+                            "items": {"type": "string", "enum": WEATHER_TYPES},
+                            "description": "每天的天气类型或季节（可选）"
+                        },
+                        "user_id": {
+                            "type": "string",
+                            "description": "用户ID（可选，不同用户的饮食记录相互独立）"
+                        }
+                    },
+                    "required": ["total_budget", "min_avg_health"]
+                }
+            },
+            {
+                "name": "optimize_group_order",
+                "description": "团餐点单：在共享预算内为每人选一道不同的菜，满足每人的最低健康度并使总得分最高",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "budget": {
+                            "type": "number",
+                            "exclusiveMinimum": 0,
+                            "description": "总预算金额（元）"
+                        },
+                        "people": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "description": "人数（未提供 min_healths 时使用）"
+                        },
+                        "min_health": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 10,
+                            "description": "每人统一的最低健康度（默认1）",
+                            "default": 1
+                        },
+                        "min_healths": {
+                            "type": "array",
+                            "items": {"type": "integer", "minimum": 1, "maximum": 10},
+                            "description": "每人各自的最低健康度（可选，优先于 people/min_health）"
+                        },
+                        "weather": {
+                            "type": "string",
+                            "enum": WEATHER_TYPES,
+                            "description": "当前天气类型或季节（可选）"
+                        },
+                        "method": {
+                            "type": "string",
+                            "enum": ["auto", "dp", "greedy"],
+                            "description": "求解方式：dp 精确、greedy 近似、auto 自动选择",
+                            "default": "auto"
+                        },
+                        "use_max_price": {
+                            "type": "boolean",
+                            "description": "按最高价计算预算（默认按最低价）",
+                            "default": False
+                        }
+                    },
+                    "required": ["budget"]
+                }
+            },
+            {
+                "name": "search_foods",
+                "description": "按菜名、别名、描述、标签或拼音（全拼/首字母，如 hmj）搜索菜品" if PINYIN_AVAILABLE
+                               else "按菜名、别名、描述或标签搜索菜品（未安装 pypinyin，不支持拼音检索）",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "query": {
+                            "type": "string",
+                            "description": "搜索内容，如“酸辣”“鸡肉”“hmj”“lamian”" if PINYIN_AVAILABLE
+                                           else "搜索内容，如“酸辣”“鸡肉”"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "minimum": 1,
+                            "maximum": 50,
+                            "description": "最多返回的菜品数（默认10）",
+                            "default": 10
+                        }
+                    },
+                    "required": ["query"]
+                }
+            },
             {
                 "name": "add_recent_food",
                 "description": "添加已食用的食物到记录中",
@@ -97,6 +285,10 @@ class MCPServer:
                         "food_name": {
                             "type": "string",
                             "description": "食物名称"
+                        },
+                        "user_id": {
+                            "type": "string",
+                            "description": "用户ID（可选，不同用户的饮食记录相互独立）"
                         }
                     },
                     "required": ["food_name"]
@@ -107,7 +299,12 @@ class MCPServer:
                 "description": "获取最近食用的食物记录",
                 "inputSchema": {
                     "type": "object",
-                    "properties": {}
+                    "properties": {
+                        "user_id": {
+                            "type": "string",
+                            "description": "用户ID（可选，不同用户的饮食记录相互独立）"
+                        }
+                    }
                 }
             },
             {
@@ -115,7 +312,12 @@ class MCPServer:
                 "description": "清空最近的食物记录",
                 "inputSchema": {
                     "type": "object",
-                    "properties": {}
+                    "properties": {
+                        "user_id": {
+                            "type": "string",
+                            "description": "用户ID（可选，不同用户的饮食记录相互独立）"
+                        }
+                    }
                 }
             },
             {
@@ -126,7 +328,7 @@ class MCPServer:
                     "properties": {
                         "season_id": {
                             "type": "integer",
-                            "description": "赛季ID（默认719）",
+                            "description": "赛季ID（默认719，结果在服务内缓存一段时间）",
                             "default": 719
                         }
                     }
@@ -134,13 +336,44 @@ class MCPServer:
             },
             {
                 "name": "get_file_content",
-                "description": "读取指定文件的内容",
+                "description": "读取指定文件的内容（UTF-8 文本）。可按字节或按行读取一部分；"
+                               "内容超过单次上限时分段返回，并附带续读用的 cursor",
                 "inputSchema": {
                     "type": "object",
                     "properties": {
                         "file_path": {
                             "type": "string",
                             "description": "文件路径"
+                        },
+                        "offset": {
+                            "type": "integer",
+                            "description": "起始字节位置（可选，默认0）",
+                            "minimum": 0
+                        },
+                        "length": {
+                            "type": "integer",
+                            "description": "读取的字节数（可选，默认读到文件末尾）",
+                            "minimum": 0
+                        },
+                        "start_line": {
+                            "type": "integer",
+                            "description": "起始行号（可选，从1开始；不能与 offset/length 同时使用）",
+                            "minimum": 1
+                        },
+                        "end_line": {
+                            "type": "integer",
+                            "description": "结束行号（可选，包含该行，默认到最后一行）",
+                            "minimum": 1
+                        },
+                        "max_bytes": {
+                            "type": "integer",
+                            "description": f"单次最多返回的字节数（可选，不超过 {MAX_READ_BYTES}）",
+                            "minimum": 1,
+                            "maximum": MAX_READ_BYTES
+                        },
+                        "cursor": {
+                            "type": "string",
+                            "description": "上次返回的续读游标，用于读取剩余部分（同时需提供相同的 file_path）"
                         }
                     },
                     "required": ["file_path"]
@@ -167,10 +400,12 @@ class MCPServer:
             if not isinstance(arguments, dict):
                 raise ValueError("参数必须为字典类型")
             result = self.tools[name](arguments) if arguments else self.tools[name]()
+            # 工具可以直接返回多段内容（列表），否则作为一段文本
+            content = result if isinstance(result, list) else [{"type": "text", "text": result}]
             return {
                 "jsonrpc": "2.0",
                 "id": request.get("id"),
-                "result": {"content": [{"type": "text", "text": result}]}
+                "result": {"content": content}
             }
         except Exception as e:
             logging.warning(f"工具调用异常: {e}")
@@ -186,124 +421,246 @@ class MCPServer:
     
     def get_food_recommendation(self, args: Dict[str, Any]) -> str:
         """获取食物推荐"""
-        weather = args.get("weather")
+        result = recommend_for_user(
+            args.get("weather"), args.get("budget"), args.get("min_health"), args.get("user_id"),
+            k=args.get("k", 1)
+        )
+        return format_recommendation(result)
+    
+    def recommend_batch(self, args: Dict[str, Any]) -> str:
+        """批量获取食物推荐"""
+        requests = args.get("requests") or []
+        k = args.get("k", 1)
+        recommendations = recommend_batch(
+            [(r.get("weather"), r.get("budget"), r.get("min_health"), r.get("user_id")) for r in requests],
+            seed=args.get("seed"), k=k,
+        )
+        lines = []
+        for i, (request, food) in enumerate(zip(requests, recommendations), 1):
+            who = f"[{request['user_id']}] " if request.get("user_id") else ""
+            if k > 1:
+                names = "、".join(f"{option.name}(¥{option.min_price}-{option.max_price})" for option in food)
+                lines.append(f"{i}. {who}{names or '没有找到符合要求的食物'}")
+            elif food is None:
+                lines.append(f"{i}. {who}没有找到符合要求的食物")
+            else:
+                lines.append(f"{i}. {who}{food.name} (¥{food.min_price}-{food.max_price}，健康度{food.health_rating}分)")
+        return "\n".join(lines)
+    
+    def plan_meals(self, args: Dict[str, Any]) -> str:
+        """生成多日饮食计划"""
+        days = args.get("days", 7)
+        result = make_meal_plan(
+            days, args.get("total_budget"), args.get("min_avg_health"),
+            args.get("weathers"), args.get("user_id")
+        )
+        plan = result.plan
+        if plan is None:
+            if result.truncated:
+                return "抱歉，搜索量超过上限仍未找到可行的饮食计划。请减少天数或放宽条件后重试。"
+            return "抱歉，没有找到满足条件的饮食计划。请提高预算、降低健康度要求，或清空近期饮食记录。"
+        lines = [f"📅 {days}天饮食计划："]
+        if result.truncated:
+            lines.append("（搜索量超过上限，以下是目前找到的最好方案，不一定最优）")
+        for day, food in enumerate(plan, 1):
+            lines.append(f"- 第{day}天: **{food.name}** (¥{food.min_price}-{food.max_price}，健康度{food.health_rating}分)")
+        total = sum(food.min_price for food in plan)
+        avg_health = sum(food.health_rating for food in plan) / len(plan)
+        lines.append(f"\n预计最低花费: ¥{total}，平均健康度: {avg_health:.1f}")
+        return "\n".join(lines)
+    
+    def optimize_group_order(self, args: Dict[str, Any]) -> str:
+        """团餐点单"""
+        min_healths = args.get("min_healths")
+        if not min_healths:
+            people = args.get("people")
+            if people is None:
+                raise ValueError("需要提供 people 或 min_healths")
+            if isinstance(people, bool) or not isinstance(people, int) or people < 1:
+                raise ValueError("人数必须是大于0的整数")
+            min_healths = [args.get("min_health", 1)] * people
         budget = args.get("budget")
-        min_health = args.get("min_health")
-        
-        food_options = get_food_options()
-        recent_foods = set(read_recent_foods())
-        
-        # 筛选符合条件的食物
-        suitable_options = [
-            food for food in food_options
-            if (food.min_price <= budget and 
-                food.health_rating >= min_health and 
-                food.name not in recent_foods)
-        ]
-        
-        # 根据天气优先筛选
-        weather_options = [food for food in suitable_options if weather in food.tags]
-        if weather_options:
-            suitable_options = weather_options
-            
-        if not suitable_options:
-            return "抱歉，没有找到符合您要求的食物。请调整预算或健康度要求，或清空近期饮食记录。"
-            
-        import random
-        recommendation = random.choice(suitable_options)
-        
-        # 添加到最近记录
-        add_recent_food(recommendation.name)
-        
-        result = f"""🌞 今天推荐：**{recommendation.name}** 😋
-
-📊 推荐详情：
-- **价格范围**: ¥{recommendation.min_price}-{recommendation.max_price}
-- **健康度评分**: {'🍎' * recommendation.health_rating}{'⭐' * (10-recommendation.health_rating)} ({recommendation.health_rating}分)
-- **推荐理由**: {recommendation.description}
-- **适合天气**: {', '.join(recommendation.tags)}
-
-🎯 为什么推荐这个？
-- 符合你的预算要求（¥{budget}以内）
-- 健康度{recommendation.health_rating}分，超过你的{min_health}分要求
-- 适合{weather}天气
-- 营养均衡，口感佳
-
-今天是个好天气，来一份{recommendation.name}吧！既满足了你的健康要求，又不会超出预算。😋"""
-        
-        return result
+        order = make_group_order(
+            min_healths, budget, args.get("weather"),
+            args.get("method", "auto"), args.get("use_max_price", False)
+        )
+        if order is None:
+            return "抱歉，预算内没有满足所有人健康度要求的点单方案。请提高预算或降低健康度要求。"
+        lines = [f"👥 {len(order)}人团餐点单："]
+        for person, (food, min_health) in enumerate(zip(order, min_healths), 1):
+            lines.append(f"- 第{person}位（健康度≥{min_health}）: **{food.name}** (¥{food.min_price}-{food.max_price}，健康度{food.health_rating}分)")
+        low = sum(food.min_price for food in order)
+        high = sum(food.max_price for food in order)
+        lines.append(f"\n预计总价: ¥{low}-{high}（预算 ¥{budget}）")
+        return "\n".join(lines)
+    
+    def search_foods(self, args: Dict[str, Any]) -> str:
+        """搜索菜品"""
+        query = args.get("query")
+        return format_search_results(query, search_foods(query, args.get("limit", 10)))
     
     def add_recent_food(self, args: Dict[str, Any]) -> str:
         """添加最近食物记录"""
         food_name = args.get("food_name")
-        add_recent_food(food_name)
-        return f"已成功添加 '{food_name}' 到食物记录中"
+        saved = add_recent_food(food_name, args.get("user_id"))
+        message = f"已成功添加 '{saved}' 到食物记录中"
+        suggestions = suggest_food_names(saved)
+        if suggestions:
+            message += f"（目录中没有这道菜，是否指：{'、'.join(suggestions)}？）"
+        return message
     
-    def get_recent_foods(self) -> str:
+    def get_recent_foods(self, args: Optional[Dict[str, Any]] = None) -> str:
         """获取最近食物记录"""
-        foods = read_recent_foods()
+        foods = read_recent_foods((args or {}).get("user_id"))
         if not foods:
             return "暂无食物记录"
         return f"最近食用的食物：\n" + "\n".join([f"- {food}" for food in foods])
     
-    def clear_recent_foods(self) -> str:
+    def clear_recent_foods(self, args: Optional[Dict[str, Any]] = None) -> str:
         """清空最近食物记录"""
-        clear_recent_foods()
+        clear_recent_foods((args or {}).get("user_id"))
         return "已清空食物记录"
     
-    def get_football_stats(self, args: Dict[str, Any]) -> str:
-        """获取足球统计数据"""
+    def get_football_stats(self, args: Optional[Dict[str, Any]] = None) -> str:
+        """获取足球统计数据（进程内调用，按赛季缓存）"""
+        season_id = (args or {}).get("season_id", 719)
+        if isinstance(season_id, bool) or not isinstance(season_id, int) or season_id <= 0:
+            raise ValueError("赛季ID必须是正整数")
+        # 按需导入：抓取依赖（requests、bs4）不拖慢服务启动
+        from football_stats import get_football_report
+        return get_football_report(season_id)
+    
+    def get_file_content(self, args: Dict[str, Any]) -> Union[str, List[Dict[str, Any]]]:
+        """
+        读取文件内容。整个文件一次读完时只返回文本；
+        否则返回两段内容：文件片段，以及范围说明和续读游标。
+        """
+        file_path = args.get("file_path")
+        if not isinstance(file_path, str) or not file_path:
+            raise ValueError("需要提供 file_path")
         try:
-            result = subprocess.run(
-                ["python3", "football_stats.py"],
-                capture_output=True,
-                text=True,
-                timeout=60
+            chunk = read_chunk(
+                file_path, args.get("offset"), args.get("length"), args.get("start_line"),
+                args.get("end_line"), args.get("cursor"), args.get("max_bytes")
             )
-            if result.returncode == 0:
-                return result.stdout
+        except (OSError, UnicodeDecodeError) as e:
+            return f"读取文件失败: {str(e)}"
+        if chunk.complete:
+            return chunk.text
+        status = f"[{file_path}：字节 {chunk.start}-{chunk.stop}，共 {chunk.size} 字节"
+        if chunk.lines is not None and chunk.lines[0] <= chunk.lines[1]:
+            status += f"；第 {chunk.lines[0]}-{chunk.lines[1]} 行"
+        if chunk.cursor is not None:
+            status += f"。未读完，传入 cursor=\"{chunk.cursor}\" 继续读取]"
+        else:
+            status += "。所选范围已读完]"
+        return [{"type": "text", "text": chunk.text}, {"type": "text", "text": status}]
+    
+    def handle_request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """处理一个请求，返回响应"""
+        method = request.get("method")
+        if method == "initialize":
+            return self.handle_initialize(request)
+        if method == "tools/list":
+            return self.handle_list_tools(request)
+        if method == "ping":
+            return {"jsonrpc": "2.0", "id": request.get("id"), "result": {}}
+        if method == "tools/call":
+            return self.handle_call_tool(request)
+        return self.error_response(request.get("id"), -32601, f"Method not found: {method}")
+    
+    async def process(self, request: Any, executors: Dict[str, ThreadPoolExecutor],
+                      limits: Dict[str, asyncio.Semaphore]) -> Optional[Dict[str, Any]]:
+        """
+        处理一个请求，返回响应；通知（没有 id 的请求）照常执行但返回 None。
+        工具调用在线程池中执行（IO_TOOLS 用 executors["io"]，其余用 executors["cpu"]），
+        受该工具的并发上限约束，超过 tool_timeouts 中的时限时返回超时错误。
+        """
+        if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+            return self.error_response(None, -32600, "Invalid Request")
+        if request["method"] == "tools/call":
+            params = request.get("params")
+            name = params.get("name") if isinstance(params, dict) else None
+            limit = limits.get(name)
+            if limit is None:
+                response = await self.call_tool(request, name, executors)
             else:
-                return f"获取足球数据失败: {result.stderr}"
-        except Exception as e:
-            return f"执行足球数据脚本失败: {str(e)}"
+                async with limit:
+                    response = await self.call_tool(request, name, executors)
+        else:
+            response = self.handle_request(request)
+        return response if "id" in request else None
+
+    async def call_tool(self, request: Dict[str, Any], name: Any,
+                        executors: Dict[str, ThreadPoolExecutor]) -> Dict[str, Any]:
+        """在对应的线程池中执行一次工具调用"""
+        loop = asyncio.get_running_loop()
+        executor = executors["io" if name in IO_TOOLS else "cpu"]
+        call = loop.run_in_executor(executor, self.handle_call_tool, request)
+        timeout = self.tool_timeouts.get(name)
+        if timeout is None:
+            return await call
+        try:
+            return await asyncio.wait_for(call, timeout)
+        except asyncio.TimeoutError:
+            # 线程中的调用无法中断，会在后台继续执行完，但不再占用并发名额
+            logging.warning(f"工具调用超时: {name}")
+            return self.error_response(request.get("id"), -32603, f"工具 {name} 调用超时（{timeout:g} 秒），请稍后重试")
     
-    def get_file_content(self, args: Dict[str, Any]) -> str:
-        """读取文件内容"""
-        file_path = args.get("file_path")
+    async def dispatch(self, message: Any, executors: Dict[str, ThreadPoolExecutor],
+                       limits: Dict[str, asyncio.Semaphore]):
+        """
+        处理一条消息并写出响应。批量请求（数组）中的请求并发执行，响应合并为一个数组写出；
+        全部是通知时不输出。
+        """
+        if message is PARSE_ERROR:
+            self.send_response(self.error_response(None, -32700, "Parse error"))
+        elif isinstance(message, list):
+            if not message:
+                self.send_response(self.error_response(None, -32600, "Invalid Request"))
+                return
+            responses = await asyncio.gather(*(self.process(request, executors, limits) for request in message))
+            responses = [response for response in responses if response is not None]
+            if responses:
+                self.send_response(responses)
+        else:
+            response = await self.process(message, executors, limits)
+            if response is not None:
+                self.send_response(response)
+    
+    async def serve(self):
+        """
+        持续读取请求并并发处理：工具调用在线程池中执行，响应按完成顺序写出，由 JSON-RPC id 对应请求；
+        一个慢调用不会阻塞其后的请求。输入结束后等待所有进行中的调用完成。
+        """
+        limits = {name: asyncio.Semaphore(limit) for name, limit in self.tool_concurrency.items()}
+        executors = {
+            "cpu": ThreadPoolExecutor(self.max_concurrent_calls, thread_name_prefix="mcp-tool"),
+            "io": ThreadPoolExecutor(self.max_io_calls, thread_name_prefix="mcp-io"),
+        }
+        pending = set()
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except Exception as e:
-            return f"读取文件失败: {str(e)}"
+            async for message in self.transport.messages():
+                task = asyncio.create_task(self.dispatch(message, executors, limits))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            for executor in executors.values():
+                executor.shutdown(wait=True)
+            self.transport.flush()
     
     def run(self):
         """运行 MCP 服务器"""
         print("MCP Food Recommendation Server is starting...", file=sys.stderr)
-        
-        while True:
-            request = self.read_request()
-            if request is None:
-                break
-                
-            method = request.get("method")
-            
-            if method == "initialize":
-                response = self.handle_initialize(request)
-            elif method == "tools/list":
-                response = self.handle_list_tools(request)
-            elif method == "tools/call":
-                response = self.handle_call_tool(request)
-            else:
-                response = {
-                    "jsonrpc": "2.0",
-                    "id": request.get("id"),
-                    "error": {
-                        "code": -32601,
-                        "message": f"Method not found: {method}"
-                    }
-                }
-            
-            self.send_response(response)
+        # 菜单更新后在后台重新加载食物目录，无需重启服务
+        watcher = watch_food_catalog() if CATALOG_POLL_INTERVAL > 0 else None
+        try:
+            asyncio.run(self.serve())
+        finally:
+            if watcher is not None:
+                watcher.stop()
 
 if __name__ == "__main__":
     server = MCPServer()
@@ -0,0 +1,185 @@
+"""
+MCP 标准输入输出传输层：每行一条 JSON-RPC 消息。
+
+- BufferedTransport（默认）：从 sys.stdin.buffer 按字节读取（有事件循环时用非阻塞管道），
+  安装了 orjson 时用它编解码；同一轮事件循环中产生的响应合并为一次写入和一次 flush。
+- LineTransport：逐行读取文本、print(flush=True) 写出，每条响应单独 flush，用于调试和对比测试。
+
+设置环境变量 MCP_TRANSPORT=line 可切换为 LineTransport。
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+try:
+    import orjson
+except ImportError:  # 没有 orjson 时使用标准库 json
+    orjson = None
+
+# 读取标准输入的缓冲区大小
+BUFFER_SIZE = 1 << 16
+# 单条消息的最大字节数
+MAX_MESSAGE_SIZE = 64 << 20
+
+# read_message 读到无法解析的 JSON 时的返回值
+PARSE_ERROR = object()
+
+
+def dumps(message):
+    """把消息编码为 UTF-8 字节（不含换行）"""
+    if orjson is not None:
+        return orjson.dumps(message)
+    return json.dumps(message).encode('utf-8')
+
+
+def loads(data):
+    """解析一条消息（bytes 或 str），无法解析时返回 PARSE_ERROR"""
+    try:
+        return orjson.loads(data) if orjson is not None else json.loads(data)
+    except ValueError:
+        return PARSE_ERROR
+
+
+class LineTransport:
+    """逐行文本读写，每条响应单独写出并 flush"""
+
+    def __init__(self, stdin=None, stdout=None):
+        self.stdin = stdin or sys.stdin
+        self.stdout = stdout or sys.stdout
+
+    def read_message(self):
+        """阻塞读取一条消息，跳过空行；输入结束时返回 None"""
+        while True:
+            line = self.stdin.readline()
+            if not line:
+                return None
+            if line.strip():
+                return loads(line)
+
+    async def messages(self):
+        """异步逐条产生消息（阻塞读取放在单独的线程中）"""
+        loop = asyncio.get_running_loop()
+        while True:
+            message = await loop.run_in_executor(None, self.read_message)
+            if message is None:
+                return
+            yield message
+
+    def send(self, message):
+        print(json.dumps(message), file=self.stdout, flush=True)
+
+    def flush(self):
+        self.stdout.flush()
+
+
+class BufferedTransport:
+    """
+    字节流读写。messages() 优先把标准输入接入事件循环（管道），
+    终端或不支持时（如重定向自普通文件）退回到线程中阻塞读取。
+    send() 在事件循环中只把响应放入待写列表，并在本轮循环末尾统一写出；没有事件循环时立即写出。
+    """
+
+    def __init__(self, stdin=None, stdout=None, buffer_size=BUFFER_SIZE):
+        self.stdin = stdin if stdin is not None else sys.stdin.buffer
+        self.stdout = stdout if stdout is not None else sys.stdout.buffer
+        self.buffer_size = buffer_size
+        self._input = None
+        self._pending = []
+        self._loop = None
+        self._flush_scheduled = False
+
+    def read_message(self):
+        """阻塞读取一条消息，跳过空行；输入结束时返回 None"""
+        if self._input is None:
+            try:
+                self._input = open(self.stdin.fileno(), 'rb', buffering=self.buffer_size, closefd=False)
+            except (AttributeError, OSError, ValueError):
+                # 不是真实文件（如 io.BytesIO）时直接读取
+                self._input = self.stdin
+        while True:
+            line = self._input.readline()
+            if not line:
+                return None
+            if line.strip():
+                return loads(line)
+
+    async def _pipe_reader(self, loop):
+        """
+        把标准输入接入事件循环，返回 (reader, 原来是否为阻塞模式)；不支持时返回 None。
+        connect_read_pipe 会把标准输入设为非阻塞，而复制的描述符与原标准输入共享这一标志。
+        终端的输入输出通常是同一个打开的文件，非阻塞后写标准输出可能抛出 BlockingIOError，
+        所以终端不接入事件循环。
+        """
+        try:
+            fd = self.stdin.fileno()
+            if os.isatty(fd):
+                return None
+            blocking = os.get_blocking(fd)
+            pipe = os.fdopen(os.dup(fd), 'rb', buffering=0)
+        except (AttributeError, OSError, ValueError):
+            return None
+        reader = asyncio.StreamReader(limit=MAX_MESSAGE_SIZE, loop=loop)
+        try:
+            await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader, loop=loop), pipe)
+        except (OSError, ValueError, NotImplementedError):
+            pipe.close()
+            os.set_blocking(fd, blocking)
+            return None
+        return reader, blocking
+
+    async def messages(self):
+        """异步逐条产生消息，输入结束时停止"""
+        loop = asyncio.get_running_loop()
+        self._loop = loop
+        connected = await self._pipe_reader(loop)
+        if connected is None:
+            while True:
+                message = await loop.run_in_executor(None, self.read_message)
+                if message is None:
+                    return
+                yield message
+        reader, blocking = connected
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # 超过 MAX_MESSAGE_SIZE 的行：丢弃到下一个换行
+                    yield PARSE_ERROR
+                    continue
+                if not line:
+                    return
+                if line.strip():
+                    yield loads(line)
+        finally:
+            # 恢复标准输入原来的阻塞模式（与其他进程共享的管道不受影响）
+            try:
+                os.set_blocking(self.stdin.fileno(), blocking)
+            except (OSError, ValueError):
+                pass
+
+    def send(self, message):
+        self._pending.append(dumps(message) + b"\n")
+        if self._loop is None or self._loop.is_closed():
+            self.flush()
+        elif not self._flush_scheduled:
+            self._flush_scheduled = True
+            self._loop.call_soon(self.flush)
+
+    def flush(self):
+        """写出所有待写的响应"""
+        self._flush_scheduled = False
+        if self._pending:
+            data = b"".join(self._pending)
+            self._pending.clear()
+            self.stdout.write(data)
+            self.stdout.flush()
+
+
+def default_transport():
+    """按环境变量 MCP_TRANSPORT 选择传输层（buffered 或 line）"""
+    if os.environ.get('MCP_TRANSPORT', 'buffered') == 'line':
+        return LineTransport()
+    return BufferedTransport()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+测试按范围读取文件：续读游标往返、文件修改后游标失效、单次读取上限、文件末尾的行范围
+"""
+
+import os
+
+import pytest
+
+import file_chunks
+from file_chunks import decode_cursor, read_chunk
+
+
+def write(tmp_path, content, name='sample.txt'):
+    path = tmp_path / name
+    path.write_bytes(content.encode('utf-8'))
+    return str(path)
+
+
+def read_all(path, **kwargs):
+    """按游标读到结束，返回每次读取的结果"""
+    chunks = [read_chunk(path, **kwargs)]
+    while chunks[-1].cursor is not None:
+        chunks.append(read_chunk(path, cursor=chunks[-1].cursor, max_bytes=kwargs.get('max_bytes')))
+    return chunks
+
+
+def test_cursor_round_trip_by_bytes(tmp_path):
+    content = '今天吃什么？' * 50 + 'end'
+    path = write(tmp_path, content)
+    chunks = read_all(path, max_bytes=10)
+    assert ''.join(chunk.text for chunk in chunks) == content
+    assert len(chunks) > 1
+    # 相邻的块首尾相接，且每块都不超过上限
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.start == previous.stop
+    assert all(chunk.stop - chunk.start <= 10 for chunk in chunks)
+    assert chunks[-1].stop == chunks[-1].size
+
+
+def test_cursor_round_trip_by_lines(tmp_path):
+    lines = [f'第{i}行：' + '菜' * (i % 5) + '\n' for i in range(1, 41)]
+    path = write(tmp_path, ''.join(lines))
+    chunks = read_all(path, start_line=5, end_line=30, max_bytes=64)
+    assert ''.join(chunk.text for chunk in chunks) == ''.join(lines[4:30])
+    # 按行读取时每块都在行尾切分，行号连续
+    assert all(chunk.text.endswith('\n') for chunk in chunks)
+    assert chunks[0].lines[0] == 5
+    assert chunks[-1].lines[1] == 30
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.lines[0] == previous.lines[1] + 1
+
+
+def test_cursor_is_invalid_after_file_changes(tmp_path):
+    path = write(tmp_path, 'a' * 100)
+    chunk = read_chunk(path, max_bytes=10)
+    with open(path, 'ab') as f:
+        f.write(b'more')
+    with pytest.raises(ValueError, match='已被修改'):
+        read_chunk(path, cursor=chunk.cursor)
+
+
+def test_cursor_is_invalid_after_same_size_rewrite(tmp_path):
+    path = write(tmp_path, 'a' * 100)
+    chunk = read_chunk(path, max_bytes=10)
+    stat = os.stat(path)
+    with open(path, 'r+b') as f:
+        f.write(b'b' * 100)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    with pytest.raises(ValueError, match='已被修改'):
+        read_chunk(path, cursor=chunk.cursor)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-a-cursor', 'W10=', 'WzUsIDEsIDEwLCAwLCAwXQ=='])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError, match='无效的续读游标'):
+        decode_cursor(cursor)
+
+
+def test_max_bytes_is_clamped_to_server_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(file_chunks, 'MAX_READ_BYTES', 16)
+    path = write(tmp_path, 'x' * 100)
+    chunk = read_chunk(path, max_bytes=1000)
+    assert chunk.stop - chunk.start == 16
+    assert chunk.cursor is not None
+    # 游标续读同样受上限约束
+    assert read_chunk(path, cursor=chunk.cursor, max_bytes=1000).stop == 32
+    assert read_chunk(path, max_bytes=4).stop == 4
+
+
+def test_small_max_bytes_returns_at_least_one_character(tmp_path):
+    path = write(tmp_path, '鱼香肉丝')
+    chunk = read_chunk(path, max_bytes=1)
+    assert chunk.text == '鱼'
+    assert chunk.stop == 3
+
+
+@pytest.mark.parametrize('content', ['a\nb\nc', 'a\nb\nc\n'])
+def test_line_ranges_at_end_of_file(tmp_path, content):
+    path = write(tmp_path, content)
+    last = read_chunk(path, start_line=3, end_line=100)
+    assert last.text == content[4:]
+    assert last.lines == (3, 3)
+    assert last.cursor is None
+    past_end = read_chunk(path, start_line=10)
+    assert past_end.text == ''
+    assert past_end.cursor is None
+    assert past_end.lines[0] > past_end.lines[1]
+    assert read_chunk(path, end_line=2).text == 'a\nb\n'
+
+
+def test_empty_file(tmp_path):
+    path = write(tmp_path, '')
+    assert read_chunk(path).complete
+    assert read_chunk(path, start_line=1).text == ''
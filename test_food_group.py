@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+测试团餐点单：参数在求解前校验，显式指定 dp 时同样受动态规划表规模限制
+"""
+
+import pytest
+
+import food_group
+from food_catalog import FoodCatalog
+from food_group import optimize_group_order
+from food_recommendation import DISH_ALIASES, builtin_food_options
+
+
+def builtin_catalog():
+    return FoodCatalog.from_options(builtin_food_options(), aliases=DISH_ALIASES)
+
+
+def test_each_person_gets_a_distinct_dish():
+    catalog = builtin_catalog()
+    order = optimize_group_order(catalog, [8, 5, 1], 100, method='dp')
+    assert len(set(order)) == 3
+    assert all(catalog.health[i] >= h for i, h in zip(order, [8, 5, 1]))
+    assert sum(catalog.min_price[i] for i in order) <= 100
+
+
+@pytest.mark.parametrize('min_healths, budget', [
+    ([], 100), ([5, 5], 0), ([5, 5], -20), ([5, 5], float('nan')), ([5, 5], '100'), ([5, True], 100),
+])
+def test_rejects_invalid_arguments(min_healths, budget):
+    with pytest.raises(ValueError):
+        optimize_group_order(builtin_catalog(), min_healths, budget)
+
+
+def test_explicit_dp_respects_cell_limit(monkeypatch):
+    catalog = builtin_catalog()
+    monkeypatch.setattr(food_group, 'DP_MAX_CELLS', 10)
+    with pytest.raises(ValueError, match='动态规划表规模'):
+        optimize_group_order(catalog, [5, 5], 100, method='dp')
+    # auto 模式超过上限时改用贪心，仍能给出方案
+    assert optimize_group_order(catalog, [5, 5], 100, method='auto') is not None
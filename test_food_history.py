@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+测试饮食记录后端：环形缓冲区与 SQLite 对用户标识的处理一致，环形缓冲区的覆盖、并发写入与旧版记录导入
+"""
+
+import multiprocessing
+
+import pytest
+
+from food_history import DEFAULT_USER, HistoryBackend, RingBufferHistory, SQLiteHistory, fcntl
+
+
+def backends(tmp_path):
+    return [
+        RingBufferHistory(str(tmp_path / 'recent_foods.bin'), capacity=7),
+        SQLiteHistory(str(tmp_path / 'history.db'), limit=7),
+    ]
+
+
+def test_backend_interface_is_abstract():
+    with pytest.raises(TypeError):
+        HistoryBackend()
+
+
+def test_default_user_is_the_same_in_every_backend(tmp_path):
+    for history in backends(tmp_path):
+        history.append('鱼香肉丝')
+        history.append('宫保鸡丁', DEFAULT_USER)
+        history.append_many([(None, '麻婆豆腐'), (42, '牛肉面')])
+        assert history.read() == ['鱼香肉丝', '宫保鸡丁', '麻婆豆腐']
+        assert history.read(DEFAULT_USER) == history.read()
+        assert history.read('42') == history.read(42) == ['牛肉面']
+        assert sorted(set(history.iter_events())) == sorted({
+            (DEFAULT_USER, '鱼香肉丝'), (DEFAULT_USER, '宫保鸡丁'), (DEFAULT_USER, '麻婆豆腐'), ('42', '牛肉面'),
+        })
+        history.clear(DEFAULT_USER)
+        assert history.read() == []
+        assert history.read(42) == ['牛肉面']
+
+
+def test_ring_buffer_wraps_around(tmp_path):
+    path = tmp_path / 'recent_foods.bin'
+    history = RingBufferHistory(str(path), capacity=3)
+    for i in range(8):
+        history.append(f'菜{i}')
+    assert history.read() == ['菜5', '菜6', '菜7']
+    # 只覆盖槽位，文件大小不随写入条数增长
+    size = path.stat().st_size
+    history.append_many([(None, '菜8'), (None, '菜9'), (None, '菜10'), (None, '菜11')])
+    assert history.read() == ['菜9', '菜10', '菜11']
+    assert path.stat().st_size == size
+
+
+def test_ring_buffer_truncates_long_names_on_character_boundary(tmp_path):
+    history = RingBufferHistory(str(tmp_path / 'recent_foods.bin'), capacity=2, slot_size=9)
+    history.append('宫保鸡丁盖饭')
+    assert history.read() == ['宫保']
+
+
+def _append_worker(path, worker, count, barrier):
+    history = RingBufferHistory(path, capacity=1000)
+    # 所有进程同时开始写，确保写入交错
+    barrier.wait()
+    for i in range(count):
+        history.append(f'{worker}-{i}')
+
+
+@pytest.mark.skipif(fcntl is None, reason='需要 fcntl 文件锁')
+def test_concurrent_appends_are_not_lost(tmp_path):
+    path = str(tmp_path / 'recent_foods.bin')
+    workers, count = 4, 200
+    barrier = multiprocessing.Barrier(workers)
+    processes = [
+        multiprocessing.Process(target=_append_worker, args=(path, w, count, barrier)) for w in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+        assert process.exitcode == 0
+    foods = RingBufferHistory(path, capacity=1000).read()
+    assert sorted(foods) == sorted(f'{w}-{i}' for w in range(workers) for i in range(count))
+    # 每个进程自己的记录保持写入顺序
+    for w in range(workers):
+        mine = [food for food in foods if food.startswith(f'{w}-')]
+        assert mine == [f'{w}-{i}' for i in range(count)]
+
+
+def test_legacy_text_history_is_imported_for_default_user(tmp_path):
+    legacy = tmp_path / 'recent_foods.txt'
+    legacy.write_text('鱼香肉丝\n\n宫保鸡丁\n麻婆豆腐\n回锅肉\n', encoding='utf-8')
+    path = tmp_path / 'recent_foods.bin'
+    history = RingBufferHistory(str(path), capacity=3, legacy_path=str(legacy))
+    # 还没有环形缓冲区文件时直接读旧版记录
+    assert history.read() == ['宫保鸡丁', '麻婆豆腐', '回锅肉']
+    assert not path.exists()
+    # 第一次写入时导入旧版记录，之后以环形缓冲区为准
+    history.append('水煮鱼')
+    assert history.read() == ['麻婆豆腐', '回锅肉', '水煮鱼']
+    legacy.write_text('不会再被读取\n', encoding='utf-8')
+    assert history.read() == ['麻婆豆腐', '回锅肉', '水煮鱼']
+    # 其他用户不继承默认用户的旧版记录
+    assert history.read('alice') == []
+    history.clear()
+    assert history.read() == []
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+测试菜名解析：只归并别名、规范化和主食后缀不同的写法，不把另一道菜当成错别字
+"""
+
+from food_catalog import FoodCatalog
+from food_names import NameIndex
+from food_recommendation import DISH_ALIASES, builtin_food_options
+
+
+def builtin_catalog():
+    return FoodCatalog.from_options(builtin_food_options(), aliases=DISH_ALIASES)
+
+
+def test_resolves_variants():
+    catalog = builtin_catalog()
+    assert catalog.resolve_name("宫保鸡丁") == "宫保鸡丁"
+    assert catalog.resolve_name(" 宫保鸡丁！") == "宫保鸡丁"
+    assert catalog.resolve_name("宫爆鸡丁") == "宫保鸡丁"
+    assert catalog.resolve_name("kfc") == "肯德基"
+    assert catalog.resolve_id("黄焖鸡") == catalog.resolve_id("黄焖鸡米饭")
+
+
+def test_different_dishes_are_not_merged():
+    catalog = builtin_catalog()
+    for text in ("牛肉饭", "羊肉面", "蛋炒面", "鸡肉饭", "豆腐", "手抓饭"):
+        assert catalog.resolve_name(text) is None, text
+
+
+def test_implied_suffix_only_for_rice():
+    index = NameIndex(["黄焖鸡米饭", "豆腐套餐"])
+    assert index.resolve("黄焖鸡") == 0
+    assert index.resolve("豆腐") is None
+    assert index.resolve("豆腐套餐") == 1
+
+
+def test_set_meal_is_its_own_dish():
+    index = NameIndex(["豆腐", "豆腐套餐", "牛肉面"])
+    assert index.canonical.tolist() == [0, 1, 2]
+    assert index.resolve("豆腐套餐") == 1
+    assert index.resolve("豆腐") == 0
+
+
+def test_single_typo_resolves():
+    catalog = builtin_catalog()
+    assert catalog.resolve_name("鱼乡肉丝") == "鱼香肉丝"
+    assert catalog.resolve_name("鱼香肉") is None
+
+
+def test_tied_typo_returns_suggestions():
+    index = NameIndex(["红烧牛肉面", "红烧羊肉面", "清汤牛肉面"])
+    assert index.resolve("红烧猪肉面") is None
+    assert index.suggest("红烧猪肉面") == [0, 1]
+    assert index.suggest("红烧牛肉面") == []
+    # 类别（末两字）不同的名称不算错字
+    assert index.resolve("红烧牛肉饭") is None
+
+
+def test_unknown_name_excludes_nothing():
+    catalog = builtin_catalog()
+    assert len(catalog.ids_for_names(["牛肉饭"])) == 0
+    assert set(catalog.ids_for_names(["黄焖鸡"])) == set(catalog.ids_for_names(["黄焖鸡米饭"]))
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+测试多日饮食计划：长计划不依赖递归深度，搜索被截断时返回目前最好的方案，参数在入口处校验
+"""
+
+import pytest
+
+import food_recommendation
+from food_catalog import FoodCatalog
+from food_planner import PlanResult, plan_meals
+from food_recommendation import DISH_ALIASES, MAX_PLAN_DAYS, builtin_food_options, make_meal_plan
+
+
+def builtin_catalog():
+    return FoodCatalog.from_options(builtin_food_options(), aliases=DISH_ALIASES)
+
+
+def test_optimal_plan_has_distinct_dishes():
+    catalog = builtin_catalog()
+    result = plan_meals(catalog, 5, 200, 6)
+    assert result.status == PlanResult.OPTIMAL
+    assert len(result.plan) == 5
+    assert len(set(result.plan)) == 5
+    assert sum(catalog.min_price[i] for i in result.plan) <= 200
+
+
+def test_infeasible_plan():
+    result = plan_meals(builtin_catalog(), 3, 1, 6)
+    assert result.status == PlanResult.INFEASIBLE
+    assert result.plan is None
+
+
+def test_many_days_do_not_recurse():
+    # 天数远超解释器的递归上限；没有足够多不同类别的菜时应判为无解而不是栈溢出
+    result = plan_meals(builtin_catalog(), 5000, 10 ** 7, 1, max_nodes=10000)
+    assert result.status in (PlanResult.INFEASIBLE, PlanResult.TRUNCATED)
+
+
+def test_truncated_search_keeps_best_plan():
+    catalog = builtin_catalog()
+    full = plan_meals(catalog, 5, 200, 6)
+    cut = plan_meals(catalog, 5, 200, 6, max_nodes=len(full.plan) + 1)
+    assert cut.status == PlanResult.TRUNCATED
+    assert cut.truncated
+    assert cut.plan is None or len(cut.plan) == 5
+    none_found = plan_meals(catalog, 5, 200, 6, max_nodes=1)
+    assert none_found.status == PlanResult.TRUNCATED
+    assert none_found.plan is None
+
+
+@pytest.mark.parametrize('days, total_budget, min_avg_health', [
+    (0, 100, 5), (MAX_PLAN_DAYS + 1, 100, 5), (True, 100, 5), (2.5, 100, 5),
+    (3, 0, 5), (3, -10, 5), (3, '100', 5), (3, 100, 11),
+])
+def test_make_meal_plan_validates_arguments(monkeypatch, days, total_budget, min_avg_health):
+    monkeypatch.setattr(food_recommendation, 'get_food_catalog', builtin_catalog)
+    with pytest.raises(ValueError):
+        make_meal_plan(days, total_budget, min_avg_health)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+测试推荐抽样：拒绝抽样与批量抽样都与按完整权重抽样同分布，top_k 按 MMR 顺序返回不重复的菜，
+候选集缓存随目录版本失效
+"""
+
+import numpy as np
+import pytest
+
+from food_catalog import FoodCatalog, FoodOption
+from food_recommendation import DISH_ALIASES, builtin_food_options
+from food_scoring import ScoringEngine
+
+DRAWS = 40000
+
+
+def builtin_catalog(options=None):
+    return FoodCatalog.from_options(options or builtin_food_options(), aliases=DISH_ALIASES)
+
+
+def exact_distribution(engine, catalog, weather, budget, min_health, history, season):
+    """按完整权重归一化得到的 {菜品编号: 概率}"""
+    hi = int(np.searchsorted(catalog.min_price, budget, side='right'))
+    ids = np.flatnonzero(catalog.health[:hi] >= min_health)
+    weights = engine.score(catalog, ids, weather, budget, history, season)
+    return dict(zip(ids.tolist(), (weights / weights.sum()).tolist()))
+
+
+def assert_matches(draws, expected):
+    """每道菜的抽中频率与精确概率之差都在 5 个标准差以内，且不会抽到概率为 0 的菜"""
+    ids, counts = np.unique(np.asarray(draws), return_counts=True)
+    observed = dict(zip(ids.tolist(), (counts / len(draws)).tolist()))
+    assert set(observed) <= {i for i, p in expected.items() if p > 0}
+    for i, p in expected.items():
+        tolerance = 5 * np.sqrt(p * (1 - p) / len(draws)) + 1e-3
+        assert abs(observed.get(i, 0.0) - p) <= tolerance, (i, observed.get(i, 0.0), p)
+
+
+REQUEST = dict(weather='雨天', budget=30, min_health=5, season='冬季')
+
+
+@pytest.mark.parametrize('max_rejections', [64, 1])
+def test_sample_matches_exact_distribution(max_rejections):
+    # max_rejections 为 1 时大部分抽样走精确抽样的兜底路径，两条路径合起来也必须同分布
+    catalog = builtin_catalog()
+    engine = ScoringEngine(max_rejections=max_rejections)
+    names = list(catalog.names)
+    history = [names[0], names[3], names[5]]
+    expected = exact_distribution(engine, catalog, REQUEST['weather'], REQUEST['budget'],
+                                  REQUEST['min_health'], history, REQUEST['season'])
+    rng = np.random.default_rng(7)
+    draws = [engine.draw(catalog, REQUEST['weather'], REQUEST['budget'], REQUEST['min_health'],
+                         history, rng, REQUEST['season']) for _ in range(DRAWS)]
+    assert_matches(draws, expected)
+    # 昨天吃过的菜权重为 0，不会被抽中
+    assert expected.get(catalog.ids_for_names([history[-1]])[0], 0.0) == 0.0
+
+
+def test_draw_batch_matches_exact_distribution():
+    catalog = builtin_catalog()
+    engine = ScoringEngine()
+    history = [list(catalog.names)[2]]
+    expected = exact_distribution(engine, catalog, REQUEST['weather'], REQUEST['budget'],
+                                  REQUEST['min_health'], history, REQUEST['season'])
+    draws = engine.draw_batch(
+        catalog, [REQUEST['budget']] * DRAWS, [REQUEST['min_health']] * DRAWS, [REQUEST['weather']] * DRAWS,
+        [history] * DRAWS, np.random.default_rng(11), season=REQUEST['season'], chunk_cells=1 << 16,
+    )
+    assert (draws >= 0).all()
+    assert_matches(draws, expected)
+
+
+def test_draw_batch_marks_requests_without_candidates():
+    catalog = builtin_catalog()
+    draws = ScoringEngine().draw_batch(catalog, [1, 30], [5, 11], [None, None], [(), ()],
+                                       np.random.default_rng(0))
+    assert draws.tolist() == [-1, -1]
+
+
+def naive_mmr(engine, catalog, ids, relevance, k):
+    """不剪枝、逐对计算相似度的 MMR，作为 top_k 的参照"""
+    def similarity(a, b):
+        shared = bin(int(catalog.tag_mask[a]) & int(catalog.tag_mask[b])).count('1')
+        union = bin(int(catalog.tag_mask[a])).count('1') + bin(int(catalog.tag_mask[b])).count('1') - shared
+        jaccard = shared / union if union else 0.0
+        same_family = catalog.family_codes[a] == catalog.family_codes[b]
+        return (1 - engine.category_weight) * jaccard + engine.category_weight * same_family
+
+    chosen = []
+    remaining = list(range(len(ids)))
+    for _ in range(min(k, len(ids))):
+        def gain(j):
+            penalty = max((similarity(ids[j], ids[c]) for c in chosen), default=0.0)
+            return (1 - engine.diversity) * relevance[j] - engine.diversity * penalty
+        best = max(remaining, key=lambda j: (gain(j), -j))
+        chosen.append(best)
+        remaining.remove(best)
+    return [int(ids[j]) for j in chosen]
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2, 3])
+def test_top_k_returns_distinct_ids_in_mmr_order(seed):
+    catalog = builtin_catalog()
+    engine = ScoringEngine()
+    history = [list(catalog.names)[1]]
+    k = 5
+    ids, count = engine.top_k(catalog, REQUEST['weather'], REQUEST['budget'], REQUEST['min_health'], k,
+                              history, np.random.default_rng(seed), REQUEST['season'])
+    ids = ids.tolist()
+    assert len(ids) == k
+    assert len(set(ids)) == k
+    # 用同一个种子重算相关度，与朴素 MMR 的选择顺序一致
+    hi = int(np.searchsorted(catalog.min_price, REQUEST['budget'], side='right'))
+    candidates = np.flatnonzero(catalog.health[:hi] >= REQUEST['min_health'])
+    weights = engine.score(catalog, candidates, REQUEST['weather'], REQUEST['budget'], history, REQUEST['season'])
+    candidates, weights = candidates[weights > 0], weights[weights > 0]
+    assert count == len(candidates)
+    relevance = np.random.default_rng(seed).random(len(candidates)) ** (weights.max() / weights)
+    assert ids == naive_mmr(engine, catalog, candidates, relevance, k)
+
+
+def test_top_k_with_few_candidates_returns_all():
+    catalog = builtin_catalog()
+    ids, count = ScoringEngine().top_k(catalog, None, 1000, 8, 1000, rng=np.random.default_rng(0))
+    assert len(ids) == count == int(np.count_nonzero(catalog.health >= 8))
+    assert len(set(ids.tolist())) == len(ids)
+
+
+def test_candidate_cache_is_invalidated_by_catalog_version():
+    options = builtin_food_options()
+    engine = ScoringEngine()
+    old = builtin_catalog(options)
+    old_ids, _ = engine.candidates(old, '雨天', 30, 5)
+    # 同样的请求再次命中缓存
+    assert engine.candidates(old, '雨天', 30, 5)[0] is old_ids
+    # 新目录（版本号不同）去掉一道候选菜并新增一道，缓存的旧候选集不能再被使用
+    removed = old.names[int(old_ids[0])]
+    new_options = [option for option in options if option.name != removed]
+    new_options.append(FoodOption("测试新菜", 10, 12, 9, "新菜", ["雨天"]))
+    new = builtin_catalog(new_options)
+    assert new.version != old.version
+    new_ids, _ = engine.candidates(new, '雨天', 30, 5)
+    new_names = {new.names[i] for i in new_ids.tolist()}
+    assert removed not in new_names
+    assert "测试新菜" in new_names
+    rng = np.random.default_rng(3)
+    assert all(new.names[engine.draw(new, '雨天', 30, 5, rng=rng)] != removed for _ in range(200))
+
+
+def test_candidate_cache_is_bounded():
+    catalog = builtin_catalog()
+    engine = ScoringEngine(cache_size=2)
+    for budget in (15, 25, 35, 45):
+        engine.candidates(catalog, None, budget, 1)
+    assert len(engine._candidates) == 2
+    engine.clear_cache()
+    assert len(engine._candidates) == 0
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+测试英超数据缓存：只缓存真实数据，本地缓存带保存时间并在过期后失效
+"""
+
+import pickle
+import time
+
+import pandas as pd
+import pytest
+
+import football_stats
+
+
+@pytest.fixture
+def offline(monkeypatch, tmp_path):
+    """在临时目录中运行，网络请求一律失败，并记录请求次数"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(football_stats, '_report_cache', {})
+    calls = []
+
+    def fail(url, **kwargs):
+        calls.append(url)
+        raise football_stats.requests.ConnectionError('offline')
+
+    monkeypatch.setattr(football_stats.requests, 'get', fail)
+    return calls
+
+
+def live_table():
+    return pd.DataFrame([{"排名": 1, "球员": "Test Player", "球队": "Test FC", "进球": 30, "助攻": 3}])
+
+
+def test_mock_fallback_is_not_cached(offline, tmp_path):
+    first = football_stats.get_football_report()
+    assert '模拟数据' in first
+    second = football_stats.get_football_report()
+    assert second == first
+    # 两次调用都重新请求，进程内缓存和本地缓存里都没有模拟数据
+    assert len(offline) == 2
+    assert football_stats._report_cache == {}
+    assert list(tmp_path.glob('*.pkl')) == []
+
+
+def test_fresh_disk_cache_is_used_and_cached(offline):
+    with open('pl_goals_cache.pkl', 'wb') as f:
+        pickle.dump({'saved_at': time.time(), 'table': live_table()}, f)
+    report = football_stats.get_football_report()
+    assert 'Test Player' in report
+    assert '数据来源：英超官网' in report
+    assert offline == []
+    assert football_stats.DEFAULT_SEASON_ID in football_stats._report_cache
+
+
+@pytest.mark.parametrize('cached', [
+    {'saved_at': time.time() - football_stats.DISK_CACHE_TTL - 60, 'table': live_table()},
+    live_table(),  # 没有保存时间的旧版缓存
+])
+def test_stale_disk_cache_is_ignored(offline, cached):
+    with open('pl_goals_cache.pkl', 'wb') as f:
+        pickle.dump(cached, f)
+    report = football_stats.get_football_report()
+    assert 'Test Player' not in report
+    assert len(offline) == 1
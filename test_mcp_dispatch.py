@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+测试工具调用的调度：慢速网络工具有单独的线程池和超时，不会占满计算型工具的线程
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from mcp_server import MCPServer
+
+
+def call(request_id, name, arguments=None):
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+            "params": {"name": name, "arguments": arguments or {}}}
+
+
+def run_calls(server, requests):
+    async def main():
+        limits = {name: asyncio.Semaphore(limit) for name, limit in server.tool_concurrency.items()}
+        executors = {
+            "cpu": ThreadPoolExecutor(server.max_concurrent_calls),
+            "io": ThreadPoolExecutor(server.max_io_calls),
+        }
+        try:
+            return await asyncio.gather(*(server.process(request, executors, limits) for request in requests))
+        finally:
+            # 不等待超时后仍在后台执行的调用
+            for executor in executors.values():
+                executor.shutdown(wait=False)
+    return asyncio.run(main())
+
+
+def test_slow_fetch_times_out_without_starving_other_tools():
+    release = threading.Event()
+    server = MCPServer(max_concurrent_calls=1, max_io_calls=1, transport=object(),
+                       tool_timeouts={"get_football_stats": 0.2})
+
+    def slow_football(args=None):
+        release.wait(10)
+        return "football"
+
+    def quick(args=None):
+        return "quick"
+
+    server.tools["get_football_stats"] = slow_football
+    server.tools["clear_recent_foods"] = quick
+    try:
+        responses = run_calls(server, [call(1, "get_football_stats"), call(2, "get_football_stats"),
+                                       call(3, "clear_recent_foods")])
+    finally:
+        release.set()
+    football, queued, other = responses
+    assert "超时" in football["error"]["message"]
+    assert "超时" in queued["error"]["message"]
+    # 计算型工具只有一个线程，也没有被网络请求占用
+    assert other["result"]["content"][0]["text"] == "quick"
+
+
+def test_tools_without_timeout_wait_for_result():
+    server = MCPServer(transport=object(), tool_timeouts={})
+    server.tools["get_football_stats"] = lambda args=None: "football"
+    (response,) = run_calls(server, [call(1, "get_football_stats")])
+    assert response["result"]["content"][0]["text"] == "football"
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+测试 MCP 传输层：同一轮事件循环的响应合并写出，管道接入事件循环，终端退回到阻塞读取
+"""
+
+import asyncio
+import io
+import json
+import os
+
+import pytest
+
+import mcp_transport
+from mcp_transport import PARSE_ERROR, BufferedTransport, LineTransport
+
+
+class RecordingOutput(io.BytesIO):
+    """记录每次 write 和 flush 的输出"""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+        self.flushes = 0
+
+    def write(self, data):
+        self.writes.append(bytes(data))
+        return super().write(data)
+
+    def flush(self):
+        self.flushes += 1
+
+
+def decoded(data):
+    return [json.loads(line) for line in data.splitlines()]
+
+
+def test_responses_in_one_loop_turn_are_written_once():
+    output = RecordingOutput()
+    transport = BufferedTransport(stdin=io.BytesIO(), stdout=output)
+
+    async def main():
+        transport._loop = asyncio.get_running_loop()
+        transport.send({"id": 1})
+        transport.send({"id": 2})
+        await asyncio.sleep(0)
+        # 中间让出一次事件循环：前两条已写出，后面的写入另起一批
+        transport.send({"id": 3})
+        await asyncio.sleep(0)
+        transport.send({"id": 4})
+        transport.send({"id": 5})
+        transport.send({"id": 6})
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert [decoded(chunk) for chunk in output.writes] == [
+        [{"id": 1}, {"id": 2}], [{"id": 3}], [{"id": 4}, {"id": 5}, {"id": 6}],
+    ]
+    assert output.flushes == 3
+
+
+def test_interleaved_concurrent_senders_keep_every_response():
+    output = RecordingOutput()
+    transport = BufferedTransport(stdin=io.BytesIO(), stdout=output)
+
+    async def sender(worker):
+        for i in range(20):
+            transport.send({"worker": worker, "i": i})
+            await asyncio.sleep(0)
+
+    async def main():
+        transport._loop = asyncio.get_running_loop()
+        await asyncio.gather(*(sender(w) for w in range(3)))
+        transport.flush()
+
+    asyncio.run(main())
+    messages = decoded(output.getvalue())
+    assert len(messages) == 60
+    for w in range(3):
+        assert [m["i"] for m in messages if m["worker"] == w] == list(range(20))
+    # 各协程交替发送，每轮只写一次
+    assert len(output.writes) <= 21
+    assert all(chunk.endswith(b"\n") for chunk in output.writes)
+
+
+def test_send_without_loop_writes_immediately():
+    output = RecordingOutput()
+    transport = BufferedTransport(stdin=io.BytesIO(), stdout=output)
+    transport.send({"id": 1})
+    assert decoded(output.getvalue()) == [{"id": 1}]
+    assert output.flushes == 1
+
+
+async def collect(transport):
+    return [message async for message in transport.messages()]
+
+
+def test_in_memory_input_skips_blank_lines_and_reports_parse_errors():
+    transport = BufferedTransport(stdin=io.BytesIO(b'{"id": 1}\n\n  \nnot json\n{"id": 2}'), stdout=io.BytesIO())
+    assert asyncio.run(collect(transport)) == [{"id": 1}, PARSE_ERROR, {"id": 2}]
+
+
+def test_pipe_is_read_by_event_loop_and_blocking_mode_restored():
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, b'{"id": 1}\n{"id": 2}\n')
+    os.close(write_fd)
+    with open(read_fd, 'rb', buffering=0) as stdin:
+        assert os.get_blocking(read_fd)
+        transport = BufferedTransport(stdin=stdin, stdout=io.BytesIO())
+        assert asyncio.run(collect(transport)) == [{"id": 1}, {"id": 2}]
+        assert os.get_blocking(read_fd)
+
+
+def test_oversized_line_is_reported_and_skipped(monkeypatch):
+    monkeypatch.setattr(mcp_transport, 'MAX_MESSAGE_SIZE', 64)
+    read_fd, write_fd = os.pipe()
+    os.write(write_fd, b'{"pad": "' + b'x' * 200 + b'"}\n{"id": 2}\n')
+    os.close(write_fd)
+    with open(read_fd, 'rb', buffering=0) as stdin:
+        transport = BufferedTransport(stdin=stdin, stdout=io.BytesIO())
+        assert asyncio.run(collect(transport)) == [PARSE_ERROR, {"id": 2}]
+
+
+@pytest.mark.skipif(not hasattr(os, 'openpty'), reason='需要伪终端')
+def test_terminal_input_stays_blocking():
+    master, slave = os.openpty()
+    try:
+        stdin = open(slave, 'rb', buffering=0, closefd=False)
+        transport = BufferedTransport(stdin=stdin, stdout=io.BytesIO())
+
+        async def main():
+            # 终端不接入事件循环，而是在线程中阻塞读取
+            assert await transport._pipe_reader(asyncio.get_running_loop()) is None
+            os.write(master, b'{"id": 1}\n\x04')
+            return await collect(transport)
+
+        assert asyncio.run(main()) == [{"id": 1}]
+        assert os.get_blocking(slave)
+    finally:
+        os.close(master)
+        os.close(slave)
+
+
+def test_line_transport_flushes_each_response():
+    output = io.StringIO()
+    transport = LineTransport(stdin=io.StringIO('{"id": 1}\n\n{"id": 2}\n'), stdout=output)
+    assert asyncio.run(collect(transport)) == [{"id": 1}, {"id": 2}]
+    transport.send({"id": 3})
+    assert output.getvalue() == '{"id": 3}\n'
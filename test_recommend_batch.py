@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+测试批量推荐：同一用户在一批中的后续请求会避开前面刚推荐的菜，并与逐个推荐一样写入饮食记录
+"""
+
+import logging
+
+import pytest
+
+import food_recommendation
+from food_catalog import FoodCatalog, FoodOption
+from food_history import RingBufferHistory
+from food_recommendation import recommend_batch, show_recent_foods
+
+
+@pytest.fixture
+def two_dishes(monkeypatch, tmp_path):
+    """只有两道得分相同的菜的目录，饮食记录写到临时目录"""
+    catalog = FoodCatalog.from_options([
+        FoodOption("番茄炒蛋", 15, 20, 8, "家常", ["晴天"]),
+        FoodOption("清蒸鲈鱼", 15, 20, 8, "清淡", ["晴天"]),
+    ])
+    monkeypatch.setattr(food_recommendation, 'get_food_catalog', lambda: catalog)
+    monkeypatch.setattr(food_recommendation, 'get_guess_model', lambda: None)
+    history = RingBufferHistory(str(tmp_path / 'recent_foods.bin'), capacity=7)
+    monkeypatch.setattr(food_recommendation, '_history', history)
+    return history
+
+
+def test_same_user_twice_in_batch_gets_penalized_second_pick(two_dishes):
+    for seed in range(20):
+        two_dishes.clear('alice')
+        first, second = recommend_batch([('晴天', 30, 5, 'alice'), ('晴天', 30, 5, 'alice')], seed=seed)
+        # 第一道菜计入第二个请求的近期记录（相当于昨天吃过，权重为 0），只能选另一道
+        assert first.name != second.name
+        assert two_dishes.read('alice') == [first.name, second.name]
+
+
+def test_different_users_are_drawn_independently(two_dishes):
+    picks = [
+        tuple(food.name for food in recommend_batch(
+            [('晴天', 30, 5, 'alice'), ('晴天', 30, 5, 'bob')], seed=seed, record_history=False))
+        for seed in range(40)
+    ]
+    # 不同用户互不影响，可以推荐同一道菜
+    assert any(a == b for a, b in picks)
+    assert two_dishes.read('alice') == two_dishes.read('bob') == []
+
+
+def test_show_recent_foods_lists_each_food(two_dishes, caplog):
+    two_dishes.append_many([(None, '番茄炒蛋'), (None, '清蒸鲈鱼')])
+    with caplog.at_level(logging.INFO):
+        show_recent_foods()
+    assert '- 番茄炒蛋' in caplog.messages
+    assert '- 清蒸鲈鱼' in caplog.messages